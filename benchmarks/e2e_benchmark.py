@@ -0,0 +1,307 @@
+"""
+End-to-end benchmark for the bot commands.
+
+Runs the real handlers against local stand-ins for Reddit (fake_reddit.py), Gemini
+(fake_gemini.py) and the Telegram Bot API (fake_bot_api.py), so results only depend on
+our own code and the configured fake latencies. Each scenario runs in a fresh
+subprocess at each concurrency level: N chats send the command at the same time,
+`--rounds` times each, and the time for the handler to finish is recorded per command.
+
+Reports p50/p95/p99 latency, throughput and peak RSS per scenario and writes
+everything to a JSON file, which a later run can be compared against with --compare.
+
+Usage:
+    python benchmarks/e2e_benchmark.py [--scenario reddit] [--concurrency 1,8,32] [--rounds 3]
+        [--gemini-latency 0.5] [--compare benchmarks/results/<earlier run>.json]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import itertools
+import subprocess
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_bot_api import FakeBotAPI
+from fake_gemini import FakeGemini
+from fake_reddit import FakeReddit, load_fixtures
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+BOT_TOKEN = "123456:benchmark"
+
+# name -> (bot directory, measured message, message sent once per chat beforehand)
+SCENARIOS = {
+    'reddit': ("linkedin_post_from_reddit", "/reddit", None),
+    'summary': ("linkedin_post_from_reddit", "/summary", "/reddit"),
+    'linkedin': ("linkedin_post_from_reddit", "/linkedin", "/reddit"),
+    'personal_text': ("personal_bot", "Hi! What does your company do?", None),
+}
+
+
+def percentile(values: list, p: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+# ---------------------------------------------------------------------------
+# Worker: runs inside the bot's directory in a subprocess, one scenario per process
+# ---------------------------------------------------------------------------
+
+def _register_handlers(application, bot: str) -> None:
+    from telegram.ext import CommandHandler, MessageHandler, filters
+
+    if bot == "linkedin_post_from_reddit":
+        from handlers.commands import reddit_command, summary_command, linkedin_command
+        application.add_handler(CommandHandler("reddit", reddit_command))
+        application.add_handler(CommandHandler("summary", summary_command))
+        application.add_handler(CommandHandler("linkedin", linkedin_command))
+    else:
+        from handlers.incoming_message_handler import handle_text_message
+        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message))
+
+
+def _make_update(application, update_id: int, chat_id: int, text: str):
+    from telegram import Update
+
+    entities = [{'type': "bot_command", 'offset': 0, 'length': len(text.split()[0])}] if text.startswith("/") else []
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': "private"},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': "User"},
+            'text': text,
+            'entities': entities,
+        },
+    }, application.bot)
+
+
+async def run_worker(scenario: str, concurrency: int, rounds: int) -> dict:
+    bot, command, setup = SCENARIOS[scenario]
+    bot_dir = os.path.join(REPO_ROOT, bot)
+    os.chdir(bot_dir)
+    sys.path[:0] = [bot_dir, REPO_ROOT]
+
+    from bot_common.runner import build_application
+
+    application = build_application(BOT_TOKEN)
+    try:
+        _register_handlers(application, bot)
+    except ImportError as e:
+        return {'skipped': f"{bot} handlers not available: {e}"}
+
+    errors = []
+
+    async def on_error(update, context) -> None:
+        errors.append(repr(context.error))
+
+    application.add_error_handler(on_error)
+    await application.initialize()
+    await application.start()
+    startup_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    update_ids = itertools.count(1)
+    chats = [1000 + index for index in range(concurrency)]
+
+    async def send(chat_id: int, text: str) -> float:
+        started = time.perf_counter()
+        await application.process_update(_make_update(application, next(update_ids), chat_id, text))
+        return time.perf_counter() - started
+
+    if setup:
+        await asyncio.gather(*(send(chat_id, setup) for chat_id in chats))
+
+    async def chat(chat_id: int) -> list:
+        return [await send(chat_id, command) for _ in range(rounds)]
+
+    started = time.perf_counter()
+    per_chat = await asyncio.gather(*(chat(chat_id) for chat_id in chats))
+    wall_seconds = time.perf_counter() - started
+
+    await application.stop()
+    await application.shutdown()
+
+    latencies = [latency for latencies in per_chat for latency in latencies]
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_samples': errors[:3],
+        'wall_seconds': wall_seconds,
+        'throughput_per_second': len(latencies) / wall_seconds if wall_seconds else None,
+        'latency_mean': sum(latencies) / len(latencies),
+        'latency_p50': percentile(latencies, 50),
+        'latency_p95': percentile(latencies, 95),
+        'latency_p99': percentile(latencies, 99),
+        'latency_max': max(latencies),
+        'startup_rss_mb': startup_rss_mb,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def run_scenario(scenario: str, concurrency: int, rounds: int, env: dict, fakes: dict, timeout: float) -> dict:
+    """Runs one scenario at one concurrency level in a subprocess and returns its metrics."""
+    before = {name: fake_requests(fake) for name, fake in fakes.items()}
+    with tempfile.TemporaryDirectory() as state_dir:
+        worker_env = dict(
+            env,
+            SUMMARY_CACHE_PATH=os.path.join(state_dir, "summary_cache.sqlite3"),
+            SEEN_POSTS_PATH=os.path.join(state_dir, "seen_posts.sqlite3"),
+        )
+        try:
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", scenario,
+                 "--concurrency", str(concurrency), "--rounds", str(rounds)],
+                env=worker_env, capture_output=True, text=True, timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return {'error': f"timed out after {timeout}s"}
+
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {'error': "\n".join(completed.stderr.strip().splitlines()[-10:]) or f"exit code {completed.returncode}"}
+    result = json.loads(lines[-1])
+    for name, fake in fakes.items():
+        result[f"{name}_requests"] = fake_requests(fake) - before[name]
+    return result
+
+
+def fake_requests(fake) -> int:
+    return len(fake.calls) if isinstance(fake, FakeBotAPI) else fake.requests
+
+
+def _format(value, unit: str = "") -> str:
+    if value is None:
+        return "-"
+    return f"{value:.3f}{unit}" if isinstance(value, float) else f"{value}{unit}"
+
+
+def print_results(results: list, baseline: Optional[dict] = None) -> None:
+    previous = {}
+    for entry in (baseline or {}).get('results', []):
+        previous[(entry['scenario'], entry['concurrency'])] = entry
+
+    header = f"{'scenario':<14}{'conc':>5}{'reqs':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}{'rss MB':>9}{'tg calls':>10}{'llm calls':>10}"
+    print(header)
+    print("-" * len(header))
+    for entry in results:
+        if 'skipped' in entry or 'error' in entry:
+            print(f"{entry['scenario']:<14}{entry['concurrency']:>5}  {entry.get('skipped') or 'ERROR: ' + entry['error'].splitlines()[-1]}")
+            continue
+        print(
+            f"{entry['scenario']:<14}{entry['concurrency']:>5}{entry['requests']:>6}{entry['errors']:>5}"
+            f"{_format(entry['latency_p50']):>9}{_format(entry['latency_p95']):>9}{_format(entry['latency_p99']):>9}"
+            f"{_format(entry['throughput_per_second']):>9}{entry['peak_rss_mb']:>9.1f}"
+            f"{entry['bot_api_requests']:>10}{entry['gemini_requests']:>10}"
+        )
+        old = previous.get((entry['scenario'], entry['concurrency']))
+        if old and old.get('latency_p50') and entry.get('latency_p50'):
+            deltas = []
+            for key in ('latency_p50', 'latency_p95', 'latency_p99', 'throughput_per_second', 'peak_rss_mb'):
+                if old.get(key):
+                    deltas.append(f"{key.replace('latency_', '')} {100 * (entry[key] - old[key]) / old[key]:+.1f}%")
+            print(f"{'':<19}vs baseline: {', '.join(deltas)}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run (repeatable), default: all")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated numbers of concurrent chats")
+    parser.add_argument("--rounds", type=int, default=3, help="Commands sent by each chat")
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="Seconds to the first token")
+    parser.add_argument("--gemini-chunk-interval", type=float, default=0.05, help="Seconds between streamed chunks")
+    parser.add_argument("--gemini-words", type=int, default=150, help="Words per generated text")
+    parser.add_argument("--reddit-latency", type=float, default=0.05, help="Seconds per Reddit request")
+    parser.add_argument("--telegram-latency", type=float, default=0.02, help="Seconds per Bot API send/edit")
+    parser.add_argument("--fixtures", help="Directory of recorded Reddit fixtures (see fake_reddit.py), default: generated")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra environment for the bots")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds before a scenario is abandoned")
+    parser.add_argument("--output", help="Results file, default: benchmarks/results/e2e-<timestamp>.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--worker", choices=sorted(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        import logging
+        logging.basicConfig(level=logging.WARNING, format="%(name)s - %(levelname)s - %(message)s")
+        result = asyncio.run(run_worker(args.worker, int(args.concurrency), args.rounds))
+        print(json.dumps(result))
+        return 0
+
+    fakes = {
+        'bot_api': FakeBotAPI(latency=args.telegram_latency).start(),
+        'gemini': FakeGemini(first_token_latency=args.gemini_latency, chunk_interval=args.gemini_chunk_interval,
+                             output_words=args.gemini_words).start(),
+        'reddit': FakeReddit(load_fixtures(args.fixtures) if args.fixtures else None, latency=args.reddit_latency).start(),
+    }
+    env = dict(
+        os.environ,
+        BOT_TOKEN=BOT_TOKEN,
+        BOT_API_BASE_URL=fakes['bot_api'].base_url,
+        GEMINI_BASE_URL=fakes['gemini'].base_url,
+        GEMINI_API_KEY="benchmark",
+        REDDIT_BASE_URL=fakes['reddit'].base_url,
+        PYTHONUNBUFFERED="1",
+    )
+    for pair in args.env:
+        key, _, value = pair.partition("=")
+        env[key] = value
+
+    scenarios = args.scenario or list(SCENARIOS)
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    results = []
+    try:
+        for scenario in scenarios:
+            for concurrency in levels:
+                print(f"Running {scenario} with {concurrency} concurrent chat(s)...", file=sys.stderr)
+                result = run_scenario(scenario, concurrency, args.rounds, env, fakes, args.timeout)
+                results.append(dict(result, scenario=scenario, concurrency=concurrency))
+                if 'skipped' in result:
+                    break
+    finally:
+        for fake in fakes.values():
+            fake.stop()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("e2e-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            'timestamp': time.time(),
+            'git_commit': _git_commit(),
+            'config': {key: value for key, value in vars(args).items() if key not in ('worker', 'compare', 'output')},
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+    return 1 if any('error' in entry for entry in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+A minimal fake Telegram Bot API server for benchmarks.
+
+Point a bot at it with BOT_API_BASE_URL=http://127.0.0.1:<port> (see bot_common/runner.py). It
+answers getMe/getUpdates/sendMessage/... like Telegram would, hands out queued updates
+through getUpdates and records every call with a timestamp.
+"""
+import sys
+import json
+import time
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections when many clients connect at once
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients disconnecting mid-response (e.g. the bot shutting down) are expected
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': "Benchmark Bot", 'username': "benchmark_bot"}
+
+
+class FakeBotAPI:
+    """
+    Fake Bot API on a background thread.
+
+    Args:
+        port (int): Port to listen on, 0 for any free port
+        latency (float): Seconds to wait before answering each send/edit call
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.calls: list = []  # (monotonic time, method, params)
+        self._updates: list = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._lock = threading.Condition()
+        self._server = QuietHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeBotAPI":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def push_command(self, chat_id: int, text: str, user_id: Optional[int] = None) -> int:
+        """Queues a text message (e.g. "/start") as if a user sent it. Returns its update_id."""
+        user_id = user_id if user_id is not None else chat_id
+        update_id = next(self._update_ids)
+        entities = [{'type': "bot_command", 'offset': 0, 'length': len(text.split()[0])}] if text.startswith("/") else []
+        update = {
+            'update_id': update_id,
+            'message': {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': "private"},
+                'from': {'id': user_id, 'is_bot': False, 'first_name': "User"},
+                'text': text,
+                'entities': entities,
+            },
+        }
+        with self._lock:
+            self._updates.append(update)
+            self._lock.notify_all()
+        return update_id
+
+    def calls_to(self, *methods: str) -> list:
+        return [call for call in self.calls if call[1] in methods]
+
+    def wait_for(self, method: str, count: int = 1, timeout: float = 30.0) -> bool:
+        """Blocks until method has been called count times."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while len(self.calls_to(method)) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def _get_updates(self, params: dict) -> list:
+        offset = int(params.get('offset') or 0)
+        timeout = min(float(params.get('timeout') or 0), 1.0)
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._updates = [update for update in self._updates if update['update_id'] >= offset]
+            while not self._updates and time.monotonic() < deadline:
+                self._lock.wait(deadline - time.monotonic())
+            return list(self._updates)
+
+    def _message(self, params: dict) -> dict:
+        chat_id = params.get('chat_id', 0)
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0, 'type': "private"},
+            'from': BOT_USER,
+            'text': params.get('text') or params.get('caption') or "",
+        }
+
+    def _answer(self, method: str, params: dict):
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            return self._get_updates(params)
+        if method.startswith(("send", "edit", "copy")):
+            if self.latency:
+                time.sleep(self.latency)
+            return self._message(params)
+        return True
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b""
+                content_type = self.headers.get('Content-Type', "")
+                if "json" in content_type:
+                    params = json.loads(raw or b"{}")
+                elif "urlencoded" in content_type:
+                    params = dict(parse_qsl(raw.decode()))
+                else:
+                    params = {}  # multipart uploads aren't needed by the benchmarks
+
+                result = api._answer(method, params)
+                with api._lock:
+                    api.calls.append((time.monotonic(), method, params))
+                    api._lock.notify_all()
+
+                body = json.dumps({'ok': True, 'result': result}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', "application/json")
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST
+
+        return Handler
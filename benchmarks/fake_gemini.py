@@ -0,0 +1,153 @@
+"""
+A fake Gemini API backend for benchmarks.
+
+Point the bots at it with GEMINI_BASE_URL=http://127.0.0.1:<port>. It implements
+generateContent and streamGenerateContent (SSE) with configurable latency, returns
+canned text (or JSON matching the requested response schema for structured output, or
+two texts when asked to separate them by a line)
+and reports token usage like the real API.
+"""
+import os
+import sys
+import json
+import time
+import random
+import threading
+import re
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_bot_api import QuietHTTPServer
+
+# Instructions asking for two texts split by a separator line, e.g. the fused summary and post
+SEPARATOR_INSTRUCTION = re.compile(r"a line with only (.+?) on it")
+WORDS = (
+    "agents models inference latency tokens context reasoning benchmark open weights "
+    "fine-tuning retrieval evaluation deployment GPU throughput alignment community"
+).split()
+
+
+class FakeGemini:
+    """
+    Fake Gemini API on a background thread.
+
+    Args:
+        port (int): Port to listen on, 0 for any free port
+        first_token_latency (float): Seconds before the first chunk (or before the whole
+            response for non-streaming calls, which also wait for every chunk)
+        chunk_interval (float): Seconds between streamed chunks
+        chunks (int): Number of chunks a response is streamed in
+        output_words (int): Length of each generated text
+    """
+
+    def __init__(self, port: int = 0, first_token_latency: float = 0.5, chunk_interval: float = 0.05,
+                 chunks: int = 20, output_words: int = 150):
+        self.first_token_latency = first_token_latency
+        self.chunk_interval = chunk_interval
+        self.chunks = chunks
+        self.output_words = output_words
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = QuietHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeGemini":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _text(self, rng: random.Random) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(self.output_words)).capitalize() + "."
+
+    def _output(self, request: dict, rng: random.Random) -> str:
+        """Plain text, or a JSON object with a text per property when a response schema is requested."""
+        config = request.get('generationConfig') or {}
+        schema = config.get('responseSchema') or config.get('responseJsonSchema')
+        if config.get('responseMimeType') == "application/json" or schema:
+            properties = (schema or {}).get('properties') or {'text': {}}
+            return json.dumps({name: self._text(rng) for name in properties})
+        separator = SEPARATOR_INSTRUCTION.search(json.dumps(request.get('systemInstruction') or {}))
+        if separator:
+            return f"{self._text(rng)}\n{separator.group(1)}\n{self._text(rng)}"
+        return self._text(rng)
+
+    @staticmethod
+    def _chunk(text: str, prompt_tokens: int, output_tokens: int, final: bool) -> dict:
+        chunk = {
+            'candidates': [{'content': {'role': "model", 'parts': [{'text': text}]}, 'index': 0}],
+            'usageMetadata': {
+                'promptTokenCount': prompt_tokens,
+                'candidatesTokenCount': output_tokens,
+                'totalTokenCount': prompt_tokens + output_tokens,
+            },
+            'modelVersion': "fake-gemini",
+        }
+        if final:
+            chunk['candidates'][0]['finishReason'] = "STOP"
+        return chunk
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', "application/json")
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b"{}"
+                request = json.loads(raw or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                    seed = fake.requests
+
+                path = self.path.split("?", 1)[0]
+                if not path.endswith((":generateContent", ":streamGenerateContent")):
+                    self._send_json(404, {'error': {'code': 404, 'message': f"Unknown method {path}", 'status': "NOT_FOUND"}})
+                    return
+
+                rng = random.Random(seed)
+                text = fake._output(request, rng)
+                prompt_tokens = max(1, len(raw) // 4)
+                output_tokens = max(1, len(text) // 4)
+
+                if path.endswith(":generateContent"):
+                    time.sleep(fake.first_token_latency + fake.chunk_interval * max(fake.chunks - 1, 0))
+                    self._send_json(200, fake._chunk(text, prompt_tokens, output_tokens, final=True))
+                    return
+
+                # Server-sent events, one chunk of text per event
+                self.send_response(200)
+                self.send_header('Content-Type', "text/event-stream")
+                self.send_header('Connection', "close")
+                self.end_headers()
+                size = max(1, -(-len(text) // fake.chunks))
+                pieces = [text[i:i + size] for i in range(0, len(text), size)]
+                time.sleep(fake.first_token_latency)
+                for index, piece in enumerate(pieces):
+                    if index:
+                        time.sleep(fake.chunk_interval)
+                    final = index == len(pieces) - 1
+                    event = fake._chunk(piece, prompt_tokens, output_tokens if final else 0, final)
+                    self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode())
+                    self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
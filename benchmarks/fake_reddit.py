@@ -0,0 +1,220 @@
+"""
+A fake Reddit JSON API for benchmarks.
+
+Point the linkedin bot at it with REDDIT_BASE_URL=http://127.0.0.1:<port>. It serves
+/r/<subreddit>/hot.json and /r/<subreddit>/comments/<id>.json from fixtures (recorded
+with record_fixtures, or generated deterministically), plus small images for the posts'
+media so the media probe has something to check.
+
+Record real fixtures once with:
+    python benchmarks/fake_reddit.py --record benchmarks/fixtures/reddit
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_bot_api import QuietHTTPServer
+
+DEFAULT_SUBREDDITS = [
+    "artificial", "singularity", "MachineLearning", "LocalLLaMA",
+    "OpenAI", "StableDiffusion", "AGI", "datascience", "computervision"
+]
+SENTENCES = [
+    "We benchmarked the new model against last year's baseline and the gap is smaller than expected.",
+    "The interesting part is how much of the gain comes from better data rather than scale.",
+    "Running this locally on a single consumer GPU is now realistic for most people.",
+    "I'd like to see an evaluation on tasks that weren't in anyone's training set.",
+    "The licensing terms matter more than the benchmark numbers for most companies.",
+    "Latency is what users notice first, long before accuracy differences show up.",
+    "This mostly confirms what practitioners have been saying for months.",
+    "Has anyone reproduced these results with the released weights?",
+]
+IMAGE_BYTES = b"\xff\xd8\xff\xe0" + b"\x00" * 2044  # A 2 KB "JPEG"
+
+
+def _comment(rng: random.Random, comment_id: str, depth: int) -> dict:
+    replies = ""
+    if depth < 2 and rng.random() < 0.4:
+        replies = {'kind': "Listing", 'data': {'children': [
+            _comment(rng, f"{comment_id}r{i}", depth + 1) for i in range(rng.randint(1, 3))
+        ]}}
+    return {'kind': "t1", 'data': {
+        'id': comment_id,
+        'body': " ".join(rng.sample(SENTENCES, rng.randint(1, 4))),
+        'score': int(rng.paretovariate(1.2) * 5),
+        'replies': replies,
+    }}
+
+
+def generate_fixtures(subreddits: list = DEFAULT_SUBREDDITS, posts_per_subreddit: int = 25, seed: int = 1) -> dict:
+    """
+    Builds deterministic fixtures shaped like Reddit's JSON API.
+
+    Returns:
+        dict: 'hot' (subreddit -> listing) and 'comments' (post id -> comments response)
+    """
+    rng = random.Random(seed)
+    fixtures = {'hot': {}, 'comments': {}}
+    for subreddit in subreddits:
+        children = []
+        for index in range(posts_per_subreddit):
+            post_id = f"{subreddit[:3].lower()}{index:03d}"
+            has_image = rng.random() < 0.4
+            post = {
+                'id': post_id,
+                'title': f"{rng.choice(SENTENCES)[:-1]} [{subreddit} #{index}]",
+                'selftext': "\n\n".join(rng.sample(SENTENCES, rng.randint(0, 6))),
+                'subreddit': subreddit,
+                'score': int(rng.paretovariate(1.1) * 20),
+                'num_comments': rng.randint(0, 300),
+                'permalink': f"/r/{subreddit}/comments/{post_id}/benchmark_post/",
+                # Relative media URLs are made absolute when served
+                'url': f"/media/{post_id}.jpg" if has_image else f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/",
+                'is_video': False,
+                'stickied': index == 0 and rng.random() < 0.5,
+            }
+            children.append({'kind': "t3", 'data': post})
+            comments = [_comment(rng, f"{post_id}c{i}", 0) for i in range(rng.randint(3, 30))]
+            fixtures['comments'][post_id] = [
+                {'kind': "Listing", 'data': {'children': [{'kind': "t3", 'data': post}]}},
+                {'kind': "Listing", 'data': {'children': comments}},
+            ]
+        fixtures['hot'][subreddit] = {'kind': "Listing", 'data': {'children': children}}
+    return fixtures
+
+
+def load_fixtures(directory: str) -> dict:
+    """Loads fixtures written by record_fixtures."""
+    fixtures = {'hot': {}, 'comments': {}}
+    for name in os.listdir(directory):
+        with open(os.path.join(directory, name)) as f:
+            data = json.load(f)
+        kind, _, key = name[:-len(".json")].partition("_")
+        if kind in fixtures:
+            fixtures[kind][key] = data
+    return fixtures
+
+
+def record_fixtures(directory: str, subreddits: list = DEFAULT_SUBREDDITS, limit: int = 25) -> None:
+    """Records real hot listings and the comments of every listed post into directory."""
+    import httpx
+
+    os.makedirs(directory, exist_ok=True)
+    headers = {'User-Agent': "telegram-bot-benchmark-fixtures/1.0"}
+    with httpx.Client(base_url="https://www.reddit.com", headers=headers, follow_redirects=True, timeout=15) as client:
+        for subreddit in subreddits:
+            listing = client.get(f"/r/{subreddit}/hot.json", params={'limit': limit}).json()
+            with open(os.path.join(directory, f"hot_{subreddit}.json"), "w") as f:
+                json.dump(listing, f)
+            for child in listing.get('data', {}).get('children', []):
+                post_id = child['data']['id']
+                comments = client.get(f"/r/{subreddit}/comments/{post_id}.json", params={'limit': 20, 'depth': 2}).json()
+                with open(os.path.join(directory, f"comments_{post_id}.json"), "w") as f:
+                    json.dump(comments, f)
+                time.sleep(1)  # Stay well inside Reddit's unauthenticated rate limit
+            print(f"Recorded r/{subreddit}")
+
+
+class FakeReddit:
+    """
+    Fake Reddit on a background thread.
+
+    Args:
+        fixtures (Optional[dict]): From load_fixtures/generate_fixtures, generated if None
+        port (int): Port to listen on, 0 for any free port
+        latency (float): Seconds to wait before answering each request
+    """
+
+    def __init__(self, fixtures: Optional[dict] = None, port: int = 0, latency: float = 0.0):
+        self.fixtures = fixtures or generate_fixtures()
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = QuietHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeReddit":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _listing(self, subreddit: str, limit: int) -> Optional[dict]:
+        listing = self.fixtures['hot'].get(subreddit)
+        if listing is None:
+            return None
+        children = []
+        for child in listing['data']['children'][:limit]:
+            post = dict(child['data'])
+            if post.get('url', "").startswith("/media/"):
+                post['url'] = self.base_url + post['url']
+            children.append({'kind': child.get('kind', "t3"), 'data': post})
+        return {'kind': "Listing", 'data': {'children': children}}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str, head: bool = False) -> None:
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+
+            def _route(self, head: bool = False):
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                url = urlparse(self.path)
+                parts = [part for part in url.path.split("/") if part]
+                query = parse_qs(url.query)
+
+                if parts[:1] == ["media"]:
+                    self._send(200, IMAGE_BYTES, "image/jpeg", head)
+                    return
+                payload = None
+                if len(parts) == 3 and parts[0] == "r" and parts[2] == "hot.json":
+                    payload = fake._listing(parts[1], int(query.get('limit', ["25"])[0]))
+                elif len(parts) == 4 and parts[0] == "r" and parts[2] == "comments":
+                    payload = fake.fixtures['comments'].get(parts[3][:-len(".json")])
+                if payload is None:
+                    self._send(404, b'{"message": "Not Found", "error": 404}', "application/json", head)
+                else:
+                    self._send(200, json.dumps(payload).encode(), "application/json", head)
+
+            def do_GET(self):
+                self._route()
+
+            def do_HEAD(self):
+                self._route(head=True)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record Reddit fixtures for the fake Reddit server")
+    parser.add_argument("--record", required=True, help="Directory to write fixtures to")
+    parser.add_argument("--limit", type=int, default=25, help="Posts per subreddit")
+    args = parser.parse_args()
+    record_fixtures(args.record, limit=args.limit)
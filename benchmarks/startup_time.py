@@ -0,0 +1,139 @@
+"""
+Startup-time benchmark for the bot entry points.
+
+Starts a bot's app.py in a subprocess under `python -X importtime`, pointed at a fake
+Bot API (no network, no real token), sends it /start and measures the time until the
+reply arrives. Exits non-zero when that exceeds the budget.
+
+Usage:
+    python benchmarks/startup_time.py [--bot linkedin_post_from_reddit] [--budget 2.5] [--top 10]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_bot_api import FakeBotAPI
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.5"))
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parses `-X importtime` output into top-level imports.
+
+    Returns:
+        list: (module, cumulative seconds) for modules imported directly, slowest first
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            modules.append((name.strip(), int(cumulative) / 1_000_000))
+    return sorted(modules, key=lambda module: module[1], reverse=True)
+
+
+def measure(bot: str, timeout: float = 60.0) -> dict:
+    """
+    Runs one bot until it answers /start.
+
+    Args:
+        bot (str): Bot directory, e.g. "linkedin_post_from_reddit"
+        timeout (float): Give up after this many seconds
+
+    Returns:
+        dict: 'time_to_first_update_handled' (None if the bot never answered),
+            'import_seconds' and 'top_imports' over the whole run (including imports
+            deferred until after startup) and, on failure, 'error'
+    """
+    api = FakeBotAPI().start()
+    env = dict(
+        os.environ,
+        BOT_TOKEN="123456:benchmark",
+        BOT_API_BASE_URL=api.base_url,
+        BOT_MODE="polling",
+        PREFETCH_INTERVAL_SECONDS="0",  # No Reddit traffic during the benchmark
+        PYTHONUNBUFFERED="1",
+    )
+    env.setdefault("GEMINI_API_KEY", "benchmark")
+    api.push_command(chat_id=1000, text="/start")
+
+    started = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "app.py"],
+        cwd=os.path.join(REPO_ROOT, bot),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        answered = False
+        while time.monotonic() - started < timeout and process.poll() is None:
+            if api.wait_for("sendMessage", timeout=0.05):
+                answered = True
+                break
+        elapsed = api.calls_to("sendMessage")[0][0] - started if answered else None
+    finally:
+        process.terminate()
+        try:
+            _, stderr = process.communicate(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            _, stderr = process.communicate()
+        api.stop()
+
+    result = {'bot': bot, 'time_to_first_update_handled': elapsed}
+    imports = parse_importtime(stderr)
+    result['import_seconds'] = sum(seconds for _, seconds in imports)
+    result['top_imports'] = imports
+    if not answered:
+        errors = [line for line in stderr.splitlines() if not line.startswith("import time:")]
+        result['error'] = "\n".join(errors[-15:]) or f"exited with code {process.returncode}"
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bot", action="append", help="Bot directory to measure (repeatable), default: all")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="Maximum seconds to the first reply")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest top-level imports to show")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    bots = args.bot or ["linkedin_post_from_reddit", "personal_bot"]
+    results = []
+    failed = False
+    for bot in bots:
+        result = measure(bot)
+        results.append(result)
+        ttfu = result['time_to_first_update_handled']
+        print(f"\n{bot}")
+        if ttfu is None:
+            failed = True
+            print(f"  FAILED: no reply to /start\n  {result['error'].replace(chr(10), chr(10) + '  ')}")
+        else:
+            status = "ok" if ttfu <= args.budget else "OVER BUDGET"
+            failed = failed or ttfu > args.budget
+            print(f"  time to first update handled: {ttfu:.3f}s (budget {args.budget:.3f}s) {status}")
+        print(f"  imports over the whole run: {result['import_seconds']:.3f}s, slowest top-level imports:")
+        for name, seconds in result['top_imports'][:args.top]:
+            print(f"    {seconds:7.3f}s  {name}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'budget': args.budget, 'results': results}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
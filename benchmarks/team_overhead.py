@@ -0,0 +1,132 @@
+"""
+Per-message overhead of the personal assistant routing team, before and after pooling.
+
+"per-message" reproduces the old behaviour: a new Team and a new router Gemini model with
+its own API client for every message (its members are built fresh too, where the old code
+reused shared instances, which was not safe for concurrent messages). "pooled" checks a long-lived team out of
+personal_assistant_team_pool, runs it with the chat history as run context and hands it
+back. Both run against the fake Gemini backend (fake_gemini.py) with the model latency
+set to zero by default, so the numbers are our own overhead: construction, client setup,
+connection setup and the pool's reset.
+
+Usage:
+    python benchmarks/team_overhead.py [--messages 200] [--concurrency 1,8] [--gemini-latency 0]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+from fake_gemini import FakeGemini
+from e2e_benchmark import percentile
+
+PERSONAL_BOT_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), "personal_bot")
+HISTORY = [
+    {'role': "user", 'content': "Hi, what does Jovian AI do?"},
+    {'role': "assistant", 'content': "We build AI agents & AI systems for growing businesses."},
+]
+
+
+def _build_per_message_team():
+    """A team built from scratch, with its own router model and API client, as the old code did per message."""
+    import agent
+    from agno.models.google import Gemini
+    from google.genai import types
+
+    team = agent._build_personal_assistant_team()
+    team.model = Gemini(
+        api_key=agent.GEMINI_API_KEY,
+        id=agent.MODEL,
+        grounding=False,
+        client_params={'http_options': types.HttpOptions(base_url=agent.GEMINI_BASE_URL)},
+    )
+    team.context = {'chat_history': HISTORY}
+    return team
+
+
+async def _per_message(message: str) -> None:
+    team = _build_per_message_team()
+    await team.arun(message)
+
+
+async def _pooled(message: str) -> None:
+    import agent
+
+    async with agent.personal_assistant_team_pool.checkout(context={'chat_history': HISTORY}) as team:
+        await team.arun(message)
+
+
+async def run_mode(mode: str, messages: int, concurrency: int) -> dict:
+    """Sends messages through one mode, concurrency at a time, and times each one."""
+    handle = _per_message if mode == "per-message" else _pooled
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await handle(f"I have a question about message {index}")
+            latencies.append(time.perf_counter() - started)
+
+    await one(-1)  # Warm-up: imports, the pool's first team, the first connection
+    latencies.clear()
+    tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(messages)))
+    wall_seconds = time.perf_counter() - started
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'messages': messages,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'throughput_per_second': messages / wall_seconds,
+        'peak_traced_mb': peak_bytes / 1024 / 1024,
+    }
+
+
+async def run_all(levels: list, messages: int) -> list:
+    # One event loop for everything: the pool and the shared API client are bound to it
+    return [await run_mode(mode, messages, concurrency) for concurrency in levels for mode in ("per-message", "pooled")]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200, help="Messages per mode and concurrency level")
+    parser.add_argument("--concurrency", default="1,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--gemini-latency", type=float, default=0.0, help="Seconds the fake model takes per call")
+    args = parser.parse_args()
+
+    fake = FakeGemini(first_token_latency=args.gemini_latency, chunk_interval=0.0, chunks=1, output_words=20).start()
+    os.environ.update(GEMINI_BASE_URL=fake.base_url, GEMINI_API_KEY="benchmark")
+    sys.path[:0] = [PERSONAL_BOT_DIR, os.path.dirname(BENCHMARKS_DIR)]
+    try:
+        try:
+            import agent
+            agent._build_personal_assistant_team()
+        except ImportError as e:
+            print(f"Skipped: the personal assistant team can't be built here ({e})")
+            return 0
+
+        levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+        results = asyncio.run(run_all(levels, args.messages))
+    finally:
+        fake.stop()
+
+    print(f"{'mode':<12} {'conc':>5} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'msg/s':>9} {'peak MB':>9}")
+    print("-" * 68)
+    for result in results:
+        print(f"{result['mode']:<12} {result['concurrency']:>5} {result['mean_ms']:>9.2f} {result['p50_ms']:>9.2f} "
+              f"{result['p95_ms']:>9.2f} {result['throughput_per_second']:>9.1f} {result['peak_traced_mb']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""
+Modules both bots share: Prometheus metrics, the application runner, the outgoing
+send scheduler, the agent pool and the Gemini API client. Each bot's app.py puts the repository root on
+sys.path so they import as bot_common.<module>.
+"""
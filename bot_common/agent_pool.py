@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+
+class AgentPool:
+    """
+    A fixed-size pool of pre-built agents (or agno Teams) of one kind.
+
+    agno agents keep per-run state on the instance, so one instance must never serve
+    two runs at once. Instead of building a new Agent + Gemini per request, callers
+    check an agent out, run it with their own context, and hand it back. On release
+    the agent's context, memory and session are reset so nothing leaks into the next request.
+    """
+
+    def __init__(self, name: str, factory: Callable, size: int = 4):
+        self.name = name
+        self.factory = factory
+        self.size = size
+        self._idle: list = []
+        self._created = 0
+        # Notified whenever an agent is handed back or a slot frees up
+        self._available = asyncio.Condition()
+
+    def _build(self):
+        self._created += 1
+        logger.info(f"Building agent {self._created}/{self.size} for pool '{self.name}'")
+        return self.factory()
+
+    async def _build_in_thread(self):
+        """Builds an agent in a worker thread for a slot the caller reserved, freeing it on failure."""
+        logger.info(f"Building agent {self._created}/{self.size} for pool '{self.name}'")
+        try:
+            return await asyncio.to_thread(self.factory)
+        except BaseException:
+            # Also when the waiting request is cancelled, or the slot would be gone for good
+            await self._free_slot()
+            raise
+
+    async def _free_slot(self) -> None:
+        async with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    async def _put_back(self, agent) -> None:
+        async with self._available:
+            self._idle.append(agent)
+            self._available.notify()
+
+    def warm(self) -> None:
+        """Pre-builds every agent in the pool, e.g. at application startup."""
+        while self._created < self.size:
+            self._idle.append(self._build())
+
+    async def warm_in_background(self) -> None:
+        """
+        Pre-builds every agent in the pool like warm(), one at a time in a worker thread,
+        so the event loop keeps answering updates while the agents are built.
+        """
+        while self._created < self.size:
+            # The slot is taken on the event loop, so a checkout meanwhile can't overfill the pool
+            self._created += 1
+            await self._put_back(await self._build_in_thread())
+
+    async def _acquire(self):
+        """An idle agent, a newly built one while the pool isn't full, or the next one handed back."""
+        async with self._available:
+            while not self._idle and self._created >= self.size:
+                await self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        return await self._build_in_thread()
+
+    @classmethod
+    def _new_session(cls, agent) -> None:
+        if hasattr(agent, 'new_session'):
+            agent.new_session()
+            return
+        # agno Teams have no new_session(): clear their memory, start a fresh session
+        # and do the same for every member, keeping the members' own context
+        if agent.memory is not None:
+            agent.memory.clear()
+        agent._reset_session_state()
+        agent._reset_run_state()
+        agent.session_id = str(uuid4())
+        for member in agent.members:
+            cls._new_session(member)
+
+    @classmethod
+    def _reset(cls, agent) -> None:
+        agent.context = None
+        cls._new_session(agent)
+
+    @asynccontextmanager
+    async def checkout(self, context: Optional[dict] = None):
+        """
+        Borrows an agent for one request.
+
+        Args:
+            context (Optional[dict]): Per-request context to expose to the agent
+
+        Yields:
+            The agent, with its context set
+        """
+        agent = await self._acquire()
+        agent.context = context
+        try:
+            yield agent
+        finally:
+            try:
+                self._reset(agent)
+            except Exception as e:
+                # A broken agent is dropped rather than returned; the next checkout builds a new one
+                logger.warning(f"Dropping agent from pool '{self.name}' after failed reset: {e}")
+                await self._free_slot()
+            else:
+                await self._put_back(agent)
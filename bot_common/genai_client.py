@@ -0,0 +1,27 @@
+import os
+import dotenv
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google import genai
+
+dotenv.load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Overridable to point the agents at a local stand-in, e.g. for benchmarks
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+# One Gemini API client per process, shared by every pooled agent so HTTP connections are reused.
+# Each agent still gets its own Gemini model object since agno keeps per-run state on it.
+_genai_client = None
+
+
+def get_genai_client() -> "genai.Client":
+    """The shared Gemini API client, created on first use (google-genai is slow to import)."""
+    global _genai_client
+    if _genai_client is None:
+        from google import genai
+        from google.genai import types
+        http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+        _genai_client = genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+    return _genai_client
@@ -0,0 +1,246 @@
+import os
+import time
+import asyncio
+import logging
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Serve Prometheus metrics on this port (e.g. 9464); unset to disable
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PREFIX = "bot"
+
+# Upper bounds in seconds, from a fast cache hit up to a slow model call
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. Recording is a bisect and two additions, so it
+    is cheap enough to wrap every stage of every request.
+    """
+
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimates a quantile by interpolating inside its bucket, like Prometheus' histogram_quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                if index == len(self.bounds):
+                    return lower  # In +Inf, the best estimate is the highest bound
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+
+# Per-stage latency and error counts, keyed by stage name, e.g. "reddit.comments"
+stage_latency: Dict[str, Histogram] = {}
+stage_errors: Dict[str, int] = {}
+# Extra values exported as-is: name -> (type, help, function returning a number or {labels: number})
+_collectors: Dict[str, tuple] = {}
+
+
+def observe(stage: str, seconds: float, failed: bool = False) -> None:
+    histogram = stage_latency.get(stage)
+    if histogram is None:
+        histogram = stage_latency[stage] = Histogram()
+        stage_errors.setdefault(stage, 0)
+    histogram.observe(seconds)
+    if failed:
+        stage_errors[stage] += 1
+
+
+def record_error(stage: str) -> None:
+    """Counts an error for a stage that handles its own failures (e.g. returns [] on error)."""
+    stage_errors[stage] = stage_errors.get(stage, 0) + 1
+
+
+@contextmanager
+def span(stage: str):
+    """Times the enclosed block as one observation of stage; an exception counts as an error."""
+    started = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        observe(stage, time.perf_counter() - started, failed)
+
+
+def timed(stage: str, failed_if: Optional[Callable] = None):
+    """
+    Decorator that times every call of an async function as a stage.
+
+    Args:
+        stage (str): Stage name
+        failed_if (Optional[Callable]): Marks a returned value as an error, for functions
+            that report failures by returning {} or an "Error: ..." string
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await function(*args, **kwargs)
+            except BaseException:
+                observe(stage, time.perf_counter() - started, failed=True)
+                raise
+            observe(stage, time.perf_counter() - started, failed=bool(failed_if and failed_if(result)))
+            return result
+        return wrapper
+    return decorator
+
+
+def is_error_text(result) -> bool:
+    return not result or (isinstance(result, str) and result.startswith("Error:"))
+
+
+def register_collector(name: str, metric_type: str, help_text: str, function: Callable) -> None:
+    """
+    Exports a value owned by another module (cache sizes, token counters, ...).
+
+    Args:
+        name (str): Metric name without the prefix
+        metric_type (str): "counter" or "gauge"
+        help_text (str): Description
+        function (Callable): Returns a number, or a dict mapping a label string like
+            'lane="reply"' to a number
+    """
+    _collectors[name] = (metric_type, help_text, function)
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus() -> str:
+    """Renders every metric in the Prometheus text exposition format."""
+    lines = [
+        f"# HELP {METRICS_PREFIX}_stage_duration_seconds Time spent in each stage of the handler pipeline",
+        f"# TYPE {METRICS_PREFIX}_stage_duration_seconds histogram",
+    ]
+    for stage, histogram in sorted(stage_latency.items()):
+        label = f'stage="{_label_value(stage)}"'
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+            cumulative += bucket_count
+            lines.append(f'{METRICS_PREFIX}_stage_duration_seconds_bucket{{{label},le="{_format_number(bound)}"}} {cumulative}')
+        lines.append(f"{METRICS_PREFIX}_stage_duration_seconds_sum{{{label}}} {_format_number(histogram.total)}")
+        lines.append(f"{METRICS_PREFIX}_stage_duration_seconds_count{{{label}}} {histogram.count}")
+
+    lines.append(f"# HELP {METRICS_PREFIX}_stage_errors_total Failed calls per stage")
+    lines.append(f"# TYPE {METRICS_PREFIX}_stage_errors_total counter")
+    for stage, errors in sorted(stage_errors.items()):
+        lines.append(f'{METRICS_PREFIX}_stage_errors_total{{stage="{_label_value(stage)}"}} {errors}')
+
+    for name, (metric_type, help_text, function) in sorted(_collectors.items()):
+        try:
+            value = function()
+        except Exception as e:
+            logger.warning(f"Metrics collector {name} failed: {e}")
+            continue
+        lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_{name} {metric_type}")
+        if isinstance(value, dict):
+            for labels, labelled_value in value.items():
+                lines.append(f"{METRICS_PREFIX}_{name}{{{labels}}} {_format_number(labelled_value)}")
+        else:
+            lines.append(f"{METRICS_PREFIX}_{name} {_format_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def render_stats() -> str:
+    """Plain-text summary for the /stats command: per-stage p50/p95, mean and errors, then the collectors."""
+    lines = ["Stage latency (count, errors, p50 / p95 / mean in seconds):"]
+    for stage, histogram in sorted(stage_latency.items()):
+        p50, p95, mean = histogram.quantile(0.5), histogram.quantile(0.95), histogram.mean
+        lines.append(f"{stage}: {histogram.count}, {stage_errors.get(stage, 0)} err, {p50:.3f} / {p95:.3f} / {mean:.3f}")
+    if not stage_latency:
+        lines.append("No requests yet.")
+    for stage, errors in sorted(stage_errors.items()):
+        if stage not in stage_latency and errors:
+            lines.append(f"{stage}: {errors} err")
+
+    if _collectors:
+        lines.append("")
+    for name, (_, _, function) in sorted(_collectors.items()):
+        try:
+            value = function()
+        except Exception as e:
+            lines.append(f"{name}: unavailable ({e})")
+            continue
+        if isinstance(value, dict):
+            value = ", ".join(f"{labels.split('=', 1)[-1].strip(chr(34))}={_format_number(v)}" for labels, v in value.items())
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines)
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass  # Headers aren't needed
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render_prometheus().encode()
+        else:
+            status, body = "404 Not Found", b"Not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+_server: Optional[asyncio.AbstractServer] = None
+
+
+async def on_startup(application) -> None:
+    """Application post_init hook: serves /metrics on METRICS_PORT when it is set."""
+    global _server
+    if METRICS_PORT and _server is None:
+        _server = await asyncio.start_server(_handle_http, METRICS_HOST, METRICS_PORT)
+        logger.info(f"Serving Prometheus metrics on {METRICS_HOST}:{METRICS_PORT}/metrics")
+
+
+async def on_shutdown(application) -> None:
+    global _server
+    if _server is not None:
+        _server.close()
+        await _server.wait_closed()
+        _server = None
@@ -0,0 +1,188 @@
+import os
+import signal
+import asyncio
+import logging
+import dotenv
+from typing import Callable, Optional
+from telegram.ext import Application, ApplicationBuilder, SimpleUpdateProcessor
+from bot_common.send_scheduler import send_scheduler
+
+dotenv.load_dotenv()
+logger = logging.getLogger(__name__)
+
+# "polling" (default) or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Maximum number of updates handled at the same time
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "32"))
+# How long to let in-flight handlers (e.g. LLM calls) finish on shutdown before cancelling them
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "30"))
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Public base URL Telegram should call, e.g. https://bot.example.com
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+
+# Point the bot at a different Bot API server, e.g. a local fake one for testing
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL")
+
+
+class DrainingUpdateProcessor(SimpleUpdateProcessor):
+    """
+    Processes up to max_concurrent_updates updates at once and keeps track of the
+    in-flight handlers, so shutdown can wait for them (with a deadline) instead of
+    cutting LLM calls off halfway.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._in_flight: set = set()
+        self._cancelled = False
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def do_process_update(self, update, coroutine) -> None:
+        if self._cancelled:
+            # Was waiting for a slot when shutdown stopped waiting for anything
+            coroutine.close()
+            return
+        task = asyncio.current_task()
+        self._in_flight.add(task)
+        try:
+            await coroutine
+        finally:
+            self._in_flight.discard(task)
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Waits up to timeout seconds for in-flight handlers, including those that start
+        meanwhile from updates already received, then cancels the rest.
+
+        Returns:
+            int: Number of handlers that had to be cancelled
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            pending = {task for task in self._in_flight if task is not asyncio.current_task()}
+            if not pending:
+                return 0
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            logger.info(f"Waiting up to {remaining:.0f}s for {len(pending)} in-flight updates to finish")
+            await asyncio.wait(pending, timeout=remaining)
+        cancelled = self.cancel_all()
+        logger.warning(f"Cancelled {cancelled} updates still running after {timeout}s")
+        return cancelled
+
+    def cancel_all(self) -> int:
+        """
+        Cancels every in-flight handler and skips those still waiting for a slot.
+
+        Returns:
+            int: Number of handlers cancelled
+        """
+        self._cancelled = True
+        pending = [task for task in self._in_flight if task is not asyncio.current_task()]
+        for task in pending:
+            task.cancel()
+        return len(pending)
+
+
+def build_application(
+        token: str,
+        post_init: Optional[Callable] = None,
+        post_shutdown: Optional[Callable] = None
+) -> Application:
+    """
+    Builds the Application with concurrent update processing, outgoing requests routed
+    through the send scheduler and, if configured, a custom Bot API endpoint.
+
+    Args:
+        token (str): Bot token
+        post_init (Optional[Callable]): Extra startup hook
+        post_shutdown (Optional[Callable]): Extra shutdown hook
+
+    Returns:
+        Application: The configured application
+    """
+    update_processor = DrainingUpdateProcessor(MAX_CONCURRENT_UPDATES)
+
+    async def on_startup(application: Application) -> None:
+        _install_graceful_shutdown(application, update_processor)
+        if post_init:
+            await post_init(application)
+
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .concurrent_updates(update_processor)
+        .rate_limiter(send_scheduler)
+        .post_init(on_startup)
+    )
+    if post_shutdown:
+        builder = builder.post_shutdown(post_shutdown)
+    if BOT_API_BASE_URL:
+        base_url = BOT_API_BASE_URL.rstrip("/")
+        builder = builder.base_url(f"{base_url}/bot").base_file_url(f"{base_url}/file/bot")
+    return builder.build()
+
+
+def _install_graceful_shutdown(application: Application, update_processor: DrainingUpdateProcessor) -> None:
+    """
+    On SIGINT/SIGTERM, stop taking new updates (polling or the webhook server), let the
+    in-flight handlers drain, then stop the application. A second signal stops at once,
+    cancelling whatever is still running.
+    """
+    loop = asyncio.get_running_loop()
+    stopping = []
+
+    def on_signal() -> None:
+        if stopping:
+            logger.warning("Second shutdown signal, cancelling in-flight updates and stopping now")
+            stopping[0].cancel()
+            update_processor.cancel_all()
+            application.stop_running()
+            return
+        logger.info("Shutdown requested, no longer accepting updates, draining in-flight ones...")
+        stopping.append(loop.create_task(_drain_and_stop()))
+
+    async def _drain_and_stop() -> None:
+        # Otherwise updates keep arriving while draining and there is no end to wait for
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+        await update_processor.drain(SHUTDOWN_DRAIN_SECONDS)
+        application.stop_running()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, on_signal)
+        except (NotImplementedError, RuntimeError):
+            # Not supported on this platform (e.g. Windows); fall back to immediate stop
+            logger.warning(f"Graceful drain not available for {sig.name} on this platform")
+
+
+def run_bot(application: Application) -> None:
+    """Runs the bot in polling or webhook mode, depending on BOT_MODE."""
+    if BOT_MODE == "webhook":
+        if not WEBHOOK_URL:
+            logger.critical("BOT_MODE=webhook requires WEBHOOK_URL. Exiting.")
+            exit()
+        logger.info(f"Starting bot with webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH} "
+                    f"(up to {MAX_CONCURRENT_UPDATES} concurrent updates)...")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            stop_signals=None,
+        )
+        logger.info("Bot webhook server has stopped.")
+    else:
+        logger.info(f"Starting bot with polling (up to {MAX_CONCURRENT_UPDATES} concurrent updates)...")
+        application.run_polling(stop_signals=None)
+        logger.info("Bot has stopped polling.")
@@ -0,0 +1,257 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from typing import Any, Callable, Coroutine, Dict, Optional
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from bot_common.metrics import observe, span, register_collector
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows roughly 30 messages per second overall, about 1 per second in a
+# private chat and 20 per minute in a group
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "25"))
+SEND_GLOBAL_BURST = float(os.getenv("SEND_GLOBAL_BURST", "30"))
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+SEND_CHAT_BURST = float(os.getenv("SEND_CHAT_BURST", "3"))
+SEND_GROUP_RATE = float(os.getenv("SEND_GROUP_RATE", str(20 / 60)))
+SEND_GROUP_BURST = float(os.getenv("SEND_GROUP_BURST", "3"))
+# How many times a request is re-queued after a RetryAfter before the error is raised
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+# Buckets of idle chats are dropped once there are more than this many
+MAX_CHAT_BUCKETS = 10000
+
+# Priority lanes, lower goes first: new messages ahead of edits to ones already sent
+# (e.g. streamed text), which can fall behind without anyone waiting on them
+PRIORITY_REPLY = 0
+PRIORITY_EDIT = 1
+LANE_NAMES = {PRIORITY_REPLY: "reply", PRIORITY_EDIT: "edit"}
+
+EDIT_ENDPOINTS = {"editMessageText", "editMessageCaption", "editMessageMedia", "editMessageReplyMarkup"}
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+
+
+class TokenBucket:
+    """Refills at rate tokens per second up to capacity; each send takes one token."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at', 'blocked_until')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0  # Set by RetryAfter
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class SendScheduler(BaseRateLimiter):
+    """
+    Central scheduler for all outgoing Bot API requests, installed as the Application's
+    rate limiter so every reply_*, send_* and edit call goes through it.
+
+    A request waits until both the global bucket and its chat's bucket have a token.
+    Waiting requests are served by priority lane (replies, then edits) and in arrival
+    order within a lane; a chat that is out of tokens doesn't hold
+    up other chats. A RetryAfter blocks the affected chat (or everything, for requests
+    without a chat) for the requested time and the request is queued again.
+    """
+
+    def __init__(
+            self,
+            global_rate: float = SEND_GLOBAL_RATE,
+            global_burst: float = SEND_GLOBAL_BURST,
+            chat_rate: float = SEND_CHAT_RATE,
+            chat_burst: float = SEND_CHAT_BURST,
+            group_rate: float = SEND_GROUP_RATE,
+            group_burst: float = SEND_GROUP_BURST,
+            max_retries: int = SEND_MAX_RETRIES
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_burst)
+        self._chats: Dict[Any, TokenBucket] = {}
+        # (priority, sequence, chat_id, future)
+        self._waiting: list = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._stats = {
+            'sent': 0,
+            'retry_after': 0,
+            'failed': 0,
+            'lanes': {name: {'sent': 0, 'wait_total': 0.0, 'wait_max': 0.0} for name in LANE_NAMES.values()},
+        }
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._wakeup:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                now = time.monotonic()
+                for idle_chat in [key for key, other in self._chats.items() if other.is_idle(now)]:
+                    del self._chats[idle_chat]
+            # Group and channel ids are negative
+            is_group = isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+            bucket = TokenBucket(
+                self.group_rate if is_group else self.chat_rate,
+                self.group_burst if is_group else self.chat_burst
+            )
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _dispatch(self) -> None:
+        """Grants as many waiting requests as the buckets allow, then sleeps until the next one can go."""
+        self._wakeup = None
+        now = time.monotonic()
+        next_check = None
+        still_waiting = []
+
+        while self._waiting:
+            entry = heapq.heappop(self._waiting)
+            _, _, chat_id, future = entry
+            if future.done():  # Cancelled while waiting
+                continue
+            global_wait = self._global.wait_time(now)
+            if global_wait > 0:
+                heapq.heappush(self._waiting, entry)
+                next_check = global_wait if next_check is None else min(next_check, global_wait)
+                break
+            chat_wait = self._chat_bucket(chat_id).wait_time(now) if chat_id is not None else 0.0
+            if chat_wait > 0:
+                still_waiting.append(entry)
+                next_check = chat_wait if next_check is None else min(next_check, chat_wait)
+                continue
+            self._global.take()
+            if chat_id is not None:
+                self._chats[chat_id].take()
+            future.set_result(None)
+
+        for entry in still_waiting:
+            heapq.heappush(self._waiting, entry)
+        if self._waiting and next_check is not None:
+            self._wakeup = asyncio.get_running_loop().call_later(next_check, self._dispatch)
+
+    async def _acquire(self, priority: int, chat_id) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), chat_id, future))
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._dispatch()
+        await future
+
+    def _block(self, chat_id, seconds: float) -> None:
+        bucket = self._chat_bucket(chat_id) if chat_id is not None else self._global
+        bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+
+    async def process_request(
+            self,
+            callback: Callable[..., Coroutine[Any, Any, Any]],
+            args: Any,
+            kwargs: Dict[str, Any],
+            endpoint: str,
+            data: Dict[str, Any],
+            rate_limit_args: Optional[Any],
+    ):
+        chat_id = data.get("chat_id")
+        priority = PRIORITY_EDIT if endpoint in EDIT_ENDPOINTS else PRIORITY_REPLY
+        lane_name = LANE_NAMES[priority]
+        lane = self._stats['lanes'][lane_name]
+
+        if chat_id is None and not endpoint.startswith(("send", "edit", "copy", "forward")):
+            # Not a message (getMe, setWebhook, answerCallbackQuery, ...): don't queue it
+            with span(f"telegram.{endpoint}"):
+                return await callback(*args, **kwargs)
+
+        queued_at = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, chat_id)
+            waited = time.monotonic() - queued_at
+            try:
+                with span(f"telegram.{endpoint}"):
+                    result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self._stats['retry_after'] += 1
+                retry_after = _retry_after_seconds(e)
+                self._block(chat_id, retry_after)
+                if attempt == self.max_retries:
+                    self._stats['failed'] += 1
+                    raise
+                logger.warning(f"{endpoint} for chat {chat_id} hit RetryAfter ({retry_after}s), re-queued (attempt {attempt + 1})")
+                continue
+            observe(f"telegram.queue_wait.{lane_name}", waited)
+            self._stats['sent'] += 1
+            lane['sent'] += 1
+            lane['wait_total'] += waited
+            lane['wait_max'] = max(lane['wait_max'], waited)
+            return result
+
+    def get_stats(self) -> dict:
+        """
+        Queue depth per lane and wait times of sent requests.
+
+        Returns:
+            dict: 'queued', 'sent', 'retry_after', 'failed' and per-lane 'lanes' stats
+        """
+        queued = {name: 0 for name in LANE_NAMES.values()}
+        for priority, _, _, future in self._waiting:
+            if not future.done():
+                queued[LANE_NAMES[priority]] += 1
+        lanes = {}
+        for name, lane in self._stats['lanes'].items():
+            lanes[name] = {
+                'queued': queued[name],
+                'sent': lane['sent'],
+                'wait_avg': lane['wait_total'] / lane['sent'] if lane['sent'] else 0.0,
+                'wait_max': lane['wait_max'],
+            }
+        return {
+            'queued': sum(queued.values()),
+            'sent': self._stats['sent'],
+            'retry_after': self._stats['retry_after'],
+            'failed': self._stats['failed'],
+            'chats_tracked': len(self._chats),
+            'lanes': lanes,
+        }
+
+
+send_scheduler = SendScheduler()
+register_collector("send_queue_depth", "gauge", "Outgoing requests waiting for a send token, per lane",
+                   lambda: {f'lane="{lane}"': stats['queued'] for lane, stats in send_scheduler.get_stats()['lanes'].items()})
+register_collector("send_retry_after_total", "counter", "RetryAfter responses from Telegram",
+                   lambda: send_scheduler.get_stats()['retry_after'])
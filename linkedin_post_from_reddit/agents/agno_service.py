@@ -1,10 +1,21 @@
-from agno.agent import Agent
 from textwrap import dedent
-from agno.models.google import Gemini
 import os
 import dotenv
 import asyncio
+import functools
 import logging
+from typing import AsyncIterator, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel, Field
+from bot_common.agent_pool import AgentPool
+from bot_common.genai_client import get_genai_client
+from bot_common.metrics import timed, is_error_text, register_collector
+
+# agno and google-genai take most of the bot's import time, so they are imported on
+# first use (building an agent or running one) instead of when the bot starts
+if TYPE_CHECKING:
+    from agno.agent import Agent
+    from agno.models.google import Gemini
 
 dotenv.load_dotenv()
 logger = logging.getLogger(__name__)
@@ -12,6 +23,351 @@ logger = logging.getLogger(__name__)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL = "gemini-2.5-flash-preview-05-20"  # Using stable model version
 
+# Maximum number of model calls in flight at once; extra callers wait their turn
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+_llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+# Only used for agents without an async run path
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY, thread_name_prefix="agno-run")
+
+# Token usage reported by the model across all runs
+llm_token_usage = {
+    'runs': 0,
+    'input_tokens': 0,
+    'output_tokens': 0,
+}
+
+register_collector("llm_runs_total", "counter", "Model runs", lambda: llm_token_usage['runs'])
+register_collector("llm_tokens_total", "counter", "Tokens reported by the model", lambda: {
+    'direction="input"': llm_token_usage['input_tokens'],
+    'direction="output"': llm_token_usage['output_tokens'],
+})
+
+def _metric_total(value) -> int:
+    # agno reports per-model-call metrics as lists
+    if isinstance(value, list):
+        return sum(v for v in value if isinstance(v, (int, float)))
+    return value if isinstance(value, (int, float)) else 0
+
+def record_token_usage(agent, response) -> None:
+    """Adds a run's token usage to llm_token_usage and logs the prompt size."""
+    metrics = getattr(response, 'metrics', None) or {}
+    input_tokens = _metric_total(metrics.get('input_tokens'))
+    output_tokens = _metric_total(metrics.get('output_tokens'))
+    llm_token_usage['runs'] += 1
+    llm_token_usage['input_tokens'] += input_tokens
+    llm_token_usage['output_tokens'] += output_tokens
+    logger.info(f"{getattr(agent, 'name', 'agent')}: {input_tokens} prompt tokens, {output_tokens} output tokens")
+
+async def run_agent(agent, message: str):
+    """
+    Runs an agent without blocking the event loop.
+    Uses the agent's async run path when it has one, otherwise a bounded thread pool.
+    At most LLM_CONCURRENCY runs are in flight at once.
+
+    Args:
+        agent: An agno Agent or Team
+        message (str): The message to run the agent with
+
+    Returns:
+        The agent's run response
+    """
+    async with _llm_semaphore:
+        if hasattr(agent, 'arun'):
+            response = await agent.arun(message)
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(_llm_executor, agent.run, message)
+    record_token_usage(agent, response)
+    return response
+
+async def stream_agent(agent, message: str) -> AsyncIterator[str]:
+    """
+    Runs an agent in streaming mode and yields text deltas as the model produces them.
+    Shares the LLM_CONCURRENCY limit with run_agent.
+
+    Args:
+        agent: An agno Agent or Team
+        message (str): The message to run the agent with
+
+    Yields:
+        str: Pieces of the response text
+    """
+    from agno.run.response import RunEvent
+
+    async with _llm_semaphore:
+        if not hasattr(agent, 'arun'):
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(_llm_executor, agent.run, message)
+            record_token_usage(agent, response)
+            if response and response.content:
+                yield str(response.content)
+            return
+
+        async for chunk in await agent.arun(message, stream=True):
+            content = getattr(chunk, 'content', None)
+            if getattr(chunk, 'event', None) == RunEvent.run_response and isinstance(content, str) and content:
+                yield content
+        # The final metrics are on the agent's run response once the stream is exhausted
+        record_token_usage(agent, agent.run_response)
+
+class SummaryAndLinkedInPost(BaseModel):
+    summary: str = Field(description="Concise summary of the reddit post and its comments")
+    linkedin_post: str = Field(description="LinkedIn post written from the post and the summary")
+
+def _gemini_model(grounding: bool = True) -> "Gemini":
+    from agno.models.google import Gemini
+    return Gemini(
+        api_key=GEMINI_API_KEY,
+        id=MODEL,
+        grounding=grounding,  # Enable grounding for better context understanding
+        client=get_genai_client(),
+    )
+
+def _build_summary_agent() -> "Agent":
+    from agno.agent import Agent
+    return Agent(
+        name="summary_agent",
+        description="You are a helpful assistant that summarizes reddit posts",
+        goal="Generate a precise and concise summary of 1. reddit post and 2. comments on the post",
+        add_context=True,
+        model=_gemini_model(),
+        system_message=dedent(
+            """
+            <persona>
+            - You are an expert copywriter specializing in creating clear, engaging summaries
+            - Your goal is to deliver maximum value with minimum words
+            - You excel at distilling complex information into easily digestible content
+            - You maintain a professional yet accessible tone
+            </persona>
+
+            <instructions>
+            - Analyze the post title, body, and comments thoroughly
+            - Create a concise summary that captures the main points and key discussions
+            - Use simple, clear language that anyone can understand
+            - Focus on the most valuable insights and takeaways
+            - Structure the summary in a logical flow
+            - Include relevant context from comments if they add value
+            </instructions>
+
+            <constraints>
+            - Keep the summary under 200 words
+            - Avoid technical jargon unless absolutely necessary
+            - Don't include redundant information
+            - Don't make assumptions beyond what's in the provided content
+            - Don't include personal opinions or biases
+            </constraints>
+
+            <output_format>
+            The summary should be structured as follows:
+            1. Main topic/theme (1-2 sentences)
+            2. Key points from the post (2-3 bullet points)
+            3. Notable insights from comments (1-2 bullet points)
+            4. Overall takeaway (1 sentence)
+            </output_format>
+            """
+        )
+    )
+
+def _build_linkedin_agent() -> "Agent":
+    from agno.agent import Agent
+    return Agent(
+        name="linkedin_post_agent",
+        description="You are an expert LinkedIn content creator",
+        goal="Generate an engaging and professional LinkedIn post from Reddit content",
+        add_context=True,
+        model=_gemini_model(),
+        system_message=dedent(
+            """
+            <persona>
+            - You are an expert LinkedIn content creator specializing in AI and technology
+            - You excel at creating engaging, professional, and thought-provoking content
+            - You understand how to maximize engagement while maintaining professionalism
+            - You know how to adapt Reddit content for a professional LinkedIn audience
+            </persona>
+
+            <instructions>
+            - Create a LinkedIn post that's engaging and professional
+            - Use the provided summary as a base but enhance it for LinkedIn
+            - Include relevant hashtags for better visibility
+            - Add a call-to-action to encourage engagement
+            - Maintain a professional yet conversational tone
+            - Structure the post for maximum readability
+            </instructions>
+
+            <constraints>
+            - Keep the post under 300 words
+            - Use 3-5 relevant hashtags
+            - Include emojis strategically (2-3 per post)
+            - Don't use Reddit-specific language or references
+            - Don't include personal opinions or biases
+            - Don't use overly technical jargon
+            - Don't include the original Reddit URL directly
+            </constraints>
+
+            <output_format>
+            The LinkedIn post should be structured as follows:
+            1. Hook (1-2 sentences that grab attention)
+            2. Main content (2-3 paragraphs)
+            3. Key takeaways (2-3 bullet points)
+            4. Call-to-action (1 sentence)
+            5. Hashtags (3-5 relevant hashtags)
+            </output_format>
+            """
+        )
+    )
+
+# Separates the summary from the LinkedIn post in the streamed fused output
+FUSED_POST_DELIMITER = "=== LINKEDIN POST ==="
+
+def _build_summary_and_linkedin_agent(streaming: bool = False) -> "Agent":
+    """
+    The agent writing the summary and the LinkedIn post in one call. With streaming it
+    writes plain text, the summary and the post separated by FUSED_POST_DELIMITER, since
+    structured output only arrives once complete.
+    """
+    from agno.agent import Agent
+    output_instructions = [] if not streaming else [
+        "Write the summary first, then a line with only " + FUSED_POST_DELIMITER + " on it, then the LinkedIn post.",
+        "Write nothing before the summary and nothing after the LinkedIn post, and no 'summary:' or 'linkedin_post:' labels.",
+    ]
+    return Agent(
+        name="summary_and_linkedin_agent",
+        description="You are an expert copywriter and LinkedIn content creator",
+        goal="Summarize a reddit post with its comments and turn it into a LinkedIn post in one pass",
+        add_context=True,
+        # Structured output can't be combined with search grounding
+        model=_gemini_model(grounding=False),
+        response_model=None if streaming else SummaryAndLinkedInPost,
+        instructions=output_instructions,
+        system_message=dedent(
+            """
+            <persona>
+            - You are an expert copywriter specializing in clear, engaging summaries
+            - You are also an expert LinkedIn content creator specializing in AI and technology
+            - You know how to adapt Reddit content for a professional LinkedIn audience
+            </persona>
+
+            <instructions>
+            - Analyze the post title, body, and comments thoroughly
+            - First write the summary, then write the LinkedIn post based on it
+            - Use simple, clear language and focus on the most valuable insights
+            - Include relevant context from comments if they add value
+            - For the LinkedIn post, add a call-to-action and relevant hashtags
+            </instructions>
+
+            <constraints>
+            - Keep the summary under 200 words
+            - Keep the LinkedIn post under 300 words
+            - Use 3-5 relevant hashtags and 2-3 emojis in the LinkedIn post
+            - Don't use Reddit-specific language or references in the LinkedIn post
+            - Don't include the original Reddit URL directly
+            - Don't include personal opinions or biases
+            - Don't make assumptions beyond what's in the provided content
+            </constraints>
+
+            <output_format>
+            summary:
+            1. Main topic/theme (1-2 sentences)
+            2. Key points from the post (2-3 bullet points)
+            3. Notable insights from comments (1-2 bullet points)
+            4. Overall takeaway (1 sentence)
+
+            linkedin_post:
+            1. Hook (1-2 sentences that grab attention)
+            2. Main content (2-3 paragraphs)
+            3. Key takeaways (2-3 bullet points)
+            4. Call-to-action (1 sentence)
+            5. Hashtags (3-5 relevant hashtags)
+            </output_format>
+            """
+        )
+    )
+
+def _build_subreddit_agent() -> "Agent":
+    from agno.agent import Agent
+    return Agent(
+        name="subreddit_agent",
+        description="You are an expert at finding relevant subreddits",
+        goal="Generate a list of relevant subreddits based on the provided description",
+        add_context=True,
+        model=_gemini_model(),
+        system_message=dedent(
+            """
+            <persona>
+            - You are an expert at understanding Reddit's community structure
+            - You excel at matching content themes with appropriate subreddits
+            - You understand both popular and niche subreddit communities
+            - You can identify both direct and related subreddits
+            </persona>
+
+            <instructions>
+            - Analyze the provided description thoroughly
+            - Identify key themes, topics, and interests
+            - Suggest both popular and niche subreddits
+            - Consider both direct matches and related communities
+            - Prioritize active and well-moderated subreddits
+            </instructions>
+
+            <constraints>
+            - Return 15-20 most relevant subreddits
+            - Include a mix of popular and niche communities
+            - Don't suggest NSFW subreddits unless explicitly relevant
+            - Don't suggest inactive or poorly moderated subreddits
+            - Don't include subreddits that don't allow self-promotion
+            </constraints>
+
+            <output_format>
+            Return a list of subreddits in the following format:
+            - Each subreddit should be prefixed with "r/"
+            - One subreddit per line
+            - No additional text or formatting
+            - Dont add any context or explanation, just the list of subreddits
+            </output_format>
+            """
+        )
+    )
+
+
+# Long-lived agents, reused across requests. Sized to match LLM_CONCURRENCY so the
+# pool never becomes the bottleneck; agents are built lazily or up front via warm_agent_pools().
+summary_agent_pool = AgentPool("summary_agent", _build_summary_agent, size=LLM_CONCURRENCY)
+linkedin_agent_pool = AgentPool("linkedin_post_agent", _build_linkedin_agent, size=LLM_CONCURRENCY)
+subreddit_agent_pool = AgentPool("subreddit_agent", _build_subreddit_agent, size=2)
+summary_and_linkedin_agent_pool = AgentPool("summary_and_linkedin_agent", _build_summary_and_linkedin_agent, size=LLM_CONCURRENCY)
+summary_and_linkedin_stream_agent_pool = AgentPool(
+    "summary_and_linkedin_stream_agent", functools.partial(_build_summary_and_linkedin_agent, streaming=True), size=LLM_CONCURRENCY
+)
+
+def _pools_to_warm(streaming: bool) -> tuple:
+    # Only the fused agent /linkedin is going to use
+    fused_pool = summary_and_linkedin_stream_agent_pool if streaming else summary_and_linkedin_agent_pool
+    return summary_agent_pool, linkedin_agent_pool, subreddit_agent_pool, fused_pool
+
+def warm_agent_pools(streaming: bool = True) -> None:
+    """Builds every pooled agent ahead of the first request; streaming picks the fused agent to build."""
+    for pool in _pools_to_warm(streaming):
+        pool.warm()
+
+def _import_agent_sdks() -> None:
+    import agno.agent  # noqa: F401
+    import agno.models.google  # noqa: F401
+    import agno.run.response  # noqa: F401
+
+async def warm_agent_pools_in_background(streaming: bool = True) -> None:
+    """
+    Loads the agent SDKs and builds the pooled agents in a worker thread, so the bot
+    can start answering (e.g. /reddit) before the LLM side is ready. A request that
+    needs an agent earlier simply loads and builds it on demand.
+    """
+    try:
+        await asyncio.to_thread(_import_agent_sdks)
+        for pool in _pools_to_warm(streaming):
+            await pool.warm_in_background()
+        logger.info("Agent pools warmed")
+    except Exception as e:
+        logger.error(f"Warming agent pools failed, agents will be built on first use: {e}")
+
+@timed("llm.summary", failed_if=is_error_text)
 async def get_summary_from_agno(data: dict) -> str:
     try:
         if not data:
@@ -25,55 +381,8 @@ async def get_summary_from_agno(data: dict) -> str:
             logger.error(f"Missing required fields: {missing_fields}")
             return f"Error: Missing required fields: {', '.join(missing_fields)}"
 
-        summary_agent = Agent(
-            name="summary_agent",
-            description="You are a helpful assistant that summarizes reddit posts",
-            goal="Generate a precise and concise summary of 1. reddit post and 2. comments on the post",
-            add_context=True,
-            context=data,
-            model=Gemini(
-                api_key=GEMINI_API_KEY,
-                id=MODEL,
-                grounding=True,  # Enable grounding for better context understanding
-            ),
-            system_message=dedent(
-                """
-                <persona>
-                - You are an expert copywriter specializing in creating clear, engaging summaries
-                - Your goal is to deliver maximum value with minimum words
-                - You excel at distilling complex information into easily digestible content
-                - You maintain a professional yet accessible tone
-                </persona>
-
-                <instructions>
-                - Analyze the post title, body, and comments thoroughly
-                - Create a concise summary that captures the main points and key discussions
-                - Use simple, clear language that anyone can understand
-                - Focus on the most valuable insights and takeaways
-                - Structure the summary in a logical flow
-                - Include relevant context from comments if they add value
-                </instructions>
-
-                <constraints>
-                - Keep the summary under 200 words
-                - Avoid technical jargon unless absolutely necessary
-                - Don't include redundant information
-                - Don't make assumptions beyond what's in the provided content
-                - Don't include personal opinions or biases
-                </constraints>
-
-                <output_format>
-                The summary should be structured as follows:
-                1. Main topic/theme (1-2 sentences)
-                2. Key points from the post (2-3 bullet points)
-                3. Notable insights from comments (1-2 bullet points)
-                4. Overall takeaway (1 sentence)
-                </output_format>
-                """
-            )
-        )
-        
-        response = summary_agent.run("Summarize the post")
+        async with summary_agent_pool.checkout(context=data) as summary_agent:
+            response = await run_agent(summary_agent, "Summarize the post")
         if not response or not hasattr(response, 'content'):
             logger.error("Summary generation failed - invalid response")
             return "Error: Failed to generate summary"
@@ -89,7 +398,8 @@ async def get_summary_from_agno(data: dict) -> str:
         logger.error(f"Error in get_summary_from_agno: {str(e)}")
         return f"Error: Failed to generate summary - {str(e)}"
 
-def linkedin_post_generator(data: dict) -> str:
+@timed("llm.linkedin", failed_if=is_error_text)
+async def linkedin_post_generator(data: dict) -> str:
     try:
         if not data:
             logger.error("No data provided to linkedin_post_generator")
@@ -102,58 +412,8 @@ def linkedin_post_generator(data: dict) -> str:
             logger.error(f"Missing required fields: {missing_fields}")
             return f"Error: Missing required fields: {', '.join(missing_fields)}"
 
-        linkedin_agent = Agent(
-            name="linkedin_post_agent",
-            description="You are an expert LinkedIn content creator",
-            goal="Generate an engaging and professional LinkedIn post from Reddit content",
-            add_context=True,
-            context=data,
-            model=Gemini(
-                api_key=GEMINI_API_KEY,
-                id=MODEL,
-                grounding=True,
-            ),
-            system_message=dedent(
-                """
-                <persona>
-                - You are an expert LinkedIn content creator specializing in AI and technology
-                - You excel at creating engaging, professional, and thought-provoking content
-                - You understand how to maximize engagement while maintaining professionalism
-                - You know how to adapt Reddit content for a professional LinkedIn audience
-                </persona>
-
-                <instructions>
-                - Create a LinkedIn post that's engaging and professional
-                - Use the provided summary as a base but enhance it for LinkedIn
-                - Include relevant hashtags for better visibility
-                - Add a call-to-action to encourage engagement
-                - Maintain a professional yet conversational tone
-                - Structure the post for maximum readability
-                </instructions>
-
-                <constraints>
-                - Keep the post under 300 words
-                - Use 3-5 relevant hashtags
-                - Include emojis strategically (2-3 per post)
-                - Don't use Reddit-specific language or references
-                - Don't include personal opinions or biases
-                - Don't use overly technical jargon
-                - Don't include the original Reddit URL directly
-                </constraints>
-
-                <output_format>
-                The LinkedIn post should be structured as follows:
-                1. Hook (1-2 sentences that grab attention)
-                2. Main content (2-3 paragraphs)
-                3. Key takeaways (2-3 bullet points)
-                4. Call-to-action (1 sentence)
-                5. Hashtags (3-5 relevant hashtags)
-                </output_format>
-                """
-            )
-        )
-
-        response = linkedin_agent.run("Generate a LinkedIn post")
+        async with linkedin_agent_pool.checkout(context=data) as linkedin_agent:
+            response = await run_agent(linkedin_agent, "Generate a LinkedIn post")
         if not response or not hasattr(response, 'content'):
             logger.error("LinkedIn post generation failed - invalid response")
             return "Error: Failed to generate LinkedIn post"
@@ -169,60 +429,54 @@ def linkedin_post_generator(data: dict) -> str:
         logger.error(f"Error in linkedin_post_generator: {str(e)}")
         return f"Error: Failed to generate LinkedIn post - {str(e)}"
     
-def get_relevant_subreddits(description: str) -> list:
+@timed("llm.summary_and_linkedin", failed_if=lambda result: 'error' in result)
+async def get_summary_and_linkedin_post(data: dict) -> dict:
+    """
+    Generates the summary and the LinkedIn post in a single model call.
+
+    Args:
+        data (dict): title, body, comments, original_post_url and media_url of the post
+
+    Returns:
+        dict: 'summary' and 'linkedin_post' on success, 'error' on failure
+    """
+    try:
+        if not data:
+            logger.error("No data provided to get_summary_and_linkedin_post")
+            return {'error': "Error: No data provided for LinkedIn post generation"}
+
+        # Validate required fields
+        required_fields = ['title', 'body', 'comments', 'original_post_url']
+        missing_fields = [field for field in required_fields if field not in data]
+        if missing_fields:
+            logger.error(f"Missing required fields: {missing_fields}")
+            return {'error': f"Error: Missing required fields: {', '.join(missing_fields)}"}
+
+        async with summary_and_linkedin_agent_pool.checkout(context=data) as summary_and_linkedin_agent:
+            response = await run_agent(summary_and_linkedin_agent, "Summarize the post and write a LinkedIn post")
+        if not response or not isinstance(response.content, SummaryAndLinkedInPost):
+            logger.error("Summary + LinkedIn post generation failed - invalid response")
+            return {'error': "Error: Failed to generate LinkedIn post"}
+
+        result = response.content
+        if not result.summary or not result.linkedin_post:
+            logger.error("Summary + LinkedIn post generation failed - empty content")
+            return {'error': "Error: Failed to generate LinkedIn post"}
+
+        return {'summary': result.summary, 'linkedin_post': result.linkedin_post}
+
+    except Exception as e:
+        logger.error(f"Error in get_summary_and_linkedin_post: {str(e)}")
+        return {'error': f"Error: Failed to generate LinkedIn post - {str(e)}"}
+
+async def get_relevant_subreddits(description: str) -> list:
     try:
         if not description:
             logger.error("No description provided to get_relevant_subreddits")
             return []
 
-        subreddit_agent = Agent(
-            name="subreddit_agent",
-            description="You are an expert at finding relevant subreddits",
-            goal="Generate a list of relevant subreddits based on the provided description",
-            add_context=True,
-            context={"description": description},
-            model=Gemini(
-                api_key=GEMINI_API_KEY,
-                id=MODEL,
-                grounding=True,
-            ),
-            system_message=dedent(
-                """
-                <persona>
-                - You are an expert at understanding Reddit's community structure
-                - You excel at matching content themes with appropriate subreddits
-                - You understand both popular and niche subreddit communities
-                - You can identify both direct and related subreddits
-                </persona>
-
-                <instructions>
-                - Analyze the provided description thoroughly
-                - Identify key themes, topics, and interests
-                - Suggest both popular and niche subreddits
-                - Consider both direct matches and related communities
-                - Prioritize active and well-moderated subreddits
-                </instructions>
-
-                <constraints>
-                - Return 15-20 most relevant subreddits
-                - Include a mix of popular and niche communities
-                - Don't suggest NSFW subreddits unless explicitly relevant
-                - Don't suggest inactive or poorly moderated subreddits
-                - Don't include subreddits that don't allow self-promotion
-                </constraints>
-
-                <output_format>
-                Return a list of subreddits in the following format:
-                - Each subreddit should be prefixed with "r/"
-                - One subreddit per line
-                - No additional text or formatting
-                - Dont add any context or explanation, just the list of subreddits
-                </output_format>
-                """
-            )
-        )
-        
-        response = subreddit_agent.run("Suggest relevant subreddits")
+        async with subreddit_agent_pool.checkout(context={"description": description}) as subreddit_agent:
+            response = await run_agent(subreddit_agent, "Suggest relevant subreddits")
         if not response or not hasattr(response, 'content'):
             logger.error("Subreddit suggestion failed - invalid response")
             return []
@@ -239,3 +493,92 @@ def get_relevant_subreddits(description: str) -> list:
     except Exception as e:
         logger.error(f"Error in get_relevant_subreddits: {str(e)}")
         return []
+
+async def stream_summary_from_agno(data: dict) -> AsyncIterator[str]:
+    """Streaming variant of get_summary_from_agno; yields the summary as it is generated and raises if the model fails mid-stream."""
+    if not data:
+        logger.error("No data provided to stream_summary_from_agno")
+        yield "Error: No data provided for summarization"
+        return
+
+    missing_fields = [field for field in ['title', 'body', 'comments'] if field not in data]
+    if missing_fields:
+        logger.error(f"Missing required fields: {missing_fields}")
+        yield f"Error: Missing required fields: {', '.join(missing_fields)}"
+        return
+
+    try:
+        async with summary_agent_pool.checkout(context=data) as summary_agent:
+            async for delta in stream_agent(summary_agent, "Summarize the post"):
+                yield delta
+    except Exception as e:
+        # Raised rather than yielded, so the partial text isn't mistaken for a complete summary
+        logger.error(f"Error in stream_summary_from_agno: {str(e)}")
+        raise
+
+async def stream_linkedin_post(data: dict) -> AsyncIterator[str]:
+    """Streaming variant of linkedin_post_generator; yields the post as it is generated and raises if the model fails mid-stream."""
+    if not data:
+        logger.error("No data provided to stream_linkedin_post")
+        yield "Error: No data provided for LinkedIn post generation"
+        return
+
+    missing_fields = [field for field in ['title', 'body', 'summary', 'original_post_url'] if field not in data]
+    if missing_fields:
+        logger.error(f"Missing required fields: {missing_fields}")
+        yield f"Error: Missing required fields: {', '.join(missing_fields)}"
+        return
+
+    try:
+        async with linkedin_agent_pool.checkout(context=data) as linkedin_agent:
+            async for delta in stream_agent(linkedin_agent, "Generate a LinkedIn post"):
+                yield delta
+    except Exception as e:
+        logger.error(f"Error in stream_linkedin_post: {str(e)}")
+        raise
+
+async def stream_summary_and_linkedin_post(data: dict, result: dict) -> AsyncIterator[str]:
+    """
+    Streaming variant of get_summary_and_linkedin_post: one model call writes the summary
+    and then the post, and only the post is yielded, as it is generated. The summary is
+    put in result['summary'] once the post starts; if the model leaves out
+    FUSED_POST_DELIMITER everything it wrote is yielded as the post and no summary is set.
+    Raises if the model fails mid-stream.
+
+    Args:
+        data (dict): title, body, comments, original_post_url and media_url of the post
+        result (dict): Receives the 'summary'
+    """
+    if not data:
+        logger.error("No data provided to stream_summary_and_linkedin_post")
+        yield "Error: No data provided for LinkedIn post generation"
+        return
+
+    missing_fields = [field for field in ['title', 'body', 'comments', 'original_post_url'] if field not in data]
+    if missing_fields:
+        logger.error(f"Missing required fields: {missing_fields}")
+        yield f"Error: Missing required fields: {', '.join(missing_fields)}"
+        return
+
+    buffer = ""
+    in_post = False
+    try:
+        async with summary_and_linkedin_stream_agent_pool.checkout(context=data) as agent:
+            async for delta in stream_agent(agent, "Summarize the post and write a LinkedIn post"):
+                if in_post:
+                    yield delta
+                    continue
+                buffer += delta
+                if FUSED_POST_DELIMITER in buffer:
+                    summary, post = buffer.split(FUSED_POST_DELIMITER, 1)
+                    result['summary'] = summary.strip()
+                    in_post = True
+                    if post.lstrip():
+                        yield post.lstrip()
+    except Exception as e:
+        logger.error(f"Error in stream_summary_and_linkedin_post: {str(e)}")
+        raise
+    if not in_post:
+        logger.warning("Fused output had no LinkedIn post delimiter, sending it whole as the post")
+        if buffer.strip():
+            yield buffer.strip()
@@ -0,0 +1,186 @@
+import os
+import re
+import math
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Token budgets for what we send to the model; tokens are estimated at ~4 characters each
+COMMENTS_TOKEN_BUDGET = int(os.getenv("COMMENTS_TOKEN_BUDGET", "1200"))
+BODY_TOKEN_BUDGET = int(os.getenv("BODY_TOKEN_BUDGET", "800"))
+# Cap for a single comment so one wall of text can't eat the whole budget
+MAX_COMMENT_TOKENS = int(os.getenv("MAX_COMMENT_TOKENS", "250"))
+# Comments whose word shingles overlap at least this much with an already selected one are dropped
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+CHARS_PER_TOKEN = 4
+REMOVED_BODIES = {"[deleted]", "[removed]"}
+
+# Aggregate prompt size counters, so the savings from packing are visible
+prompt_token_stats = {
+    'calls': 0,
+    'raw_tokens': 0,
+    'prompt_tokens': 0,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Truncates text to roughly max_tokens, cutting at a word boundary.
+
+    Args:
+        text (str): Text to truncate
+        max_tokens (int): Token budget
+
+    Returns:
+        str: The text, with "…" appended if it was cut
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if not text or len(text) <= max_chars:
+        return text or ""
+    cut = text.rfind(" ", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = max_chars
+    return text[:cut].rstrip() + "…"
+
+
+def _shingles(text: str) -> set:
+    words = re.sub(r"[^a-z0-9\s]", " ", text.lower()).split()
+    if len(words) < 3:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def _is_near_duplicate(shingles: set, selected: list) -> bool:
+    for other in selected:
+        union = len(shingles | other)
+        if union and len(shingles & other) / union >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+
+def comment_usefulness(comment: dict) -> float:
+    """
+    Ranks a comment: higher score helps (log-scaled), replies count less than top-level
+    comments, and very short one-liners or very long walls of text are penalised.
+
+    Args:
+        comment (dict): Comment with 'score', 'depth' and 'length'
+
+    Returns:
+        float: Usefulness, higher is better
+    """
+    score = max(comment.get('score', 0), 0)
+    length = comment.get('length', len(comment.get('body', "")))
+    if length < 40:
+        length_factor = 0.3
+    elif length > 1500:
+        length_factor = 0.6
+    elif 120 <= length <= 800:
+        length_factor = 1.2
+    else:
+        length_factor = 1.0
+    return (1.0 + math.log1p(score)) * length_factor - 0.75 * comment.get('depth', 0)
+
+
+def select_comments(comments: list, token_budget: int = COMMENTS_TOKEN_BUDGET, max_comment_tokens: int = MAX_COMMENT_TOKENS) -> list:
+    """
+    Picks the most useful comments that fit in a token budget.
+
+    Comments are ranked by comment_usefulness, removed/deleted and near-identical
+    comments are dropped, each comment is capped at max_comment_tokens, and the best
+    ones are packed until the budget is used up.
+
+    Args:
+        comments (list): Dicts with 'body', 'score', 'depth' and 'length'
+        token_budget (int): Total tokens available for comments
+        max_comment_tokens (int): Token cap for any single comment
+
+    Returns:
+        list: Selected comment texts, best first
+    """
+    selected = []
+    selected_shingles = []
+    remaining = token_budget
+
+    for comment in sorted(comments, key=comment_usefulness, reverse=True):
+        body = (comment.get('body') or "").strip()
+        if not body or body in REMOVED_BODIES:
+            continue
+
+        shingles = _shingles(body)
+        if _is_near_duplicate(shingles, selected_shingles):
+            continue
+
+        body = truncate_to_tokens(body, max_comment_tokens)
+        cost = estimate_tokens(body)
+        if cost > remaining:
+            continue
+
+        selected.append(body)
+        selected_shingles.append(shingles)
+        remaining -= cost
+        if remaining <= 0:
+            break
+
+    return selected
+
+
+def build_prompt_fields(post_data: dict, comments_token_budget: Optional[int] = None, body_token_budget: Optional[int] = None) -> dict:
+    """
+    Builds the compacted body and comments text sent to the model for a stored post.
+    Nothing is recorded; call record_prompt_tokens once the prompt is actually sent.
+
+    Args:
+        post_data (dict): Stored post data from get_hydrated_hot_post
+        comments_token_budget (Optional[int]): Overrides COMMENTS_TOKEN_BUDGET
+        body_token_budget (Optional[int]): Overrides BODY_TOKEN_BUDGET
+
+    Returns:
+        dict: 'title', 'body', 'comments', 'prompt_tokens' and 'raw_tokens' (before compaction)
+    """
+    title = post_data.get('title', "N/A")
+    raw_body = post_data.get('selftext', "") or ""
+
+    comments = post_data.get('fetched_comments')
+    if comments is None:
+        # State stored before comment metadata was kept
+        comments = [
+            {'body': text, 'score': 0, 'depth': 0, 'length': len(text)}
+            for text in post_data.get('fetched_comments_texts', [])
+        ]
+
+    body = truncate_to_tokens(raw_body, body_token_budget or BODY_TOKEN_BUDGET)
+    comments_str = "\n\n".join(select_comments(comments, comments_token_budget or COMMENTS_TOKEN_BUDGET))
+
+    raw_tokens = estimate_tokens(title) + estimate_tokens(raw_body) + sum(estimate_tokens(c.get('body', "")) for c in comments)
+    prompt_tokens = estimate_tokens(title) + estimate_tokens(body) + estimate_tokens(comments_str)
+
+    return {
+        'title': title,
+        'body': body,
+        'comments': comments_str,
+        'prompt_tokens': prompt_tokens,
+        'raw_tokens': raw_tokens,
+    }
+
+
+def record_prompt_tokens(prompt_fields: dict, post_id: Optional[str] = None) -> None:
+    """
+    Counts a prompt built by build_prompt_fields in prompt_token_stats. Call it where the
+    prompt goes to the model, not on cache hits.
+
+    Args:
+        prompt_fields (dict): Result of build_prompt_fields
+        post_id (Optional[str]): Post the prompt is for, for the log
+    """
+    prompt_token_stats['calls'] += 1
+    prompt_token_stats['raw_tokens'] += prompt_fields['raw_tokens']
+    prompt_token_stats['prompt_tokens'] += prompt_fields['prompt_tokens']
+    logger.info(f"Prompt for post {post_id}: ~{prompt_fields['prompt_tokens']} tokens (~{prompt_fields['raw_tokens']} before compaction)")
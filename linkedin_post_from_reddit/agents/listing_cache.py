@@ -0,0 +1,185 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
+
+from agents.reddit_client import fetch
+from bot_common.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 120.0
+# How long past its TTL an entry may still be served while a refresh runs in the background
+DEFAULT_STALE_SECONDS = 600.0
+DEFAULT_MAX_ENTRIES = 64
+
+
+class ListingEntry:
+    """A cached subreddit hot listing plus the validators needed to revalidate it."""
+
+    __slots__ = ('posts', 'etag', 'last_modified', 'fetched_at')
+
+    def __init__(self, posts: list, etag: Optional[str], last_modified: Optional[str], fetched_at: float):
+        self.posts = posts
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+
+class ListingCache:
+    """
+    Bounded LRU cache of subreddit hot listings.
+
+    - Fresh entries (younger than the subreddit's TTL) are served without a request.
+    - Stale entries (within the stale window) are served immediately and refreshed in the background.
+    - Expired or missing entries are fetched inline. Refreshes send If-None-Match / If-Modified-Since,
+      so an unchanged listing costs a 304 instead of a full download.
+    - Concurrent fetches of the same listing share one request.
+    """
+
+    def __init__(
+            self,
+            default_ttl: float = DEFAULT_TTL_SECONDS,
+            stale_ttl: float = DEFAULT_STALE_SECONDS,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+            subreddit_ttls: Optional[Dict[str, float]] = None
+    ):
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.subreddit_ttls = {name.lower(): ttl for name, ttl in (subreddit_ttls or {}).items()}
+        self._entries: "OrderedDict[tuple, ListingEntry]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self.stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'refreshed': 0,
+            'errors': 0,
+            'evictions': 0,
+        }
+
+    def ttl_for(self, subreddit: str) -> float:
+        return self.subreddit_ttls.get(subreddit.lower(), self.default_ttl)
+
+    def set_ttl(self, subreddit: str, ttl: float) -> None:
+        self.subreddit_ttls[subreddit.lower()] = ttl
+
+    async def get(self, subreddit: str, limit: int, timeout: Optional[float] = None) -> list:
+        """
+        Returns the hot listing for a subreddit, from cache where possible.
+
+        Args:
+            subreddit (str): Name of the subreddit
+            limit (int): Number of posts in the listing
+            timeout (Optional[float]): Per-request timeout override in seconds
+
+        Returns:
+            list: Raw post data dicts
+
+        Raises:
+            httpx.HTTPError, KeyError, TypeError, ValueError: If an inline fetch fails
+        """
+        key = (subreddit.lower(), limit)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = now - entry.fetched_at
+            ttl = self.ttl_for(subreddit)
+            if age < ttl:
+                self.stats['hits'] += 1
+                return entry.posts
+            if age < ttl + self.stale_ttl:
+                self.stats['stale_hits'] += 1
+                self._refresh(key, subreddit, limit, timeout, background=True)
+                return entry.posts
+
+        self.stats['misses'] += 1
+        return await self._refresh(key, subreddit, limit, timeout)
+
+    def _refresh(self, key: tuple, subreddit: str, limit: int, timeout: Optional[float], background: bool = False):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, subreddit, limit, timeout))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_refresh_done(key, t, background))
+        return None if background else asyncio.shield(task)
+
+    def _on_refresh_done(self, key: tuple, task: asyncio.Task, background: bool) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and background:
+            logger.warning(f"Background refresh of r/{key[0]} failed: {error}")
+
+    async def _fetch(self, key: tuple, subreddit: str, limit: int, timeout: Optional[float]) -> list:
+        entry = self._entries.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        try:
+            response = await fetch(f"/r/{subreddit}/hot.json", params={'limit': limit}, headers=headers, timeout=timeout)
+            if response.status_code == 304 and entry is not None:
+                self.stats['revalidated'] += 1
+                entry.fetched_at = time.monotonic()
+                return entry.posts
+
+            response.raise_for_status()
+            data = response.json()
+            posts = [post['data'] for post in data['data']['children'] if 'data' in post]
+        except (httpx.HTTPError, KeyError, TypeError, ValueError):
+            self.stats['errors'] += 1
+            raise
+
+        self.stats['refreshed'] += 1
+        self._store(key, ListingEntry(
+            posts=posts,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            fetched_at=time.monotonic(),
+        ))
+        return posts
+
+    def _store(self, key: tuple, entry: ListingEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate(self, subreddit: Optional[str] = None) -> None:
+        """Drops cached listings for one subreddit, or all of them."""
+        if subreddit is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == subreddit.lower()]:
+            del self._entries[key]
+
+    def get_stats(self) -> dict:
+        """
+        Returns hit/miss counters plus the current entry count and hit ratio.
+        Stale hits count as hits since they were served without waiting on Reddit.
+        """
+        lookups = self.stats['hits'] + self.stats['stale_hits'] + self.stats['misses']
+        served = self.stats['hits'] + self.stats['stale_hits']
+        return {
+            **self.stats,
+            'entries': len(self._entries),
+            'hit_ratio': served / lookups if lookups else 0.0,
+        }
+
+
+listing_cache = ListingCache()
+register_collector("listing_cache_hit_ratio", "gauge", "Share of Reddit listing lookups served from cache",
+                   lambda: listing_cache.get_stats()['hit_ratio'])
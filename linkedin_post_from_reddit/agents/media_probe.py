@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+
+from agents.reddit_client import get_reddit_client
+
+logger = logging.getLogger(__name__)
+
+# Telegram only downloads photos up to 5 MB and other files up to 20 MB when given a URL
+MAX_PHOTO_URL_BYTES = 5 * 1024 * 1024
+MAX_VIDEO_URL_BYTES = 20 * 1024 * 1024
+# Telegram can only fetch videos by URL as MP4
+VIDEO_CONTENT_TYPES = {"video/mp4"}
+
+PROBE_TIMEOUT_SECONDS = float(os.getenv("MEDIA_PROBE_TIMEOUT_SECONDS", "4"))
+PROBE_TTL_SECONDS = float(os.getenv("MEDIA_PROBE_TTL_SECONDS", "900"))
+PROBE_CACHE_MAX_ENTRIES = 512
+
+# url -> (probe result, probed_at)
+_probe_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_inflight: dict = {}
+
+
+def _content_length(response: httpx.Response) -> Optional[int]:
+    """Full size from Content-Range (ranged GET) or Content-Length (HEAD, or a GET that ignored the range)."""
+    content_range = response.headers.get('content-range', "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    content_length = response.headers.get('content-length', "")
+    if content_length.isdigit() and (response.request.method == "HEAD" or response.status_code == 200):
+        return int(content_length)
+    return None
+
+
+def _check(url: str, is_video: bool, status: int, content_type: str, size: Optional[int]) -> dict:
+    """Decides whether Telegram will accept the URL as a photo/video."""
+    result = {'url': url, 'ok': False, 'status': status, 'content_type': content_type, 'size': size, 'reason': None}
+    if status >= 400:
+        result['reason'] = f"HTTP {status}"
+    elif is_video and content_type not in VIDEO_CONTENT_TYPES:
+        result['reason'] = f"unsupported video type {content_type or 'unknown'}"
+    elif not is_video and not content_type.startswith("image/"):
+        result['reason'] = f"not an image ({content_type or 'unknown'})"
+    elif size is not None and size > (MAX_VIDEO_URL_BYTES if is_video else MAX_PHOTO_URL_BYTES):
+        result['reason'] = f"too large for Telegram ({size} bytes)"
+    else:
+        result['ok'] = True
+    return result
+
+
+async def _probe(url: str, is_video: bool) -> dict:
+    client = get_reddit_client()
+    timeout = httpx.Timeout(PROBE_TIMEOUT_SECONDS)
+    try:
+        response = await client.head(url, timeout=timeout)
+        if response.status_code in (403, 405) or (response.status_code < 400 and _content_length(response) is None):
+            # Some CDNs reject or don't size HEAD requests; ask for the first byte instead
+            async with client.stream("GET", url, headers={'Range': "bytes=0-0"}, timeout=timeout) as ranged:
+                response = ranged
+    except httpx.HTTPError as e:
+        logger.warning(f"Media probe failed for {url}: {e}")
+        # Unknown rather than bad: let Telegram try the URL itself
+        return {'url': url, 'ok': None, 'status': None, 'content_type': None, 'size': None, 'reason': str(e) or type(e).__name__}
+
+    content_type = response.headers.get('content-type', "").split(";")[0].strip().lower()
+    return _check(url, is_video, response.status_code, content_type, _content_length(response))
+
+
+async def probe_media(url: str, is_video: bool = False) -> dict:
+    """
+    Checks a media URL before it is handed to Telegram, so dead, oversized or
+    unsupported media is caught locally instead of after Telegram's own slow fetch.
+    Results are cached for PROBE_TTL_SECONDS and concurrent probes of one URL are shared.
+
+    Args:
+        url (str): Media URL, e.g. a post's 'extracted_media_url'
+        is_video (bool): Whether the URL will be sent as a video
+
+    Returns:
+        dict: 'ok' (True, False, or None if the URL couldn't be reached), 'status',
+            'content_type', 'size' and, if not ok, a 'reason'
+    """
+    key = f"{'video' if is_video else 'photo'}:{url}"
+    cached = _probe_cache.get(key)
+    if cached is not None and time.time() - cached[1] < PROBE_TTL_SECONDS:
+        _probe_cache.move_to_end(key)
+        return cached[0]
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_probe(url, is_video))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    result = await asyncio.shield(task)
+    if result['ok'] is None:
+        return result  # Transport error, don't cache
+
+    _probe_cache[key] = (result, time.time())
+    _probe_cache.move_to_end(key)
+    while len(_probe_cache) > PROBE_CACHE_MAX_ENTRIES:
+        _probe_cache.popitem(last=False)
+    if not result['ok']:
+        logger.info(f"Media {url} will not be sent: {result['reason']}")
+    return result
+
+
+def stored_probe(post_data: dict, is_video: Optional[bool] = None) -> Optional[dict]:
+    """
+    The 'media_probe' get_hydrated_hot_post stored with a post, as long as it is younger
+    than PROBE_TTL_SECONDS and conclusive; None if the media has to be probed again.
+
+    Args:
+        post_data (dict): Hydrated post data
+        is_video (Optional[bool]): How the media will be sent, if not as the post's 'is_video'
+    """
+    probe = post_data.get('media_probe')
+    if not probe or probe.get('ok') is None or probe.get('url') != post_data.get('extracted_media_url'):
+        return None
+    if is_video is not None and is_video != post_data.get('is_video', False):
+        return None
+    if time.time() - post_data.get('hydrated_at', 0) >= PROBE_TTL_SECONDS:
+        return None
+    return probe
+
+
+async def probe_post_media(posts: list) -> list:
+    """
+    Probes the media of several posts concurrently.
+
+    Args:
+        posts (list): Post data dicts with 'extracted_media_url' and 'is_video'
+
+    Returns:
+        list: Probe results in the same order, None for posts without media
+    """
+    async def probe(post: dict) -> Optional[dict]:
+        media_url = post.get('extracted_media_url')
+        if not media_url:
+            return None
+        return await probe_media(media_url, post.get('is_video', False))
+
+    return await asyncio.gather(*(probe(post) for post in posts))
@@ -0,0 +1,133 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Optional
+
+from agents.reddit_agent import get_hydrated_hot_post
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 5
+# Posts older than this are dropped instead of served; hot listings move on
+DEFAULT_MAX_AGE_SECONDS = 900.0
+DEFAULT_FILL_CONCURRENCY = 2
+
+
+class PostPrefetcher:
+    """
+    Keeps a bounded queue of fully hydrated posts (post data, comments, media URL)
+    so /reddit can answer without waiting on Reddit.
+    fill() is meant to run in the background, e.g. as a repeating JobQueue job; set
+    enabled to False when there is none, so callers don't start fills of their own.
+    """
+
+    def __init__(
+            self,
+            subreddit_names: list,
+            posts_limit_per_subreddit: int,
+            min_score: int,
+            max_comments: int = 20,
+            max_size: int = DEFAULT_QUEUE_SIZE,
+            max_age: float = DEFAULT_MAX_AGE_SECONDS,
+            fill_concurrency: int = DEFAULT_FILL_CONCURRENCY,
+            candidate_filter: Optional[Callable[[list], list]] = None
+    ):
+        self.subreddit_names = subreddit_names
+        self.posts_limit_per_subreddit = posts_limit_per_subreddit
+        self.min_score = min_score
+        self.max_comments = max_comments
+        self.max_size = max_size
+        self.max_age = max_age
+        self.fill_concurrency = fill_concurrency
+        self.candidate_filter = candidate_filter
+        self.enabled = True
+        self._queue: deque = deque()
+        self._fill_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def _is_stale(self, post: dict, now: float) -> bool:
+        return now - post.get('hydrated_at', 0) > self.max_age
+
+    def drop_stale(self) -> int:
+        """Removes expired posts from the queue and returns how many were dropped."""
+        now = time.time()
+        fresh = [post for post in self._queue if not self._is_stale(post, now)]
+        dropped = len(self._queue) - len(fresh)
+        if dropped:
+            self._queue = deque(fresh)
+            logger.info(f"Dropped {dropped} stale prefetched posts")
+        return dropped
+
+    def pop(self, exclude: Optional[Callable[[str], bool]] = None) -> dict:
+        """
+        Returns the oldest fresh prefetched post, or an empty dict if none is ready.
+
+        Args:
+            exclude (Optional[Callable[[str], bool]]): Skips posts whose id it returns True for,
+                e.g. posts this chat has already seen. Skipped posts stay queued for other chats.
+        """
+        self.drop_stale()
+        for post in self._queue:
+            if exclude is None or not exclude(post.get('id')):
+                self._queue.remove(post)
+                return dict(post)
+        return {}
+
+    def _filter_candidates(self, candidates: list) -> list:
+        # Don't hydrate a post that is already waiting in the queue
+        queued_ids = {post.get('id') for post in self._queue}
+        candidates = [post for post in candidates if post.get('id') not in queued_ids] or candidates
+        return self.candidate_filter(candidates) if self.candidate_filter else candidates
+
+    async def fill(self) -> int:
+        """
+        Tops the queue up to max_size. Concurrent calls are coalesced into one fill.
+
+        Returns:
+            int: Number of posts added
+        """
+        if self._fill_lock.locked():
+            return 0
+
+        async with self._fill_lock:
+            self.drop_stale()
+            added = 0
+            while len(self._queue) < self.max_size:
+                missing = self.max_size - len(self._queue)
+                posts = await asyncio.gather(*(
+                    get_hydrated_hot_post(
+                        subreddit_names=self.subreddit_names,
+                        posts_limit_per_subreddit=self.posts_limit_per_subreddit,
+                        min_score=self.min_score,
+                        max_comments=self.max_comments,
+                        candidate_filter=self._filter_candidates
+                    )
+                    for _ in range(min(missing, self.fill_concurrency))
+                ))
+
+                queued_ids = {post.get('id') for post in self._queue}
+                round_added = 0
+                for post in posts:
+                    if post and post.get('id') not in queued_ids and len(self._queue) < self.max_size:
+                        self._queue.append(post)
+                        queued_ids.add(post.get('id'))
+                        round_added += 1
+
+                # Nothing new came back (Reddit down or pool exhausted); try again on the next run
+                if not round_added:
+                    break
+                added += round_added
+
+            if added:
+                logger.info(f"Prefetched {added} posts, queue size is now {len(self._queue)}")
+            return added
+
+    async def prefetch_job(self, context) -> None:
+        """JobQueue callback that refills the queue."""
+        try:
+            await self.fill()
+        except Exception as e:
+            logger.error(f"Error while prefetching Reddit posts: {e}")
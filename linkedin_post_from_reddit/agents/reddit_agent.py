@@ -1,9 +1,16 @@
 import os
+import math
+import time
 import random
-import requests
+import asyncio
+import httpx
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable
 from urllib.parse import urlparse
+from agents.reddit_client import fetch_json
+from agents.listing_cache import listing_cache
+from agents.media_probe import probe_post_media
+from bot_common.metrics import timed, record_error
 
 logger = logging.getLogger(__name__)
 
@@ -46,10 +53,121 @@ def extract_media_url(post_data: dict) -> Optional[str]:
     
     return None
 
-def get_random_hot_post_direct_api(
+def build_post_data(selected_post: dict) -> dict:
+    """
+    Builds the post data dict used by the handlers from a raw Reddit listing item.
+
+    Args:
+        selected_post (dict): The 'data' field of a Reddit listing child
+
+    Returns:
+        dict: Post data including title, body, score, URL, etc.
+    """
+    return {
+        'id': selected_post['id'],
+        'title': selected_post['title'],
+        'selftext': selected_post['selftext'],
+        'subreddit': selected_post['subreddit'],
+        'score': selected_post['score'],
+        'num_comments': selected_post['num_comments'],
+        'source_url': f"https://www.reddit.com{selected_post['permalink']}",
+        'extracted_media_url': extract_media_url(selected_post),
+        'is_video': selected_post.get('is_video', False)
+    }
+
+def post_weight(post: dict) -> float:
+    """
+    Sampling weight for a candidate post. Log-scaled so a single viral post
+    doesn't crowd out everything else in the pool.
+
+    Args:
+        post (dict): Raw Reddit post data
+
+    Returns:
+        float: A positive weight based on score and comment count
+    """
+    score = max(post.get('score', 0), 0)
+    num_comments = max(post.get('num_comments', 0), 0)
+    return 1.0 + math.log1p(score) + 0.5 * math.log1p(num_comments)
+
+async def fetch_hot_listing(subreddit: str, limit: int, timeout: Optional[float] = None, use_cache: bool = True) -> list:
+    """
+    Fetches the hot listing of a single subreddit.
+
+    Args:
+        subreddit (str): Name of the subreddit
+        limit (int): Number of posts to fetch
+        timeout (Optional[float]): Per-request timeout override in seconds
+        use_cache (bool): Serve from the shared listing cache (TTL + conditional revalidation)
+
+    Returns:
+        list: Raw post data dicts, empty on error
+    """
+    try:
+        if use_cache:
+            return await listing_cache.get(subreddit, limit, timeout=timeout)
+        data = await fetch_json(f"/r/{subreddit}/hot.json", params={'limit': limit}, timeout=timeout)
+        return [post['data'] for post in data['data']['children'] if 'data' in post]
+    except httpx.HTTPError as e:
+        logger.error(f"Error fetching posts from r/{subreddit}: {str(e)}")
+        return []
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Error parsing response from r/{subreddit}: {str(e)}")
+        return []
+
+async def get_hot_post_candidates(subreddit_names: list, posts_limit_per_subreddit: int, timeout: Optional[float] = None) -> list:
+    """
+    Fetches the hot listings of all given subreddits concurrently and merges them
+    into one candidate pool. Latency is bounded by the slowest single fetch.
+
+    Args:
+        subreddit_names (list): List of subreddit names to search in
+        posts_limit_per_subreddit (int): Number of posts to fetch from each subreddit
+        timeout (Optional[float]): Per-request timeout override in seconds
+
+    Returns:
+        list: Raw post data dicts from every subreddit that responded
+    """
+    listings = await asyncio.gather(
+        *(fetch_hot_listing(name, posts_limit_per_subreddit, timeout) for name in subreddit_names)
+    )
+    candidates = []
+    seen_ids = set()
+    for listing in listings:
+        for post in listing:
+            post_id = post.get('id')
+            if post_id and post_id not in seen_ids and not post.get('stickied', False):
+                seen_ids.add(post_id)
+                candidates.append(post)
+    return candidates
+
+def select_weighted_post(candidates: list, min_score: int) -> Optional[dict]:
+    """
+    Picks a post from the candidate pool, weighted by score and comment count.
+    If nothing meets min_score, falls back to the whole pool instead of giving up.
+
+    Args:
+        candidates (list): Raw post data dicts
+        min_score (int): Minimum score preferred for a post to be considered
+
+    Returns:
+        Optional[dict]: The selected raw post data, None if the pool is empty
+    """
+    valid_posts = [post for post in candidates if post.get('score', 0) >= min_score]
+    if not valid_posts:
+        if not candidates:
+            return None
+        logger.warning(f"No candidate posts with score >= {min_score}, sampling from all {len(candidates)} candidates")
+        valid_posts = candidates
+    return random.choices(valid_posts, weights=[post_weight(post) for post in valid_posts], k=1)[0]
+
+@timed("reddit.random_post", failed_if=lambda post: not post)
+async def get_random_hot_post_direct_api(
         subreddit_names: list,
         posts_limit_per_subreddit: int,
-        min_score: int
+        min_score: int,
+        fan_out: bool = True,
+        candidate_filter: Optional[Callable[[list], list]] = None
 ) -> dict:
     """
     Fetches a random hot post from the specified subreddits that meets the minimum score requirement.
@@ -58,97 +176,154 @@ def get_random_hot_post_direct_api(
         subreddit_names (list): List of subreddit names to search in
         posts_limit_per_subreddit (int): Number of posts to fetch from each subreddit
         min_score (int): Minimum score required for a post to be considered
+        fan_out (bool): If True, fetch all subreddits concurrently and sample from the merged
+            pool weighted by score and comments. If False, query one random subreddit.
+        candidate_filter (Optional[Callable[[list], list]]): Narrows the candidate posts before
+            sampling, e.g. to drop posts that were already served (see seen_posts)
         
     Returns:
         dict: Post data including title, body, score, URL, etc.
     """
+    if fan_out:
+        candidates = await get_hot_post_candidates(subreddit_names, posts_limit_per_subreddit)
+        if candidate_filter:
+            candidates = candidate_filter(candidates)
+        selected_post = select_weighted_post(candidates, min_score)
+        if not selected_post:
+            logger.warning(f"No posts found in any of {len(subreddit_names)} subreddits")
+            return {}
+        try:
+            return build_post_data(selected_post)
+        except KeyError as e:
+            logger.error(f"Error parsing post from r/{selected_post.get('subreddit')}: {str(e)}")
+            return {}
+
     # Randomly select one subreddit from the list
     selected_subreddit = random.choice(subreddit_names)
-    
-    # Construct the Reddit API URL for hot posts
-    url = f"https://www.reddit.com/r/{selected_subreddit}/hot.json?limit={posts_limit_per_subreddit}"
-    
-    # Set up headers to mimic a browser request
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    try:
-        # Make the request to Reddit API
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        
-        # Parse the JSON response
-        data = response.json()
-        posts = data['data']['children']
-        
-        # Filter posts by minimum score
-        valid_posts = [post['data'] for post in posts if post['data']['score'] >= min_score]
-        
-        if not valid_posts:
-            logger.warning(f"No posts found in r/{selected_subreddit} with score >= {min_score}")
-            return {}
-        
-        # Select a random post from the valid posts
-        selected_post = random.choice(valid_posts)
-        
-        # Extract media URL
-        media_url = extract_media_url(selected_post)
-        
-        # Construct the post data
-        post_data = {
-            'id': selected_post['id'],
-            'title': selected_post['title'],
-            'selftext': selected_post['selftext'],
-            'subreddit': selected_post['subreddit'],
-            'score': selected_post['score'],
-            'num_comments': selected_post['num_comments'],
-            'source_url': f"https://www.reddit.com{selected_post['permalink']}",
-            'extracted_media_url': media_url,
-            'is_video': selected_post.get('is_video', False)
-        }
-        
-        return post_data
-        
-    except requests.RequestException as e:
-        logger.error(f"Error fetching posts from r/{selected_subreddit}: {str(e)}")
+    posts = await fetch_hot_listing(selected_subreddit, posts_limit_per_subreddit)
+    if candidate_filter:
+        posts = candidate_filter(posts)
+
+    # Filter posts by minimum score
+    valid_posts = [post for post in posts if post.get('score', 0) >= min_score]
+
+    if not valid_posts:
+        logger.warning(f"No posts found in r/{selected_subreddit} with score >= {min_score}")
         return {}
-    except (KeyError, ValueError) as e:
+
+    # Select a random post from the valid posts
+    selected_post = random.choice(valid_posts)
+
+    try:
+        return build_post_data(selected_post)
+    except KeyError as e:
         logger.error(f"Error parsing response from r/{selected_subreddit}: {str(e)}")
         return {}
 
-def get_post_comments(subreddit: str, post_id: str, limit: int = 20) -> list:
+def _collect_comments(children: list, depth: int, max_depth: int, comments: list) -> None:
+    for comment in children:
+        if not isinstance(comment, dict) or comment.get('kind') == 'more':
+            continue
+        data = comment.get('data') or {}
+        if 'body' not in data:
+            continue
+        comments.append({
+            'body': data['body'],
+            'score': data.get('score', 0),
+            'depth': depth,
+            'length': len(data['body']),
+        })
+        replies = data.get('replies')
+        if depth < max_depth and isinstance(replies, dict):
+            _collect_comments(replies.get('data', {}).get('children', []), depth + 1, max_depth, comments)
+
+@timed("reddit.comments")
+async def get_post_comments_detailed(subreddit: str, post_id: str, limit: int = 20, max_depth: int = 1) -> list:
     """
-    Fetches comments for a specific post.
-    
+    Fetches comments for a specific post, keeping the metadata needed to rank them.
+
     Args:
         subreddit (str): Name of the subreddit
         post_id (str): ID of the post
         limit (int): Maximum number of comments to fetch
-        
+        max_depth (int): Deepest reply level to include (0 = top-level only)
+
     Returns:
-        list: List of comment texts
+        list: Dicts with 'body', 'score', 'depth' and 'length'
     """
-    url = f"https://www.reddit.com/r/{subreddit}/comments/{post_id}.json?limit={limit}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = await fetch_json(f"/r/{subreddit}/comments/{post_id}.json", params={'limit': limit, 'depth': max_depth + 1})
         comments = []
-        
-        # Extract comments from the response
+
+        # Extract comments (and replies down to max_depth) from the response
         if len(data) > 1 and 'data' in data[1] and 'children' in data[1]['data']:
-            for comment in data[1]['data']['children']:
-                if 'data' in comment and 'body' in comment['data']:
-                    comments.append(comment['data']['body'])
-        
+            _collect_comments(data[1]['data']['children'], 0, max_depth, comments)
+
         return comments
-        
-    except (requests.RequestException, KeyError, ValueError) as e:
+
+    except (httpx.HTTPError, KeyError, TypeError, ValueError) as e:
         logger.error(f"Error fetching comments for post {post_id} in r/{subreddit}: {str(e)}")
+        record_error("reddit.comments")
         return []
+
+async def get_post_comments(subreddit: str, post_id: str, limit: int = 20) -> list:
+    """
+    Fetches comments for a specific post.
+    
+    Args:
+        subreddit (str): Name of the subreddit
+        post_id (str): ID of the post
+        limit (int): Maximum number of comments to fetch
+        
+    Returns:
+        list: List of comment texts
+    """
+    comments = await get_post_comments_detailed(subreddit, post_id, limit=limit, max_depth=0)
+    return [comment['body'] for comment in comments]
+
+async def get_hydrated_hot_post(
+        subreddit_names: list,
+        posts_limit_per_subreddit: int,
+        min_score: int,
+        max_comments: int = 20,
+        candidate_filter: Optional[Callable[[list], list]] = None
+) -> dict:
+    """
+    Fetches a random hot post together with its comments, ready to be served by /reddit.
+
+    Args:
+        subreddit_names (list): List of subreddit names to search in
+        posts_limit_per_subreddit (int): Number of posts to fetch from each subreddit
+        min_score (int): Minimum score required for a post to be considered
+        max_comments (int): Maximum number of comments to fetch
+        candidate_filter (Optional[Callable[[list], list]]): Narrows the candidate posts before sampling
+
+    Returns:
+        dict: Post data with 'fetched_comments', 'fetched_comments_texts', 'media_probe' and 'hydrated_at' set, empty on error
+    """
+    post_data = await get_random_hot_post_direct_api(
+        subreddit_names=subreddit_names,
+        posts_limit_per_subreddit=posts_limit_per_subreddit,
+        min_score=min_score,
+        candidate_filter=candidate_filter
+    )
+    if not post_data:
+        return {}
+
+    async def fetch_comments() -> list:
+        if not (post_data.get('id') and post_data.get('subreddit')):
+            return []
+        return await get_post_comments_detailed(
+            subreddit=post_data['subreddit'],
+            post_id=post_data['id'],
+            limit=max_comments
+        )
+
+    # Probe the media while the comments load, so /reddit knows up front whether Telegram can fetch it
+    comments, (media_probe,) = await asyncio.gather(fetch_comments(), probe_post_media([post_data]))
+
+    post_data['media_probe'] = media_probe
+    post_data['fetched_comments'] = comments
+    post_data['fetched_comments_texts'] = [comment['body'] for comment in comments]
+    post_data['hydrated_at'] = time.time()
+    return post_data
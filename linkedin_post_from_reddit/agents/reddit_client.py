@@ -0,0 +1,104 @@
+import os
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Overridable to point the bot at a local stand-in, e.g. for benchmarks
+REDDIT_BASE_URL = os.getenv("REDDIT_BASE_URL", "https://www.reddit.com")
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Per-request timeouts: fail fast on connect, allow a little longer for slow listings
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0)
+
+# Shared client, created lazily and closed when the Application shuts down
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_reddit_client() -> httpx.AsyncClient:
+    """
+    Returns the shared pooled HTTP client used for all Reddit requests.
+    The client is created on first use and keeps connections alive (HTTP/2 where supported).
+
+    Returns:
+        httpx.AsyncClient: The shared client
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=REDDIT_BASE_URL,
+            headers={'User-Agent': USER_AGENT},
+            timeout=DEFAULT_TIMEOUT,
+            limits=DEFAULT_LIMITS,
+            http2=True,
+            follow_redirects=True,
+        )
+        logger.info("Created shared Reddit HTTP client")
+    return _client
+
+
+async def close_reddit_client() -> None:
+    """
+    Closes the shared Reddit HTTP client and releases its pooled connections.
+    """
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Closed shared Reddit HTTP client")
+    _client = None
+
+
+async def fetch(path: str, params: Optional[dict] = None, headers: Optional[dict] = None, timeout: Optional[float] = None) -> httpx.Response:
+    """
+    Performs a GET against Reddit and returns the raw response without checking the status.
+    Used for conditional requests where a 304 is an expected outcome.
+
+    Args:
+        path (str): Path relative to https://www.reddit.com
+        params (Optional[dict]): Query string parameters
+        headers (Optional[dict]): Extra request headers, e.g. If-None-Match
+        timeout (Optional[float]): Overrides the default per-request timeout in seconds
+
+    Returns:
+        httpx.Response: The response
+
+    Raises:
+        httpx.HTTPError: On transport errors or timeouts
+    """
+    client = get_reddit_client()
+    request_timeout = httpx.Timeout(timeout) if timeout is not None else httpx.USE_CLIENT_DEFAULT
+    return await client.get(path, params=params, headers=headers, timeout=request_timeout)
+
+
+async def fetch_json(path: str, params: Optional[dict] = None, timeout: Optional[float] = None):
+    """
+    Performs a GET against Reddit and returns the decoded JSON body.
+
+    Args:
+        path (str): Path relative to https://www.reddit.com, e.g. "/r/OpenAI/hot.json"
+        params (Optional[dict]): Query string parameters
+        timeout (Optional[float]): Overrides the default per-request timeout in seconds
+
+    Returns:
+        The decoded JSON body
+
+    Raises:
+        httpx.HTTPError: On transport errors, timeouts or non-2xx status codes
+        ValueError: If the body is not valid JSON
+    """
+    response = await fetch(path, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+async def on_startup(application) -> None:
+    """Application post_init hook: warm up the shared client."""
+    get_reddit_client()
+
+
+async def on_shutdown(application) -> None:
+    """Application post_shutdown hook: close the shared client."""
+    await close_reddit_client()
@@ -0,0 +1,267 @@
+import os
+import math
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import Optional
+from bot_common.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# Set SEEN_POSTS_PATH to an empty string to keep the index in memory only
+DEFAULT_DB_PATH = os.getenv("SEEN_POSTS_PATH", "seen_posts.sqlite3") or None
+# A chat won't be shown the same post again for this long
+CHAT_TTL_SECONDS = float(os.getenv("SEEN_POSTS_CHAT_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+# Posts served to any chat are kept out of the prefetch queue and preferred less for this long
+GLOBAL_TTL_SECONDS = float(os.getenv("SEEN_POSTS_GLOBAL_TTL_SECONDS", str(6 * 60 * 60)))
+# Marks per generation before it is rotated early; sizes the filters
+GENERATION_CAPACITY = int(os.getenv("SEEN_POSTS_GENERATION_CAPACITY", "50000"))
+DEFAULT_GENERATIONS = 4
+DEFAULT_ERROR_RATE = 0.001
+
+
+class _Generation:
+    __slots__ = ('started_at', 'bits', 'count', 'dirty')
+
+    def __init__(self, started_at: float, size_bytes: int, bits: Optional[bytes] = None, count: int = 0):
+        self.started_at = started_at
+        self.bits = bytearray(bits) if bits is not None else bytearray(size_bytes)
+        self.count = count
+        self.dirty = bits is None
+
+
+class SeenPostIndex:
+    """
+    Time-expiring set of seen keys, built from a ring of Bloom filters ("generations").
+
+    New keys go into the newest generation and lookups check all of them. Once the newest
+    generation is ttl / generations old (or holds capacity keys) a fresh one is started,
+    and generations older than ttl are dropped whole, so a key is forgotten between
+    ttl * (1 - 1 / generations) and ttl after it was added. Memory is fixed at
+    generations * filter size no matter how long the bot runs; the price is a small
+    false-positive rate (error_rate per generation), i.e. a post occasionally counts
+    as seen when it wasn't.
+
+    When db_path is set the generations are written to SQLite after each change and
+    loaded back by load(), so the index survives restarts.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            ttl: float,
+            db_path: Optional[str] = DEFAULT_DB_PATH,
+            generations: int = DEFAULT_GENERATIONS,
+            capacity: int = GENERATION_CAPACITY,
+            error_rate: float = DEFAULT_ERROR_RATE
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.db_path = db_path
+        self.generations = generations
+        self.capacity = capacity
+        # Optimal Bloom filter size and hash count for capacity keys at error_rate
+        bit_count = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.size_bytes = (bit_count + 7) // 8
+        self.bit_count = self.size_bytes * 8
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self._generations: deque = deque()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loaded = db_path is None
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._generations) * self.size_bytes
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.bit_count for i in range(self.hash_count)]
+
+    def _expire(self, now: float) -> None:
+        while self._generations and now - self._generations[0].started_at > self.ttl:
+            self._generations.popleft()
+
+    def _current(self, now: float) -> _Generation:
+        self._expire(now)
+        newest = self._generations[-1] if self._generations else None
+        if newest is None or now - newest.started_at >= self.ttl / self.generations or newest.count >= self.capacity:
+            newest = _Generation(now, self.size_bytes)
+            self._generations.append(newest)
+            while len(self._generations) > self.generations:
+                self._generations.popleft()
+        return newest
+
+    def __contains__(self, key: str) -> bool:
+        self._expire(time.time())
+        if not self._generations:
+            return False
+        positions = self._positions(key)
+        return any(
+            all(generation.bits[position >> 3] & (1 << (position & 7)) for position in positions)
+            for generation in self._generations
+        )
+
+    def add(self, key: str) -> None:
+        """Marks key as seen now. Call save() to persist the change."""
+        generation = self._current(time.time())
+        for position in self._positions(key):
+            generation.bits[position >> 3] |= 1 << (position & 7)
+        generation.count += 1
+        generation.dirty = True
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_post_generations ("
+                "name TEXT NOT NULL, started_at REAL NOT NULL, count INTEGER NOT NULL, bits BLOB NOT NULL, "
+                "PRIMARY KEY (name, started_at))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _disk_load(self) -> list:
+        with self._db_lock:
+            return self._connect().execute(
+                "SELECT started_at, count, bits FROM seen_post_generations WHERE name = ? ORDER BY started_at",
+                (self.name,)
+            ).fetchall()
+
+    def _disk_save(self, rows: list, oldest_kept: float) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO seen_post_generations (name, started_at, count, bits) VALUES (?, ?, ?, ?)",
+                [(self.name, started_at, count, bits) for started_at, count, bits in rows]
+            )
+            conn.execute("DELETE FROM seen_post_generations WHERE name = ? AND started_at < ?", (self.name, oldest_kept))
+            conn.commit()
+
+    async def load(self) -> None:
+        """Loads persisted generations, merging them with anything added before the load."""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            rows = await asyncio.to_thread(self._disk_load)
+        except sqlite3.Error as e:
+            logger.error(f"Loading seen-post index {self.name} failed: {e}")
+            return
+
+        in_memory = {generation.started_at for generation in self._generations}
+        for started_at, count, bits in rows:
+            # A filter sized for another capacity can't be read with this one's hashing
+            if len(bits) == self.size_bytes and started_at not in in_memory:
+                self._generations.append(_Generation(started_at, self.size_bytes, bits, count))
+        self._generations = deque(sorted(self._generations, key=lambda generation: generation.started_at))
+        while len(self._generations) > self.generations:
+            self._generations.popleft()
+        self._expire(time.time())
+        logger.info(f"Loaded seen-post index {self.name}: {len(self._generations)} generations")
+
+    async def save(self) -> None:
+        """Writes changed generations to SQLite and drops expired ones there."""
+        if self.db_path is None:
+            return
+        await self.load()
+        dirty = [generation for generation in self._generations if generation.dirty]
+        if not dirty:
+            return
+        rows = [(generation.started_at, generation.count, bytes(generation.bits)) for generation in dirty]
+        for generation in dirty:
+            generation.dirty = False
+        oldest_kept = self._generations[0].started_at
+        try:
+            await asyncio.to_thread(self._disk_save, rows, oldest_kept)
+        except sqlite3.Error as e:
+            logger.error(f"Saving seen-post index {self.name} failed: {e}")
+            for generation in dirty:
+                generation.dirty = True
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+chat_seen_posts = SeenPostIndex("chat", CHAT_TTL_SECONDS)
+global_seen_posts = SeenPostIndex("global", GLOBAL_TTL_SECONDS)
+stats = {'marked': 0, 'excluded': 0}
+
+
+def _chat_key(chat_id, post_id: str) -> str:
+    return f"{chat_id}:{post_id}"
+
+
+def seen_in_chat(chat_id, post_id: Optional[str]) -> bool:
+    """Whether post_id was served to chat_id within the chat TTL."""
+    return bool(post_id) and _chat_key(chat_id, post_id) in chat_seen_posts
+
+
+def unseen_candidates(candidates: list, chat_id=None) -> list:
+    """
+    Filters a candidate pool (raw Reddit post dicts) down to posts worth serving: not
+    seen in this chat and not recently served anywhere. If that leaves nothing, posts
+    served elsewhere are allowed again, and if the chat has seen everything the whole
+    pool is returned rather than nothing.
+
+    Args:
+        candidates (list): Raw post data dicts
+        chat_id: Chat the post is for, None when filling the shared prefetch queue
+
+    Returns:
+        list: The filtered candidates
+    """
+    if chat_id is not None:
+        not_seen_here = [post for post in candidates if not seen_in_chat(chat_id, post.get('id'))]
+    else:
+        not_seen_here = candidates
+    fresh = [post for post in not_seen_here if post.get('id') not in global_seen_posts]
+    stats['excluded'] += len(candidates) - len(fresh)
+    if fresh:
+        return fresh
+    if not_seen_here:
+        return not_seen_here
+    if candidates:
+        logger.warning(f"Chat {chat_id} has seen all {len(candidates)} candidate posts, allowing repeats")
+    return candidates
+
+
+async def mark_served(chat_id, post_id: Optional[str]) -> None:
+    """Records that post_id was sent to chat_id, in both the chat and the global index."""
+    if not post_id:
+        return
+    await asyncio.gather(chat_seen_posts.load(), global_seen_posts.load())
+    chat_seen_posts.add(_chat_key(chat_id, post_id))
+    global_seen_posts.add(post_id)
+    stats['marked'] += 1
+    await asyncio.gather(chat_seen_posts.save(), global_seen_posts.save())
+
+
+async def on_startup(application) -> None:
+    """Application post_init hook: loads the persisted indexes before the first /reddit."""
+    await asyncio.gather(chat_seen_posts.load(), global_seen_posts.load())
+
+
+async def on_shutdown(application) -> None:
+    """Application post_shutdown hook: writes any unsaved generations and closes the database."""
+    await asyncio.gather(chat_seen_posts.save(), global_seen_posts.save())
+    for index in (chat_seen_posts, global_seen_posts):
+        await asyncio.to_thread(index.close)
+
+
+register_collector("seen_posts_marked_total", "counter", "Posts recorded as served", lambda: stats['marked'])
+register_collector("seen_posts_excluded_total", "counter", "Candidate posts skipped because they were already served",
+                   lambda: stats['excluded'])
+register_collector("seen_posts_memory_bytes", "gauge", "Memory held by the seen-post filters",
+                   lambda: {f'index="{index.name}"': index.memory_bytes for index in (chat_seen_posts, global_seen_posts)})
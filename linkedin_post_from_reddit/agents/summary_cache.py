@@ -0,0 +1,201 @@
+import os
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+from bot_common.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.sqlite3")
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_MAX_DISK_BYTES = 50 * 1024 * 1024
+# Read recency is written to disk in batches of this many keys (or with the next write) instead of per read
+ACCESS_FLUSH_BATCH = 64
+# Rows fetched at a time when evicting
+EVICTION_BATCH = 64
+
+
+def make_summary_key(post_id: Optional[str], title: str, body: str, comments: str) -> str:
+    """
+    Builds the cache key for a post: its id plus a hash of the content that goes into the prompt,
+    so an edited post or a different comment set gets a fresh summary.
+
+    Args:
+        post_id (Optional[str]): Reddit post id
+        title (str): Post title
+        body (str): Post body
+        comments (str): The comments text sent to the model
+
+    Returns:
+        str: The cache key
+    """
+    digest = hashlib.sha256()
+    for part in (title, body, comments):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\x00")
+    return f"{post_id or 'unknown'}:{digest.hexdigest()[:32]}"
+
+
+class SummaryCache:
+    """
+    Two-tier cache for generated text: an in-memory LRU in front of a SQLite table.
+    The SQLite tier survives restarts, is shared by every chat, and is trimmed by
+    least-recent access once it grows past max_disk_bytes.
+    Disk access runs in a worker thread so the event loop never blocks on SQLite.
+
+    The total size on disk is summed once when the database is opened and kept up to
+    date in memory, and read recency is buffered and written in batches, so a read is a
+    single SELECT and a write doesn't scan the table.
+    """
+
+    def __init__(
+            self,
+            db_path: Optional[str] = DEFAULT_DB_PATH,
+            memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+            max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES
+    ):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        # key -> last read time not yet written to disk
+        self._pending_access: dict = {}
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'disk_evictions': 0}
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self.db_path is None:
+            return None
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_access ON summaries(last_access)")
+            self._conn.commit()
+            self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        return self._conn
+
+    def _flush_access(self, conn: sqlite3.Connection) -> None:
+        """Writes the buffered read times; the caller holds the lock and commits."""
+        if self._pending_access:
+            conn.executemany(
+                "UPDATE summaries SET last_access = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def _remember(self, key: str, value: str) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        with self._db_lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            row = conn.execute("SELECT value FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._pending_access[key] = time.time()
+            if len(self._pending_access) >= ACCESS_FLUSH_BATCH:
+                self._flush_access(conn)
+                conn.commit()
+            return row[0]
+
+    def _disk_set(self, key: str, value: str) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            size = len(value.encode("utf-8"))
+            self._pending_access.pop(key, None)
+            replaced = conn.execute("SELECT size FROM summaries WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self._disk_bytes += size - (replaced[0] if replaced else 0)
+            if self._disk_bytes > self.max_disk_bytes:
+                # Recent reads must count before picking what to evict
+                self._flush_access(conn)
+                evicted = 0
+                while self._disk_bytes > self.max_disk_bytes:
+                    rows = conn.execute(
+                        "SELECT key, size FROM summaries WHERE key != ? ORDER BY last_access ASC LIMIT ?",
+                        (key, EVICTION_BATCH)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    for old_key, old_size in rows:
+                        if self._disk_bytes <= self.max_disk_bytes:
+                            break
+                        conn.execute("DELETE FROM summaries WHERE key = ?", (old_key,))
+                        self._disk_bytes -= old_size
+                        evicted += 1
+                self.stats['disk_evictions'] += evicted
+            else:
+                self._flush_access(conn)
+            conn.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Returns the cached value for key, or None."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats['memory_hits'] += 1
+            return self._memory[key]
+
+        try:
+            value = await asyncio.to_thread(self._disk_get, key)
+        except sqlite3.Error as e:
+            logger.error(f"Summary cache read failed: {e}")
+            value = None
+
+        if value is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['disk_hits'] += 1
+        self._remember(key, value)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        """Stores value under key in both tiers."""
+        self._remember(key, value)
+        self.stats['writes'] += 1
+        try:
+            await asyncio.to_thread(self._disk_set, key, value)
+        except sqlite3.Error as e:
+            logger.error(f"Summary cache write failed: {e}")
+
+    def get_stats(self) -> dict:
+        lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        return {
+            **self.stats,
+            'memory_entries': len(self._memory),
+            'hit_ratio': hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._flush_access(self._conn)
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+summary_cache = SummaryCache()
+register_collector("summary_cache_hit_ratio", "gauge", "Share of summary lookups served from cache",
+                   lambda: summary_cache.get_stats()['hit_ratio'])
@@ -1,11 +1,22 @@
 import os
+import sys
 import logging
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, CallbackContext
 from telegram.ext import MessageHandler, filters
 import asyncio # Keep for async handlers, not strictly needed for polling setup itself if handlers are sync
 import dotenv
-from handlers.commands import reddit_command, linkedin_command, summary_command
+# bot_common (metrics, runner, send scheduler, agent pool) is shared with the other bot at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from handlers.commands import reddit_command, linkedin_command, summary_command, stats_command, post_prefetcher
+from agents import reddit_client, seen_posts
+from agents.summary_cache import summary_cache
+from handlers.chat_state import reddit_post_store
+from handlers.media_sender import file_id_store
+from bot_common import metrics
+from agents.agno_service import warm_agent_pools_in_background
+from handlers.streaming import STREAM_LLM_OUTPUT
+from bot_common.runner import build_application, run_bot
 
 # Configure logging
 logging.basicConfig(
@@ -15,10 +26,27 @@ logger = logging.getLogger(__name__)
 dotenv.load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+# Set to 0 to disable the background prefetch job
+PREFETCH_INTERVAL_SECONDS = int(os.getenv("PREFETCH_INTERVAL_SECONDS", "60"))
     
+async def on_startup(application) -> None:
+    await reddit_client.on_startup(application)
+    await metrics.on_startup(application)
+    await seen_posts.on_startup(application)
+    # Build the long-lived agents once instead of on every request, without delaying the first update
+    application.create_task(warm_agent_pools_in_background(streaming=STREAM_LLM_OUTPUT), name="warm_agent_pools")
+
+async def on_shutdown(application) -> None:
+    await metrics.on_shutdown(application)
+    await reddit_client.on_shutdown(application)
+    await seen_posts.on_shutdown(application)
+    # Flushes the summary cache's batched read times, then closes the SQLite files
+    for store in (summary_cache, reddit_post_store, file_id_store):
+        await asyncio.to_thread(store.close)
+
 # Initialize Bot application
 if BOT_TOKEN:
-    custom_bot = ApplicationBuilder().token(BOT_TOKEN).build()
+    custom_bot = build_application(BOT_TOKEN, post_init=on_startup, post_shutdown=on_shutdown)
 else:
     logger.critical("BOT_TOKEN environment variable not set. Exiting.")
     exit()
@@ -32,8 +60,17 @@ custom_bot.add_handler(CommandHandler("start", start_command))
 custom_bot.add_handler(CommandHandler("reddit", reddit_command))
 custom_bot.add_handler(CommandHandler("summary", summary_command))
 custom_bot.add_handler(CommandHandler("linkedin", linkedin_command))
+custom_bot.add_handler(CommandHandler("stats", stats_command))
+
+# Keep a warm queue of ready-to-serve posts for /reddit
+if PREFETCH_INTERVAL_SECONDS <= 0:
+    post_prefetcher.enabled = False
+    logger.info("Post prefetching disabled; /reddit will fetch posts live.")
+elif custom_bot.job_queue:
+    custom_bot.job_queue.run_repeating(post_prefetcher.prefetch_job, interval=PREFETCH_INTERVAL_SECONDS, first=0, name="reddit_prefetch")
+else:
+    post_prefetcher.enabled = False
+    logger.warning("JobQueue not available (install python-telegram-bot[job-queue]); /reddit will fetch posts live.")
 
 if __name__ == "__main__":
-    logger.info("Starting bot with polling...")                                                                                                 
-    custom_bot.run_polling()
-    logger.info("Bot has stopped polling.")
+    run_bot(custom_bot)
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Set CHAT_STATE_PATH to a SQLite file to keep per-chat state across restarts
+DEFAULT_DB_PATH = os.getenv("CHAT_STATE_PATH") or None
+DEFAULT_MAX_ENTRIES = int(os.getenv("CHAT_STATE_MAX_ENTRIES", "10000"))
+DEFAULT_TTL_SECONDS = float(os.getenv("CHAT_STATE_TTL_SECONDS", str(24 * 60 * 60)))
+# Expired rows are purged from SQLite every this many writes
+PURGE_EVERY_WRITES = 500
+
+
+def state_key(chat_id, user_id=None) -> str:
+    """Key for one user's state in one chat; private chats and channels have no separate user."""
+    return f"{chat_id}:{user_id}" if user_id is not None else str(chat_id)
+
+
+class ChatStateStore:
+    """
+    Per-chat/per-user state (e.g. the last /reddit post) with an LRU + TTL memory bound.
+
+    Lookups are O(1) on an OrderedDict. When db_path is set, writes go through to SQLite
+    as well, so entries evicted from memory or lost on restart are loaded back on demand.
+    Values must be JSON serializable.
+    """
+
+    def __init__(
+            self,
+            db_path: Optional[str] = DEFAULT_DB_PATH,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+            ttl: float = DEFAULT_TTL_SECONDS
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self.db_path is None:
+            return None
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_state ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, updated_at FROM chat_state WHERE key = ?", (key,)).fetchone()
+            return (json.loads(row[0]), row[1]) if row else None
+
+    def _disk_set(self, key: str, value, updated_at: float) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_state (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), updated_at)
+            )
+            self._writes += 1
+            if self._writes % PURGE_EVERY_WRITES == 0:
+                conn.execute("DELETE FROM chat_state WHERE updated_at < ?", (time.time() - self.ttl,))
+            conn.commit()
+
+    def _disk_delete(self, key: str) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM chat_state WHERE key = ?", (key,))
+            conn.commit()
+
+    def _remember(self, key: str, value, updated_at: float) -> None:
+        self._memory[key] = (value, updated_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _expired(self, updated_at: float) -> bool:
+        return time.time() - updated_at > self.ttl
+
+    async def get(self, chat_id, user_id=None):
+        """Returns the stored value for the chat/user, or None if missing or expired."""
+        key = state_key(chat_id, user_id)
+        entry = self._memory.get(key)
+
+        if entry is None and self.db_path is not None:
+            try:
+                entry = await asyncio.to_thread(self._disk_get, key)
+            except (sqlite3.Error, ValueError) as e:
+                logger.error(f"Chat state read failed for {key}: {e}")
+                entry = None
+            if entry is not None:
+                self._remember(key, *entry)
+
+        if entry is None:
+            return None
+        value, updated_at = entry
+        if self._expired(updated_at):
+            await self.delete(chat_id, user_id)
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    async def set(self, chat_id, user_id, value) -> None:
+        """Stores value for the chat/user, replacing any previous value."""
+        key = state_key(chat_id, user_id)
+        updated_at = time.time()
+        self._remember(key, value, updated_at)
+        if self.db_path is not None:
+            try:
+                await asyncio.to_thread(self._disk_set, key, value, updated_at)
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.error(f"Chat state write failed for {key}: {e}")
+
+    async def delete(self, chat_id, user_id=None) -> None:
+        key = state_key(chat_id, user_id)
+        self._memory.pop(key, None)
+        if self.db_path is not None:
+            try:
+                await asyncio.to_thread(self._disk_delete, key)
+            except sqlite3.Error as e:
+                logger.error(f"Chat state delete failed for {key}: {e}")
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Last /reddit post per chat and user, read by /summary and /linkedin
+reddit_post_store = ChatStateStore()
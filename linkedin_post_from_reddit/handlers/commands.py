@@ -1,107 +1,301 @@
+import os
+import json
+import functools
 import logging
+from typing import Optional
 from telegram import Update
 from telegram.ext import CallbackContext
-from telegram.helpers import escape_markdown
-from telegram.error import BadRequest
-from agents.reddit_agent import get_random_hot_post_direct_api, get_post_comments
-from agents.agno_service import get_summary_from_agno, linkedin_post_generator
+from agents.reddit_agent import get_hydrated_hot_post
+from agents.agno_service import (
+    get_summary_from_agno, linkedin_post_generator, stream_summary_from_agno, stream_linkedin_post,
+    get_summary_and_linkedin_post, stream_summary_and_linkedin_post
+)
+from agents.post_prefetcher import PostPrefetcher
+from agents import seen_posts
+from agents.summary_cache import summary_cache, make_summary_key
+from agents.comment_selection import build_prompt_fields, record_prompt_tokens
+from agents.media_probe import stored_probe
+from handlers.streaming import reply_streaming, STREAM_LLM_OUTPUT
+from handlers.chat_state import reddit_post_store
+from handlers.media_sender import send_media
+from handlers.message_layout import plan_messages, text, raw, link, paragraph_break
+from bot_common import metrics
+from bot_common.metrics import timed, span
+
+AI_FOCUSED_SUBREDDITS = [
+    "artificial", "singularity", "MachineLearning", "LocalLLaMA",
+    "OpenAI", "StableDiffusion", "AGI", "datascience", "computervision"
+]
+DESIRED_MIN_SCORE = 50
+POSTS_LIMIT_PER_SUBREDDIT = 20
+MAX_COMMENTS_TO_FETCH = 20
+# Generate the summary and the LinkedIn post in one model call for /linkedin instead of two
+# in a row (when the summary isn't cached yet). Streamed, only the post part is shown
+FUSED_LINKEDIN_PIPELINE = os.getenv("FUSED_LINKEDIN_PIPELINE", "true").lower() == "true"
+# Telegram user ids allowed to use /stats, comma-separated
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
 
-# Global variable to store the last fetched Reddit post data
-stored_reddit_post_data = None
 logger = logging.getLogger(__name__)
 
+# Background queue of ready-to-serve posts, refilled by a repeating job (see app.py)
+post_prefetcher = PostPrefetcher(
+    subreddit_names=AI_FOCUSED_SUBREDDITS,
+    posts_limit_per_subreddit=POSTS_LIMIT_PER_SUBREDDIT,
+    min_score=DESIRED_MIN_SCORE,
+    max_comments=MAX_COMMENTS_TO_FETCH,
+    # Don't queue posts that were just served to someone
+    candidate_filter=seen_posts.unseen_candidates
+)
+metrics.register_collector("prefetch_queue_size", "gauge", "Ready-to-serve posts in the prefetch queue", lambda: len(post_prefetcher))
+
+def _chat_and_user(update: Update) -> tuple:
+    """The (chat_id, user_id) pair that per-chat state is stored under."""
+    chat_id = update.effective_chat.id if update.effective_chat else None
+    user_id = update.effective_user.id if update.effective_user else None
+    return chat_id, user_id
+
+def _summary_request(post_data: dict) -> tuple:
+    """
+    Builds the summary cache key, the agent context and the packed prompt fields (for
+    record_prompt_tokens) for a stored post.
+    """
+    # Best comments packed into a token budget, with the body truncated the same way
+    prompt_fields = build_prompt_fields(post_data)
+    title = prompt_fields['title']
+    body = prompt_fields['body']
+    comments_to_summarize_str = prompt_fields['comments']
+
+    cache_key = make_summary_key(post_data.get('id'), title, body, comments_to_summarize_str)
+    return cache_key, {
+        "title": title,
+        "body": body,
+        "comments": comments_to_summarize_str,
+        "original_post_url": post_data.get('url', "#"),
+        "media_url": post_data.get('extracted_media_url'),
+    }, prompt_fields
+
+async def _store_summary(cache_key: str, summary: str) -> None:
+    # Don't cache failures, the next call should retry
+    if summary and not summary.startswith("Error:"):
+        await summary_cache.set(cache_key, summary)
+
+async def get_post_summary(post_data: dict, request: Optional[tuple] = None) -> str:
+    """
+    Returns the summary for a stored post, from the summary cache when the same
+    post and content have been summarized before (in any chat).
+
+    Args:
+        post_data (dict): Stored post data
+        request (Optional[tuple]): The post's _summary_request, when the caller already built it
+    """
+    cache_key, summary_data, prompt_fields = request or _summary_request(post_data)
+    cached_summary = await summary_cache.get(cache_key)
+    if cached_summary is not None:
+        logger.info(f"Summary cache hit for post {post_data.get('id')}")
+        return cached_summary
+
+    record_prompt_tokens(prompt_fields, post_data.get('id'))
+    summary_from_agno : str = await get_summary_from_agno(summary_data)
+    await _store_summary(cache_key, summary_from_agno)
+    return summary_from_agno
+
+def _linkedin_request(summary_data: dict, summary: str) -> dict:
+    """The LinkedIn agent's context: the post as it went into the summary, and the summary."""
+    return {
+        "title": summary_data['title'],
+        "body": summary_data['body'],
+        "summary": summary,
+        "original_post_url": summary_data['original_post_url'],
+        "media_url": summary_data['media_url'],
+    }
+
+async def get_fused_linkedin_post(post_data: dict) -> str:
+    """
+    Returns the LinkedIn post for a stored post using one model call for both the summary
+    and the post. Both outputs are cached together; the summary is also cached on its own
+    so a later /summary is free. When the summary is already cached (an earlier /summary)
+    only the post is generated, from that summary, which is left as it is.
+    """
+    cache_key, summary_data, prompt_fields = _summary_request(post_data)
+    fused_cache_key = f"linkedin:{cache_key}"
+    cached_result = await summary_cache.get(fused_cache_key)
+    if cached_result is not None:
+        logger.info(f"LinkedIn post cache hit for post {post_data.get('id')}")
+        return json.loads(cached_result)['linkedin_post']
+
+    cached_summary = await summary_cache.get(cache_key)
+    if cached_summary is not None:
+        logger.info(f"Summary cache hit for post {post_data.get('id')}, generating only the LinkedIn post")
+        linkedin_post_text = await linkedin_post_generator(_linkedin_request(summary_data, cached_summary))
+        if not linkedin_post_text.startswith("Error:"):
+            await summary_cache.set(fused_cache_key, json.dumps({'summary': cached_summary, 'linkedin_post': linkedin_post_text}))
+        return linkedin_post_text
+
+    record_prompt_tokens(prompt_fields, post_data.get('id'))
+    result = await get_summary_and_linkedin_post(summary_data)
+    if 'error' in result:
+        return result['error']
+
+    await _store_summary(cache_key, result['summary'])
+    await summary_cache.set(fused_cache_key, json.dumps(result))
+    return result['linkedin_post']
+
+async def stream_fused_linkedin_post(message, post_data: dict) -> Optional[str]:
+    """
+    Streaming counterpart of get_fused_linkedin_post: streams the LinkedIn post into a
+    reply, from one model call writing the summary and the post, or only the post when the
+    summary is cached. Both are cached once the stream completed.
+
+    Returns:
+        Optional[str]: The cached post when there is one (nothing was sent), None once the
+            post has been streamed
+    """
+    cache_key, summary_data, prompt_fields = _summary_request(post_data)
+    fused_cache_key = f"linkedin:{cache_key}"
+    cached_result = await summary_cache.get(fused_cache_key)
+    if cached_result is not None:
+        logger.info(f"LinkedIn post cache hit for post {post_data.get('id')}")
+        return json.loads(cached_result)['linkedin_post']
+
+    result = {'summary': await summary_cache.get(cache_key)}
+    summary_was_cached = result['summary'] is not None
+    if summary_was_cached:
+        logger.info(f"Summary cache hit for post {post_data.get('id')}, generating only the LinkedIn post")
+        chunks = stream_linkedin_post(_linkedin_request(summary_data, result['summary']))
+    else:
+        record_prompt_tokens(prompt_fields, post_data.get('id'))
+        chunks = stream_summary_and_linkedin_post(summary_data, result)
+    with span("llm.linkedin_stream"):
+        linkedin_post_text, completed = await reply_streaming(message, chunks)
+
+    if completed and result['summary']:
+        if not summary_was_cached:
+            await _store_summary(cache_key, result['summary'])
+        await summary_cache.set(fused_cache_key, json.dumps({'summary': result['summary'], 'linkedin_post': linkedin_post_text}))
+    return None
+
+async def _send_planned(update: Update, segments: list, media_url, is_video: bool = False,
+                        parse_mode: Optional[str] = "MarkdownV2", log_prefix: str = "",
+                        probe: Optional[dict] = None) -> None:
+    """
+    Sends content in as few messages as possible: the media with as much as fits in its
+    caption, then the rest as text messages.
+
+    Escaping and splitting happen locally (see message_layout), so the only send that can
+    still fail is the media itself (bad URL, unsupported file, caught by the media probe
+    or rejected by Telegram); then the content is re-planned and sent as text.
+
+    Args:
+        update (Update): The update being answered
+        segments (list): Message content, see message_layout
+        media_url: Photo/video URL, or None for text only
+        is_video (bool): Send the media as a video instead of a photo
+        parse_mode (Optional[str]): "MarkdownV2" or None for plain text
+        log_prefix (str): Context for log lines
+        probe (Optional[dict]): The post's stored media probe, see media_probe.stored_probe
+    """
+    plan = plan_messages(segments, with_media=bool(media_url), parse_mode=parse_mode)
+    if plan.caption is not None:
+        sent = await send_media(update.message, media_url, is_video, caption=plan.caption, parse_mode=parse_mode, probe=probe)
+        if sent:
+            logger.info(f"{log_prefix}: Sent media {media_url} with caption and {len(plan.messages)} follow-up message(s)")
+        else:
+            logger.warning(f"{log_prefix}: Media {media_url} could not be sent. Sending text only.")
+            plan = plan_messages(segments, with_media=False, parse_mode=parse_mode)
+
+    for message_text in plan.messages:
+        await update.message.reply_text(message_text, parse_mode=parse_mode)
+
+@timed("command.linkedin")
 async def linkedin_command(update: Update, context: CallbackContext, content: object = None) -> None:
-    global stored_reddit_post_data
+    stored_reddit_post_data = await reddit_post_store.get(*_chat_and_user(update))
     if stored_reddit_post_data:
-        title = stored_reddit_post_data.get('title', "N/A")
-        body = stored_reddit_post_data.get('selftext', "")
-        original_post_url = stored_reddit_post_data.get('url', "#")
-        fetched_comments = stored_reddit_post_data.get('fetched_comments_texts', [])
         media_url = stored_reddit_post_data.get('extracted_media_url')
 
-        comments_to_summarize_str = "\n\n".join(fetched_comments[:20])
-        
-        summary_from_agno : str = await get_summary_from_agno({
-            "title": title,
-            "body": body,
-            "comments": comments_to_summarize_str,
-            "original_post_url": original_post_url,
-            "media_url": media_url,
-        })
-
-        linkedin_post_text : str = linkedin_post_generator({
-                "title": title,
-                "body": body,
-                "summary": summary_from_agno,
-                "original_post_url": original_post_url,
-                "media_url": media_url,
-            })
-
-        if media_url:
-            try:
-                logger.info(f"LinkedIn command: Attempting to send photo {media_url} with generated text as caption.")
-                await update.message.reply_photo(photo=media_url, caption=linkedin_post_text)
-                logger.info(f"LinkedIn command: Successfully sent photo with caption.")
-            except BadRequest as e_photo_caption:
-                logger.warning(f"LinkedIn command: Failed to send photo {media_url} with caption (e.g. caption too long or bad URL): {e_photo_caption}. Sending text only.")
-                await update.message.reply_text(linkedin_post_text)
-            except Exception as e:
-                logger.error(f"LinkedIn command: An unexpected error occurred while trying to send photo {media_url}: {e}. Sending text only.")
-                await update.message.reply_text(linkedin_post_text)
+        if FUSED_LINKEDIN_PIPELINE and STREAM_LLM_OUTPUT:
+            linkedin_post_text = await stream_fused_linkedin_post(update.message, stored_reddit_post_data)
+            if linkedin_post_text is None:
+                # Streamed into a text message, the media follows separately
+                if media_url:
+                    await send_media(update.message, media_url, probe=stored_probe(stored_reddit_post_data, is_video=False))
+                return
+        elif FUSED_LINKEDIN_PIPELINE:
+            linkedin_post_text : str = await get_fused_linkedin_post(stored_reddit_post_data)
         else:
-            logger.info("LinkedIn command: No media_url found in stored Reddit data. Sending text only.")
-            await update.message.reply_text(linkedin_post_text)
+            request = _summary_request(stored_reddit_post_data)
+            summary_from_agno : str = await get_post_summary(stored_reddit_post_data, request)
+            if summary_from_agno.startswith("Error:"):
+                # A post written from an error message would be nonsense
+                await update.message.reply_text(summary_from_agno)
+                return
+
+            # The post as it went into the summary, body truncated to the same token budget
+            linkedin_data = _linkedin_request(request[1], summary_from_agno)
+
+            if STREAM_LLM_OUTPUT:
+                # Stream the post into a text message, then attach the media separately
+                with span("llm.linkedin_stream"):
+                    await reply_streaming(update.message, stream_linkedin_post(linkedin_data))
+                if media_url:
+                    await send_media(update.message, media_url, probe=stored_probe(stored_reddit_post_data, is_video=False))
+                return
+
+            linkedin_post_text : str = await linkedin_post_generator(linkedin_data)
+
+        # Caption as much as fits under the photo and continue in text messages, instead of
+        # letting a long caption fail and resending everything as text
+        await _send_planned(update, [text(linkedin_post_text)], media_url, parse_mode=None, log_prefix="LinkedIn command",
+                            probe=stored_probe(stored_reddit_post_data, is_video=False))
     else:
         await update.message.reply_text("No Reddit post has been fetched yet. Use the /reddit command first.")
     
+@timed("command.summary")
 async def summary_command(update: Update, context: CallbackContext) -> None:
-    global stored_reddit_post_data
+    stored_reddit_post_data = await reddit_post_store.get(*_chat_and_user(update))
     if stored_reddit_post_data:
-        title = stored_reddit_post_data.get('title', "N/A")
-        body = stored_reddit_post_data.get('selftext', "")
-        original_post_url = stored_reddit_post_data.get('url', "#")
-        fetched_comments = stored_reddit_post_data.get('fetched_comments_texts', [])
-        media_url = stored_reddit_post_data.get('extracted_media_url')
-        
-        comments_to_summarize_str = "\n\n".join(fetched_comments[:20])
-        
-        summary_from_agno : str = await get_summary_from_agno({
-            "title": title,
-            "body": body,
-            "comments": comments_to_summarize_str,
-            "original_post_url": original_post_url,
-            "media_url": media_url,
-        })
-        
+        if STREAM_LLM_OUTPUT:
+            cache_key, summary_data, prompt_fields = _summary_request(stored_reddit_post_data)
+            cached_summary = await summary_cache.get(cache_key)
+            if cached_summary is not None:
+                await update.message.reply_text(cached_summary)
+                return
+            record_prompt_tokens(prompt_fields, stored_reddit_post_data.get('id'))
+            with span("llm.summary_stream"):
+                summary_from_agno, completed = await reply_streaming(update.message, stream_summary_from_agno(summary_data))
+            # A stream cut off mid-way ends in an error notice, it must not be served from the cache
+            if completed:
+                await _store_summary(cache_key, summary_from_agno)
+            return
+
+        summary_from_agno : str = await get_post_summary(stored_reddit_post_data)
+
         await update.message.reply_text(summary_from_agno)
     else:
         await update.message.reply_text("No Reddit post has been fetched yet. Use the /reddit command first.")
 
+@timed("command.reddit")
 async def reddit_command(update: Update, context: CallbackContext) -> None:
-    global stored_reddit_post_data
-    ai_focused_subreddits = [
-        "artificial", "singularity", "MachineLearning", "LocalLLaMA",
-        "OpenAI", "StableDiffusion", "AGI", "datascience", "computervision"
-    ]
-    desired_min_score = 50
-    max_comments_to_fetch = 20
-
-    random_ai_post_data = get_random_hot_post_direct_api(
-        subreddit_names=ai_focused_subreddits,
-        posts_limit_per_subreddit=20,
-        min_score=desired_min_score
-    )
+
+    chat_id, user_id = _chat_and_user(update)
+    # Serve a prefetched post this chat hasn't seen if one is ready, otherwise fetch one live
+    random_ai_post_data = post_prefetcher.pop(exclude=functools.partial(seen_posts.seen_in_chat, chat_id))
+    if random_ai_post_data:
+        logger.info(f"Serving prefetched post {random_ai_post_data.get('id')} ({len(post_prefetcher)} left in queue)")
+    else:
+        random_ai_post_data = await get_hydrated_hot_post(
+            subreddit_names=AI_FOCUSED_SUBREDDITS,
+            posts_limit_per_subreddit=POSTS_LIMIT_PER_SUBREDDIT,
+            min_score=DESIRED_MIN_SCORE,
+            max_comments=MAX_COMMENTS_TO_FETCH,
+            candidate_filter=functools.partial(seen_posts.unseen_candidates, chat_id=chat_id)
+        )
+    if post_prefetcher.enabled:
+        context.application.create_task(post_prefetcher.fill())
 
     if random_ai_post_data:
         post_id = random_ai_post_data.get('id')
-        subreddit_name = random_ai_post_data.get('subreddit')
-        
-        comments_texts = []
-        if post_id and subreddit_name:
-            comments_texts = get_post_comments(subreddit=subreddit_name, post_id=post_id, limit=max_comments_to_fetch)
-        
-        stored_reddit_post_data = random_ai_post_data
-        stored_reddit_post_data['fetched_comments_texts'] = comments_texts
+        await reddit_post_store.set(chat_id, user_id, random_ai_post_data)
+        await seen_posts.mark_served(chat_id, post_id)
 
         title_raw = random_ai_post_data.get('title')
         body_raw = random_ai_post_data.get('selftext')
@@ -115,83 +309,41 @@ async def reddit_command(update: Update, context: CallbackContext) -> None:
         title_raw_str = title_raw if title_raw is not None else 'No Title'
         body_raw_str = body_raw if body_raw is not None else ''
 
-        # Prepare base message components
-        subreddit_display_text_unescaped = f"r/{subreddit_raw}"
-        base_info_unescaped = f"Found a post from {subreddit_display_text_unescaped} (Score: {score}, Comments on post: {num_comments_on_post}):"
-
-        # Handle original post link for both plain text and markdown
+        # Everything is escaped locally, so the MarkdownV2 is valid by construction and
+        # long posts are split up front rather than discovered by a failed send
+        subreddit_display_text = f"r/{subreddit_raw}"
+        segments = [
+            text("Found a post from "),
+            link(subreddit_display_text, f"https://www.reddit.com/r/{subreddit_raw}"),
+            text(f" (Score: {score}, Comments on post: {num_comments_on_post}):"),
+            paragraph_break(),
+            text(title_raw_str),
+            raw("\n", "\n"),
+            text(body_raw_str if body_raw_str else "No additional text content."),
+            paragraph_break(),
+        ]
         if reddit_post_url:
-            original_post_link_unescaped = f"Original Post: {reddit_post_url}"
-            original_post_link_markdown = f"🔗[{escape_markdown('Original Post', version=2)}]({reddit_post_url})"
-        else:
-            original_post_link_unescaped = "Original Post: Not available"
-            original_post_link_markdown = escape_markdown("Original Post: Not available", version=2)
-
-        # MarkdownV2 escaped components
-        title_escaped = escape_markdown(title_raw_str, version=2)
-        body_escaped = escape_markdown(body_raw_str, version=2) if body_raw_str else "No additional text content\\."
-        subreddit_link_escaped = f"[{escape_markdown(subreddit_display_text_unescaped, version=2)}](https://www.reddit.com/r/{subreddit_raw})"
-        base_info_escaped = f"Found a post from {subreddit_link_escaped} \\(Score: {score}, Comments on post: {num_comments_on_post}\\)\\:"
-
-        plain_text_message = f"""{base_info_unescaped}
-
-{title_raw_str}
-{body_raw_str if body_raw_str else "No additional text content."}
-
-{original_post_link_unescaped}"""
-        
-        markdown_caption = f"""{base_info_escaped}
-
-{title_escaped}
-{body_escaped}
-
-{original_post_link_markdown}"""
-
-        if media_url_from_post:
-            try:
-                if is_video:
-                    logger.info(f"Attempting to send video {media_url_from_post} with MarkdownV2 caption for post {post_id}")
-                    await update.message.reply_video(video=media_url_from_post, caption=markdown_caption, parse_mode="MarkdownV2")
-                    logger.info(f"Successfully sent video with MarkdownV2 caption for post {post_id}")
-                else:
-                    logger.info(f"Attempting to send photo {media_url_from_post} with MarkdownV2 caption for post {post_id}")
-                    await update.message.reply_photo(photo=media_url_from_post, caption=markdown_caption, parse_mode="MarkdownV2")
-                    logger.info(f"Successfully sent photo with MarkdownV2 caption for post {post_id}")
-            except BadRequest as e_markdown:
-                logger.warning(f"Failed to send media with MarkdownV2 caption for post {post_id}: {e_markdown}. Trying plain text caption.")
-                plain_caption = f"""{base_info_unescaped}
-
-{title_raw_str}
-{body_raw_str if body_raw_str else "No additional text content."}
-
-{original_post_link_unescaped}"""
-                try:
-                    if is_video:
-                        await update.message.reply_video(video=media_url_from_post, caption=plain_caption)
-                    else:
-                        await update.message.reply_photo(photo=media_url_from_post, caption=plain_caption)
-                    logger.info(f"Successfully sent media with plain text caption for post {post_id}")
-                except BadRequest as e_plain_media:
-                    logger.error(f"Failed to send media with plain text caption for post {post_id}: {e_plain_media}. Falling back to text message.")
-                    try:
-                        await update.message.reply_text(markdown_caption, parse_mode="MarkdownV2")
-                        logger.info(f"Successfully sent text message (MarkdownV2) for post {post_id}")
-                    except BadRequest as e_text_markdown:
-                        logger.warning(f"Failed to send text message with MarkdownV2 for post {post_id}: {e_text_markdown}. Trying plain text.")
-                        await update.message.reply_text(plain_text_message)
-                        logger.info(f"Successfully sent text message (plain) for post {post_id}")
+            segments += [raw("🔗", "🔗"), link("Original Post", reddit_post_url)]
         else:
-            logger.info(f"No media found for post {post_id}. Sending text-only message.")
-            try:
-                await update.message.reply_text(markdown_caption, parse_mode="MarkdownV2")
-                logger.info(f"Successfully sent text-only message (MarkdownV2) for post {post_id}")
-            except BadRequest as e_text_markdown:
-                logger.warning(f"Failed to send text-only message with MarkdownV2 for post {post_id}: {e_text_markdown}. Trying plain text.")
-                await update.message.reply_text(plain_text_message)
-                logger.info(f"Successfully sent text-only message (plain) for post {post_id}")
+            segments.append(text("Original Post: Not available"))
+
+        await _send_planned(update, segments, media_url_from_post, is_video, log_prefix=f"Reddit post {post_id}",
+                            probe=stored_probe(random_ai_post_data))
 
     else:
         await update.message.reply_text(
             "Sorry, I couldn't find any relevant AI posts matching the criteria right now. "
             "Try again later or adjust the subreddits/filters."
         )
+
+async def stats_command(update: Update, context: CallbackContext) -> None:
+    """Per-stage latency, error counts, token usage and cache/queue stats, for admins only."""
+    user_id = update.effective_user.id if update.effective_user else None
+    if user_id not in ADMIN_USER_IDS:
+        logger.warning(f"/stats denied for user {user_id}")
+        await update.message.reply_text("Sorry, /stats is only available to the bot's admins.")
+        return
+
+    plan = plan_messages([text(metrics.render_stats())], with_media=False, parse_mode=None)
+    for message_text in plan.messages:
+        await update.message.reply_text(message_text)
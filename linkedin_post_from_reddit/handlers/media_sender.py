@@ -0,0 +1,97 @@
+import os
+import logging
+from typing import Optional
+from telegram import Message
+from telegram.error import BadRequest
+from agents.media_probe import probe_media
+from handlers.chat_state import ChatStateStore
+
+logger = logging.getLogger(__name__)
+
+# Set FILE_ID_CACHE_PATH to a SQLite file to reuse uploaded media across restarts
+FILE_ID_CACHE_PATH = os.getenv("FILE_ID_CACHE_PATH") or None
+FILE_ID_CACHE_MAX_ENTRIES = int(os.getenv("FILE_ID_CACHE_MAX_ENTRIES", "2000"))
+# file_ids stay valid for a long time; expire them eventually so the store stays small
+FILE_ID_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Media URL -> file_id Telegram returned the first time it fetched that URL
+file_id_store = ChatStateStore(db_path=FILE_ID_CACHE_PATH, max_entries=FILE_ID_CACHE_MAX_ENTRIES, ttl=FILE_ID_TTL_SECONDS)
+
+media_stats = {
+    'file_id_hits': 0,
+    'url_sends': 0,
+    'probe_rejections': 0,
+    'send_failures': 0,
+}
+
+
+def _file_id_of(sent: Message) -> Optional[str]:
+    """The reusable file_id of the media in a sent message (largest photo size for photos)."""
+    if sent.photo:
+        return sent.photo[-1].file_id
+    media = sent.video or sent.animation or sent.document
+    return media.file_id if media else None
+
+
+async def _reply(message: Message, media, is_video: bool, caption: Optional[str], parse_mode: Optional[str]) -> Message:
+    if is_video:
+        return await message.reply_video(video=media, caption=caption, parse_mode=parse_mode)
+    return await message.reply_photo(photo=media, caption=caption, parse_mode=parse_mode)
+
+
+async def send_media(
+        message: Message,
+        media_url: str,
+        is_video: bool = False,
+        caption: Optional[str] = None,
+        parse_mode: Optional[str] = None,
+        probe: Optional[dict] = None
+) -> Optional[Message]:
+    """
+    Replies with a photo/video, reusing Telegram's file_id when this URL was sent before.
+
+    New URLs are probed first (see media_probe), so dead, oversized or unsupported media
+    is skipped without a round trip through Telegram. A probe made while the post was
+    hydrated is used as it is instead of probing again.
+
+    Args:
+        message (Message): The message to reply to
+        media_url (str): Photo/video URL
+        is_video (bool): Send as a video instead of a photo
+        caption (Optional[str]): Caption for the media
+        parse_mode (Optional[str]): Parse mode of the caption
+        probe (Optional[dict]): Probe result for this URL, see media_probe.stored_probe
+
+    Returns:
+        Optional[Message]: The sent message, or None if the media couldn't be sent
+    """
+    cache_key = f"{'video' if is_video else 'photo'}:{media_url}"
+
+    file_id = await file_id_store.get(cache_key)
+    if file_id:
+        try:
+            sent = await _reply(message, file_id, is_video, caption, parse_mode)
+            media_stats['file_id_hits'] += 1
+            return sent
+        except BadRequest as e:
+            logger.warning(f"Cached file_id for {media_url} was rejected: {e}. Sending the URL instead.")
+            await file_id_store.delete(cache_key)
+
+    if probe is None:
+        probe = await probe_media(media_url, is_video)
+    if probe['ok'] is False:
+        media_stats['probe_rejections'] += 1
+        return None
+
+    try:
+        sent = await _reply(message, media_url, is_video, caption, parse_mode)
+    except BadRequest as e:
+        logger.warning(f"Failed to send media {media_url}: {e}")
+        media_stats['send_failures'] += 1
+        return None
+    media_stats['url_sends'] += 1
+
+    file_id = _file_id_of(sent)
+    if file_id:
+        await file_id_store.set(cache_key, None, file_id)
+    return sent
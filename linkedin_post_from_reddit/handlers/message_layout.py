@@ -0,0 +1,177 @@
+from typing import List, Optional
+from telegram.helpers import escape_markdown
+
+# Telegram limits, counted in UTF-16 code units of the text after entity parsing
+MAX_CAPTION_LENGTH = 1024
+MAX_MESSAGE_LENGTH = 4096
+
+PARAGRAPH_BREAK = "\n\n"
+# Don't start splitting a text into a chunk with less room than this; start a new chunk instead
+MIN_SPLIT_ROOM = 40
+
+
+def utf16_len(text: str) -> int:
+    """Length of text as Telegram counts it (UTF-16 code units)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+class Segment:
+    """
+    A piece of a message, kept both as the plain text Telegram will display and as its
+    MarkdownV2 source. Lengths are measured on the plain text; the markdown is what gets sent.
+    """
+
+    __slots__ = ('plain', 'markdown', 'splittable')
+
+    def __init__(self, plain: str, markdown: str, splittable: bool = False):
+        self.plain = plain
+        self.markdown = markdown
+        self.splittable = splittable
+
+    def render(self, parse_mode: Optional[str]) -> str:
+        return self.markdown if parse_mode == "MarkdownV2" else self.plain
+
+    def __repr__(self) -> str:
+        return f"Segment({self.plain!r})"
+
+
+def text(value: str) -> Segment:
+    """Plain text, escaped for MarkdownV2. Long text may be split across messages."""
+    value = value or ""
+    return Segment(value, escape_markdown(value, version=2), splittable=True)
+
+
+def raw(plain: str, markdown: str) -> Segment:
+    """Pre-formatted MarkdownV2 with its displayed text. Never split."""
+    return Segment(plain, markdown)
+
+
+def link(label: str, url: str) -> Segment:
+    """A MarkdownV2 inline link; the URL is escaped as Telegram requires inside (...)."""
+    return Segment(
+        label,
+        f"[{escape_markdown(label, version=2)}]({escape_markdown(url, version=2, entity_type='text_link')})"
+    )
+
+
+def paragraph_break() -> Segment:
+    return Segment(PARAGRAPH_BREAK, PARAGRAPH_BREAK)
+
+
+def _split_plain(value: str, limit: int) -> List[str]:
+    """Splits plain text into pieces of at most limit UTF-16 units, preferring line and word breaks."""
+    pieces = []
+    while utf16_len(value) > limit:
+        # Largest prefix that fits, then back off to a nice break point
+        end = min(len(value), limit)
+        while end > 0 and utf16_len(value[:end]) > limit:
+            end -= 1
+        cut = end
+        for separator in ("\n", " "):
+            position = value.rfind(separator, 0, end)
+            if position > end // 2:
+                cut = position + 1
+                break
+        pieces.append(value[:cut])
+        value = value[cut:]
+    if value:
+        pieces.append(value)
+    return pieces
+
+
+def layout(segments: List[Segment], first_limit: int, rest_limit: int = MAX_MESSAGE_LENGTH,
+           parse_mode: Optional[str] = "MarkdownV2") -> List[str]:
+    """
+    Packs segments into as few messages as possible without exceeding the limits.
+
+    The first chunk is held to first_limit (e.g. a media caption), the rest to rest_limit.
+    Splittable text is split at line/word boundaries before escaping, so an escape sequence
+    or a link is never cut in half, and every chunk is valid MarkdownV2 on its own.
+
+    Args:
+        segments (List[Segment]): Message content in order
+        first_limit (int): Limit for the first chunk
+        rest_limit (int): Limit for every following chunk
+        parse_mode (Optional[str]): "MarkdownV2" to render markdown, None for plain text
+
+    Returns:
+        List[str]: The rendered chunks
+    """
+    chunks: List[str] = []
+    current: List[Segment] = []
+    current_length = 0
+
+    def limit() -> int:
+        return first_limit if not chunks else rest_limit
+
+    def flush() -> None:
+        nonlocal current, current_length
+        while current and not current[-1].plain.strip():
+            current.pop()
+        if current:
+            chunks.append("".join(segment.render(parse_mode) for segment in current))
+        current = []
+        current_length = 0
+
+    pending = list(segments)
+    while pending:
+        segment = pending.pop(0)
+        if not current and not segment.plain.strip():
+            continue  # No leading whitespace/breaks in a new chunk
+        length = utf16_len(segment.plain)
+
+        if current_length + length <= limit():
+            current.append(segment)
+            current_length += length
+            continue
+
+        room = limit() - current_length
+        if segment.splittable and room >= MIN_SPLIT_ROOM:
+            # Fill the current chunk with the head of the text and carry the rest over
+            head = _split_plain(segment.plain, room)[0]
+            current.append(text(head))
+            pending.insert(0, text(segment.plain[len(head):]))
+            flush()
+        elif current:
+            flush()
+            pending.insert(0, segment)
+        else:
+            # Doesn't fit even in an empty chunk: split it hard (a huge link degrades to plain text)
+            pending[0:0] = [text(piece) for piece in _split_plain(segment.plain, limit())]
+
+    flush()
+    return chunks
+
+
+class MessagePlan:
+    """What to send for one post: an optional media caption plus follow-up text messages."""
+
+    def __init__(self, caption: Optional[str], messages: List[str], parse_mode: Optional[str]):
+        self.caption = caption
+        self.messages = messages
+        self.parse_mode = parse_mode
+
+    @property
+    def api_calls(self) -> int:
+        return (1 if self.caption is not None else 0) + len(self.messages)
+
+
+def plan_messages(segments: List[Segment], with_media: bool, parse_mode: Optional[str] = "MarkdownV2") -> MessagePlan:
+    """
+    Plans how to deliver content in the minimum number of sends.
+
+    With media, as much as fits goes into the caption and the rest follows as text
+    messages; without media everything is laid out in text messages.
+
+    Args:
+        segments (List[Segment]): Message content in order
+        with_media (bool): Whether the first send is a photo/video with a caption
+        parse_mode (Optional[str]): "MarkdownV2" or None for plain text
+
+    Returns:
+        MessagePlan: The caption (if any) and the follow-up messages
+    """
+    if with_media:
+        chunks = layout(segments, MAX_CAPTION_LENGTH, MAX_MESSAGE_LENGTH, parse_mode)
+        return MessagePlan(chunks[0] if chunks else "", chunks[1:], parse_mode)
+    return MessagePlan(None, layout(segments, MAX_MESSAGE_LENGTH, MAX_MESSAGE_LENGTH, parse_mode), parse_mode)
@@ -0,0 +1,99 @@
+import os
+import time
+import logging
+from typing import AsyncGenerator
+from telegram import Message
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Whether /summary and /linkedin stream model output into the chat as it is generated
+STREAM_LLM_OUTPUT = os.getenv("STREAM_LLM_OUTPUT", "true").lower() == "true"
+# Minimum time between edits of one message; Telegram throttles frequent edits per chat
+STREAM_EDIT_INTERVAL_SECONDS = float(os.getenv("STREAM_EDIT_INTERVAL_SECONDS", "1.5"))
+MAX_MESSAGE_LENGTH = 4096
+PLACEHOLDER_TEXT = "✍️ Writing..."
+INTERRUPTED_TEXT = "Error: The response was interrupted. Please try again."
+TYPING_CURSOR = " ▌"
+
+
+def _split_point(text: str, limit: int) -> int:
+    """Where to cut text that no longer fits in one message: the last newline or space before the limit."""
+    for separator in ("\n", " "):
+        cut = text.rfind(separator, 0, limit)
+        if cut > limit // 2:
+            return cut + 1
+    return limit
+
+
+async def reply_streaming(message: Message, chunks: AsyncGenerator[str, None], placeholder: str = PLACEHOLDER_TEXT) -> tuple:
+    """
+    Sends a placeholder reply and progressively edits it as text chunks arrive.
+
+    Edits are coalesced so each message is edited at most once per STREAM_EDIT_INTERVAL_SECONDS
+    (a RetryAfter is waited out by the send scheduler, which queues the edit again), and
+    text longer than one Telegram message continues in a new message. If chunks or an edit
+    raises, what arrived so far is kept and INTERRUPTED_TEXT is appended. chunks is always
+    closed, so the model stream and its pooled agent are released even then.
+
+    Args:
+        message (Message): The message to reply to
+        chunks (AsyncGenerator[str, None]): Text deltas, e.g. from stream_summary_from_agno
+        placeholder (str): Text shown until the first chunk arrives
+
+    Returns:
+        tuple: (text, completed). text is everything shown; completed is False when the
+            stream failed, came back empty or was an "Error: ..." message, so callers
+            know not to cache it
+    """
+    sent = await message.reply_text(placeholder)
+    text = ""
+    offset = 0  # Start of the part of text shown in the current message
+    shown = placeholder
+    next_edit_at = 0.0
+
+    async def edit(new_text: str) -> None:
+        nonlocal shown, next_edit_at
+        if not new_text.strip() or new_text == shown:
+            return
+        try:
+            await sent.edit_text(new_text)
+            shown = new_text
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+        next_edit_at = time.monotonic() + STREAM_EDIT_INTERVAL_SECONDS
+
+    async def continue_full_messages() -> None:
+        # Finish the current message and continue in a new one once it is full
+        nonlocal offset, sent, shown
+        while len(text) - offset > MAX_MESSAGE_LENGTH - len(TYPING_CURSOR):
+            cut = offset + _split_point(text[offset:], MAX_MESSAGE_LENGTH - len(TYPING_CURSOR))
+            await edit(text[offset:cut])
+            offset = cut
+            sent = await message.reply_text(placeholder)
+            shown = placeholder
+
+    completed = True
+    try:
+        try:
+            async for delta in chunks:
+                text += delta
+                await continue_full_messages()
+                if time.monotonic() >= next_edit_at:
+                    await edit(text[offset:] + TYPING_CURSOR)
+        finally:
+            # A failed edit (or a cancelled handler) would leave the generator suspended
+            # mid-stream, holding its pooled agent and LLM slot
+            await chunks.aclose()
+    except Exception as e:
+        logger.error(f"Streaming reply failed after {len(text)} characters: {e}")
+        completed = False
+        text += ("\n\n" if text.strip() else "") + INTERRUPTED_TEXT
+        await continue_full_messages()
+
+    if not text.strip():
+        text = "Error: The model returned an empty response"
+    completed = completed and not text.startswith("Error:")
+    await edit(text[offset:])
+    return text, completed
@@ -1,103 +1,182 @@
-from google import genai
-from google.genai import types
 import os
+import time
 import dotenv
 import json
-from agno.agent import Agent
-from agno.models.google import Gemini
-from agno.team import Team
-from agno.tools import googlesearch
+from typing import TYPE_CHECKING
 from pydantic import BaseModel, Field
 from textwrap import dedent
-from agno.knowledge import AgentKnowledge
-from email_service.gemini_service import email_assistant_team, EmailTeamResponse
+from bot_common.agent_pool import AgentPool
+from bot_common.genai_client import get_genai_client
+from intent_router import route_intent, GREETING, EMAIL, COMPANY_INFO, GREETING_REPLY
+from conversation_history import ConversationHistory, fit_to_budget
+from response_cache import ResponseCache
+
+# agno, google-genai and the email team are slow to import and build, so everything
+# below is created on first use through the get_* accessors instead of at import time
+if TYPE_CHECKING:
+    from agno.agent import Agent
+    from agno.team import Team
+    from gemini_service import EmailTeamResponse
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 dotenv.load_dotenv()
 
 MODEL = "gemini-2.0-flash"
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "8"))
 
-company_info_agent = Agent(
-    name="Company Info Agent",
-    description="You are a company info agent. You have to answer the user's question about the company and its services.",
-    model=Gemini(
-        api_key=GEMINI_API_KEY,
-        id=MODEL,
-        grounding=True,
-    ),
-    tools=[
-        googlesearch,
-    ],
-    role="You are a company info agent. You have to answer the user's question about the company and its services.",
-    add_name_to_instructions=True,
-    markdown=False,
-    add_history_to_messages=True,
-    read_chat_history=True,
-    goal="Seduce the user into booking a slot for a free consultation with us",
-    system_message=dedent("""
-        <|iam_goal_start|>
-        Your PRIMARY goal is to seduce the user into booking a slot for a free consultation with us.
-        Your SECONDARY goal is to provide information about the company and its services.
-        </|iam_goal_end|>
-        <|iam_instructions_start|>
-        Users will ask you some questions.
-        You MUST talk like a human, not like a robot.
-        The answers must be short and concise.
-        You can NEVER use markdown in your response.
-        You can NEVER use bold in your response.
-        You MUST refuse to answer any question that is not related to my company and its services.
-        </|iam_instructions_end|>
-        """),
-    context={
-        "company_info" : {
-            "name" : "Jovian AI",
-            "description" : "We build AI agents & AI systems for growing businesses.",
-            "capability" : "We provide custom AI solutions to EVERY problem in your business.",
-            "availability" : "We are completely booked for next 2 weeks and will not be able to take on any new projects. But if you want to book a slot you MUST book it RIGHT NOW otherwise we might run out of slots again.",
-            "time_to_complete_a_project" : "One project takes on an average of 1-2 weeks to complete.",
-            "pricing" : "There is no fixed price for a project. It depends on the complexity of the project.",
-            "contact" : "To get started you can send your email or phone number in the chat and we will get back to you.",
-        },
-        "process" : {
-            "1" : "The user can instantly book a slot for a free consultation with us.",
-            "2" : "In that call, we'll analyze their business, their problems, and their goals.",
-            "3" : "We'll then provide them with a proper document that will inform them all the ways they can use AI to solve their problems.",
-            "4" : "If they are interested in any of the solutions, we can book them in the immediate next available slot.",
-        },
+# What the company info agent knows about us; passed as its context on every run
+COMPANY_INFO_CONTEXT = {
+    "company_info" : {
+        "name" : "Jovian AI",
+        "description" : "We build AI agents & AI systems for growing businesses.",
+        "capability" : "We provide custom AI solutions to EVERY problem in your business.",
+        "availability" : "We are completely booked for next 2 weeks and will not be able to take on any new projects. But if you want to book a slot you MUST book it RIGHT NOW otherwise we might run out of slots again.",
+        "time_to_complete_a_project" : "One project takes on an average of 1-2 weeks to complete.",
+        "pricing" : "There is no fixed price for a project. It depends on the complexity of the project.",
+        "contact" : "To get started you can send your email or phone number in the chat and we will get back to you.",
+    },
+    "process" : {
+        "1" : "The user can instantly book a slot for a free consultation with us.",
+        "2" : "In that call, we'll analyze their business, their problems, and their goals.",
+        "3" : "We'll then provide them with a proper document that will inform them all the ways they can use AI to solve their problems.",
+        "4" : "If they are interested in any of the solutions, we can book them in the immediate next available slot.",
     },
-    instructions=[
-        "Always be friendly and professional.",
-        "Try to keep the conversation business casual",
-        "Answer should be short and concise.",
-        "You must answer on point without too much fluff.", 
-        "For every dead end question, you must ask another question to get the conversation flowing.",
-        "You can ask if they want to book a slot, get a free consultation, or if they have any questions about the company.",
-    ],
-)
+}
+
+def _build_company_info_agent() -> "Agent":
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+    from agno.tools import googlesearch
+    return Agent(
+        name="Company Info Agent",
+        description="You are a company info agent. You have to answer the user's question about the company and its services.",
+        model=Gemini(
+            api_key=GEMINI_API_KEY,
+            id=MODEL,
+            grounding=True,
+            client=get_genai_client(),
+        ),
+        tools=[
+            googlesearch,
+        ],
+        role="You are a company info agent. You have to answer the user's question about the company and its services.",
+        add_name_to_instructions=True,
+        markdown=False,
+        # The chat history comes in through the context, summarized and within a token budget
+        add_context=True,
+        goal="Seduce the user into booking a slot for a free consultation with us",
+        system_message=dedent("""
+            <|iam_goal_start|>
+            Your PRIMARY goal is to seduce the user into booking a slot for a free consultation with us.
+            Your SECONDARY goal is to provide information about the company and its services.
+            </|iam_goal_end|>
+            <|iam_instructions_start|>
+            Users will ask you some questions.
+            You MUST talk like a human, not like a robot.
+            The answers must be short and concise.
+            You can NEVER use markdown in your response.
+            You can NEVER use bold in your response.
+            You MUST refuse to answer any question that is not related to my company and its services.
+            </|iam_instructions_end|>
+            """),
+        context=COMPANY_INFO_CONTEXT,
+        instructions=[
+            "Always be friendly and professional.",
+            "Try to keep the conversation business casual",
+            "Answer should be short and concise.",
+            "You must answer on point without too much fluff.", 
+            "For every dead end question, you must ask another question to get the conversation flowing.",
+            "You can ask if they want to book a slot, get a free consultation, or if they have any questions about the company.",
+        ],
+    )
+
+# Answers to the company info agent's frequent questions, emptied whenever COMPANY_INFO_CONTEXT changes
+company_info_cache = ResponseCache("Company Info Agent")
+
+async def personal_assistant_team(user_request: str, history: list[dict] = None, chat_id=None) -> "EmailTeamResponse | str":
+    """
+    Answers a message with the right agent. Greetings, email requests and company questions
+    are recognized locally (see intent_router); only messages it isn't confident about pay
+    for the LLM routing call.
+
+    Agents and teams come from pools of long-lived instances, so nothing is built per message
+    and concurrent messages never share an instance; the chat history is supplied per run.
+    Frequent company questions are answered from company_info_cache.
 
-def just_chat_with_company_info_agent(user_request: str, history: list[dict] = None) -> str:
-    return company_info_agent.run(user_request).content
+    Args:
+        user_request (str): The user's message
+        history (list[dict]): Earlier messages of the chat, used when chat_id isn't given
+            (only the newest ones that fit the history token budget are sent)
+        chat_id: Chat to keep a rolling, summarized history for (see conversation_history)
 
+    Returns:
+        EmailTeamResponse | str: The email team's structured response or a text reply
+    """
+    if chat_id is not None:
+        chat_history = conversation_history.context_for(chat_id)
+    else:
+        chat_history = {'summary': "", 'recent_messages': fit_to_budget(history)}
 
+    reply = await _answer(user_request, chat_history)
 
-def personal_assistant_team(user_request: str, history: list[dict] = None) -> EmailTeamResponse | str:
-    team = Team(
+    if chat_id is not None:
+        conversation_history.add_turn(chat_id, "user", user_request)
+        conversation_history.add_turn(chat_id, "assistant", reply if isinstance(reply, str) else reply.model_dump_json())
+    return reply
+
+async def _answer(user_request: str, chat_history: dict) -> "EmailTeamResponse | str":
+    intent = route_intent(user_request)
+    if intent == GREETING:
+        return GREETING_REPLY
+    if intent == EMAIL:
+        from gemini_service import write_email
+        return await write_email(user_request, chat_history)
+    if intent == COMPANY_INFO:
+        # "how much would that cost?" means something else after a conversation, so only a
+        # chat without history uses and fills the cache
+        cacheable = not chat_history['summary'] and not chat_history['recent_messages']
+        if cacheable:
+            cached = company_info_cache.get(user_request, COMPANY_INFO_CONTEXT)
+            if cached is not None:
+                return cached
+        started = time.perf_counter()
+        async with company_info_agent_pool.checkout(context={**COMPANY_INFO_CONTEXT, 'chat_history': chat_history}) as company_info_agent:
+            response = await company_info_agent.arun(user_request)
+        if cacheable:
+            company_info_cache.put(user_request, COMPANY_INFO_CONTEXT, response.content, time.perf_counter() - started)
+        return response.content
+
+    from gemini_service import candidate_contacts, set_candidate_contacts
+    async with personal_assistant_team_pool.checkout(context={'chat_history': chat_history}) as team:
+        # The routed-to email team only sees its own context, so it gets this request's candidate contacts
+        for member in team.members:
+            if member.name == "Email Assistant Team":
+                set_candidate_contacts(member, candidate_contacts(user_request, chat_history), chat_history)
+        response = await team.arun(user_request)
+    return response.content
+
+def _build_personal_assistant_team() -> "Team":
+    from agno.models.google import Gemini
+    from agno.team import Team
+    from gemini_service import _build_email_assistant_team
+
+    # Each pooled team gets its own members, agno agents can't serve two runs at once
+    return Team(
         name="Personal Assistant Team",
         mode="route",
         model=Gemini(
             api_key=GEMINI_API_KEY,
             id=MODEL,
             grounding=False,
+            client=get_genai_client(),
         ),
         members=[
-            email_assistant_team,
-            company_info_agent
+            _build_email_assistant_team(),
+            _build_company_info_agent()
         ],
         enable_team_history=True,
         enable_user_memories=True,
-        context={
-            'chat_history': history,
-        },
+        add_context=True,
         instructions=[
             "You are my company's personal assistant.",
             "The user will be asking you a question.",
@@ -106,7 +185,7 @@ def personal_assistant_team(user_request: str, history: list[dict] = None) -> Em
             "1. Email Assistant: This agent is responsible for sending emails.",
             "2. Company Info Agent: This agent is responsible for answering questions about the company and its services.",
             "You have to stop the discussion when you think the team has reached a consensus.",
-            "Whenever someone gives a greeting message, you must say this: 'Hello! I'm Jovian from Jovian AI. We build AI agents & AI systems for growing businesses. How can I help you today?'",
+            f"Whenever someone gives a greeting message, you must say this: '{GREETING_REPLY}'",
         ],
         success_criteria="The team has reached a consensus.",
         expected_output="The request has been handled by the correct agent.",
@@ -115,10 +194,11 @@ def personal_assistant_team(user_request: str, history: list[dict] = None) -> Em
         markdown=False,
         show_members_responses=False,
     )
-    return team.run(user_request).content
 
-async def get_summary_from_agno(data: object) -> str:
-    summary_agent = Agent(
+def _build_summary_agent() -> "Agent":
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+    return Agent(
         name="Summary Agent",
         description="You are a summary agent. You have to summarize the data provided to you.",
         role="You are a summary agent. You have to summarize the data provided to you.",
@@ -127,8 +207,8 @@ async def get_summary_from_agno(data: object) -> str:
             api_key=GEMINI_API_KEY,
             id=MODEL,
             grounding=False,
+            client=get_genai_client(),
         ),
-        context=data,
         add_context=True,
         system_message=dedent("""
             <|iam_goal_start|>
@@ -150,10 +230,35 @@ async def get_summary_from_agno(data: object) -> str:
             "Just simply summarize the data provided to you.",
         ],
     )
-    return summary_agent.run('Give me a summary of the data provided to you').content
 
-def linkedin_post_generator(data: object) -> str:
-    linkedin_post_generator_agent = Agent(
+def _build_conversation_summary_agent() -> "Agent":
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+    return Agent(
+        name="Conversation Summary Agent",
+        description="You keep the running summary of a chat between a user and their personal assistant.",
+        model=Gemini(
+            api_key=GEMINI_API_KEY,
+            id=MODEL,
+            grounding=False,
+            client=get_genai_client(),
+        ),
+        add_context=True,
+        instructions=[
+            "The context holds the previous summary of the chat and the messages exchanged since.",
+            "Update the previous summary with the new messages and reply with the updated summary only.",
+            "Keep every name, email address, request, open question and decision, since later replies depend on them.",
+            "Say who asked for what: the user or the assistant.",
+            "Drop greetings and small talk.",
+            "Write short plain sentences in the third person, no headings or bullet points.",
+        ],
+    )
+
+def _build_linkedin_post_generator_agent() -> "Agent":
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+    from agno.tools import googlesearch
+    return Agent(
         name="LinkedIn Post Generator Agent",
         description="You are a LinkedIn post generator agent. You have to generate a LinkedIn post based on the data provided to you.",
         role="You are a LinkedIn post generator agent. You have to generate a LinkedIn post based on the data provided to you.",
@@ -163,8 +268,8 @@ def linkedin_post_generator(data: object) -> str:
             api_key=GEMINI_API_KEY,
             id=MODEL,
             grounding=False,
+            client=get_genai_client(),
         ),
-        context=data,
         add_context=True,
         tools=[
             googlesearch
@@ -201,4 +306,30 @@ def linkedin_post_generator(data: object) -> str:
             "Use bullet points to make the post more engaging.",
         ],
     )
-    return linkedin_post_generator_agent.run('Give me a LinkedIn post based on the data provided to you').content
\ No newline at end of file
+
+# Long-lived agents reused across requests instead of being rebuilt per call
+summary_agent_pool = AgentPool("Summary Agent", _build_summary_agent, size=AGENT_POOL_SIZE)
+linkedin_post_generator_agent_pool = AgentPool("LinkedIn Post Generator Agent", _build_linkedin_post_generator_agent, size=AGENT_POOL_SIZE)
+conversation_summary_agent_pool = AgentPool("Conversation Summary Agent", _build_conversation_summary_agent, size=AGENT_POOL_SIZE)
+company_info_agent_pool = AgentPool("Company Info Agent", _build_company_info_agent, size=AGENT_POOL_SIZE)
+personal_assistant_team_pool = AgentPool("Personal Assistant Team", _build_personal_assistant_team, size=AGENT_POOL_SIZE)
+
+async def get_summary_from_agno(data: object) -> str:
+    async with summary_agent_pool.checkout(context=data) as summary_agent:
+        response = await summary_agent.arun('Give me a summary of the data provided to you')
+    return response.content
+
+async def summarize_conversation(previous_summary: str, turns: list) -> str:
+    """Folds older chat turns into the running summary, for conversation_history."""
+    data = {'previous_summary': previous_summary, 'new_messages': turns}
+    async with conversation_summary_agent_pool.checkout(context=data) as conversation_summary_agent:
+        response = await conversation_summary_agent.arun('Update the summary of this conversation with the new messages')
+    return response.content
+
+async def linkedin_post_generator(data: object) -> str:
+    async with linkedin_post_generator_agent_pool.checkout(context=data) as linkedin_post_generator_agent:
+        response = await linkedin_post_generator_agent.arun('Give me a LinkedIn post based on the data provided to you')
+    return response.content
+
+# Rolling per-chat history for personal_assistant_team, summarized in the background
+conversation_history = ConversationHistory(summarizer=summarize_conversation)
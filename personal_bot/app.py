@@ -1,12 +1,17 @@
 import os
+import sys
 import logging
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, CallbackContext
 from telegram.ext import MessageHandler, filters
 import asyncio # Keep for async handlers, not strictly needed for polling setup itself if handlers are sync
 import dotenv
+# bot_common (metrics, runner, send scheduler, agent pool) is shared with the other bot at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from handlers.incoming_message_handler import handle_text_message, handle_audio_message
-from handlers.commands import reddit_command, linkedin_command, summary_command
+from handlers import incoming_message_handler
+from bot_common.runner import build_application, run_bot
+from bot_common import metrics
 
 # Configure logging
 logging.basicConfig(
@@ -16,10 +21,15 @@ logger = logging.getLogger(__name__)
 dotenv.load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-    
+
+
+async def on_shutdown(application) -> None:
+    await metrics.on_shutdown(application)
+    await incoming_message_handler.on_shutdown(application)
+
 # Initialize Bot application
 if BOT_TOKEN:
-    custom_bot = ApplicationBuilder().token(BOT_TOKEN).build()
+    custom_bot = build_application(BOT_TOKEN, post_init=metrics.on_startup, post_shutdown=on_shutdown)
 else:
     logger.critical("BOT_TOKEN environment variable not set. Exiting.")
     exit()
@@ -30,13 +40,8 @@ async def start_command(update: Update, context: CallbackContext) -> None:
 
 # Add handlers to the application
 custom_bot.add_handler(CommandHandler("start", start_command))
-custom_bot.add_handler(CommandHandler("reddit", reddit_command))
-custom_bot.add_handler(CommandHandler("linkedin", linkedin_command))
-custom_bot.add_handler(CommandHandler("summary", summary_command))
 custom_bot.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message))
 custom_bot.add_handler(MessageHandler(filters.AUDIO | filters.VOICE, handle_audio_message))
 
 if __name__ == "__main__":
-    logger.info("Starting bot with polling...")                                                                                                 
-    custom_bot.run_polling()
-    logger.info("Bot has stopped polling.")
+    run_bot(custom_bot)
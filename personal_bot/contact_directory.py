@@ -0,0 +1,237 @@
+import os
+import re
+import csv
+import json
+import sqlite3
+import heapq
+import logging
+import unicodedata
+from collections import Counter
+from typing import Optional
+from bot_common.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# A .json list of {"name", "email"}, a .csv with name,email columns, or a SQLite file with a
+# contacts(name, email) table; unset to use DEFAULT_CONTACTS
+CONTACTS_PATH = os.getenv("CONTACTS_PATH")
+# A contact is picked locally only above this similarity and this far ahead of the runner-up
+MATCH_THRESHOLD = float(os.getenv("CONTACT_MATCH_THRESHOLD", "0.85"))
+AMBIGUITY_MARGIN = float(os.getenv("CONTACT_AMBIGUITY_MARGIN", "0.15"))
+# Contacts at least this similar are offered to the LLM when the match is ambiguous
+CANDIDATE_THRESHOLD = 0.6
+MAX_CANDIDATES = 10
+# Keys sharing fewer trigrams than this (Dice coefficient) with a word aren't worth an edit distance
+MIN_TRIGRAM_OVERLAP = 0.3
+# Only the keys sharing the most trigrams with a word get an edit distance, bounding the cost per lookup
+MAX_KEYS_PER_TERM = 20
+# Each further word of the request matching the same contact ("John" and "Smith") adds this much
+MULTI_TERM_BONUS = 0.2
+
+DEFAULT_CONTACTS = [
+    {'name': "Sam", 'email': "sam@gmail.com"},
+    {'name': "Aaditya", 'email': "aadityajagdale.21@gmail.com"},
+    {'name': "John", 'email': "john@gmail.com"},
+]
+
+_EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Words that show up in email requests but never name anyone
+STOPWORDS = {
+    "a", "an", "the", "to", "and", "or", "of", "for", "about", "with", "that", "this", "it", "is", "be",
+    "me", "my", "him", "her", "his", "them", "their", "us", "our", "you", "your", "we", "i",
+    "send", "write", "draft", "compose", "email", "mail", "message", "note", "tell", "let", "know",
+    "reply", "ask", "remind", "please", "can", "could", "would", "will", "on", "in", "at", "by",
+    "say", "saying", "thanks", "thank", "today", "tomorrow", "meeting", "call", "quick", "follow", "up",
+}
+
+stats = {'resolved': 0, 'ambiguous': 0, 'not_found': 0}
+
+
+def normalize(text: str) -> str:
+    """Lowercase ASCII, so "José" matches "jose"."""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower().strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(first: str, second: str, min_similarity: float = 0.0) -> float:
+    """
+    Normalized Levenshtein similarity: 1.0 for equal strings, 0.0 for nothing in common.
+
+    Only the diagonal band that can still reach min_similarity is computed, and the
+    computation stops (returning 0.0) as soon as every path is below it.
+    """
+    if first == second:
+        return 1.0
+    if len(first) < len(second):
+        first, second = second, first
+    if not second:
+        return 0.0
+    max_distance = int((1.0 - min_similarity) * len(first))
+    if len(first) - len(second) > max_distance:
+        return 0.0
+    too_far = max_distance + 1
+    previous = [j if j <= max_distance else too_far for j in range(len(second) + 1)]
+    for i, first_char in enumerate(first, 1):
+        low, high = max(1, i - max_distance), min(len(second), i + max_distance)
+        current = [too_far] * (len(second) + 1)
+        if i <= max_distance:
+            current[0] = i
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (first_char != second[j - 1]))
+        if min(current[low - 1:high + 1]) > max_distance:
+            return 0.0
+        previous = current
+    distance = previous[-1]
+    return 0.0 if distance > max_distance else 1.0 - distance / len(first)
+
+
+def _keys(contact: dict) -> set:
+    """Strings a contact can be referred to by: full name, each name part, the address and its local part."""
+    name = normalize(contact.get('name', ""))
+    email = normalize(contact.get('email', ""))
+    keys = {name, email, email.split("@")[0]}
+    keys.update(_WORD_PATTERN.findall(name))
+    keys.update(part for part in re.split(r"[._+-]", email.split("@")[0]) if len(part) > 2 and not part.isdigit())
+    return {key for key in keys if key}
+
+
+class ContactDirectory:
+    """
+    Contacts indexed for fuzzy lookup by name or address.
+
+    Every distinct key (see _keys) is split into trigrams in an inverted index. For each
+    word of a request only the keys sharing the most trigrams with it get an edit distance,
+    once per key however many contacts share it ("john"), so the cost of a lookup barely
+    grows with the size of the directory.
+    """
+
+    def __init__(self, contacts: list):
+        self.contacts = [contact for contact in contacts if contact.get('email')]
+        self._by_email = {normalize(contact['email']): index for index, contact in enumerate(self.contacts)}
+        # key -> indices of the contacts it refers to
+        key_contacts: dict = {}
+        for index, contact in enumerate(self.contacts):
+            for key in _keys(contact):
+                key_contacts.setdefault(key, []).append(index)
+        self._keys = list(key_contacts)
+        self._key_contacts = [key_contacts[key] for key in self._keys]
+        self._key_trigram_counts = []
+        self._index: dict = {}
+        for key_id, key in enumerate(self._keys):
+            trigrams = _trigrams(key)
+            self._key_trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self._index.setdefault(trigram, []).append(key_id)
+
+    def __len__(self) -> int:
+        return len(self.contacts)
+
+    def _score(self, terms: list) -> dict:
+        """Similarity of each contact to the terms: its best match plus MULTI_TERM_BONUS per further matching term."""
+        best = {}
+        matched_terms = Counter()
+        for term in terms:
+            term_trigrams = _trigrams(term)
+            hits = Counter()
+            for trigram in term_trigrams:
+                hits.update(self._index.get(trigram, ()))
+            overlaps = (
+                (2 * shared / (len(term_trigrams) + self._key_trigram_counts[key_id]), key_id) for key_id, shared in hits.items()
+            )
+            term_best = {}
+            for overlap, key_id in heapq.nlargest(MAX_KEYS_PER_TERM, overlaps):
+                if overlap < MIN_TRIGRAM_OVERLAP:
+                    break
+                score = similarity(term, self._keys[key_id], CANDIDATE_THRESHOLD)
+                if score < CANDIDATE_THRESHOLD:
+                    continue
+                for index in self._key_contacts[key_id]:
+                    if score > term_best.get(index, 0.0):
+                        term_best[index] = score
+            for index, score in term_best.items():
+                if score > best.get(index, 0.0):
+                    best[index] = score
+                if score >= MATCH_THRESHOLD:
+                    matched_terms[index] += 1
+        return {index: score + MULTI_TERM_BONUS * max(0, matched_terms[index] - 1) for index, score in best.items()}
+
+    def _rank(self, text: str) -> list:
+        """(index, similarity) of the contacts the text may refer to, best first."""
+        for address in _EMAIL_PATTERN.findall(text):
+            index = self._by_email.get(normalize(address))
+            if index is not None:
+                return [(index, 1.0)]
+
+        words = [word for word in _WORD_PATTERN.findall(normalize(text)) if word not in STOPWORDS and len(word) > 1]
+        terms = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+        terms += [normalize(address).split("@")[0] for address in _EMAIL_PATTERN.findall(text)]
+        return sorted(self._score(terms).items(), key=lambda item: item[1], reverse=True)
+
+    def candidates(self, text: str) -> list:
+        """The closest contacts to the text, best first, at most MAX_CANDIDATES."""
+        return [self.contacts[index] for index, score in self._rank(text)[:MAX_CANDIDATES] if score >= CANDIDATE_THRESHOLD]
+
+    def resolve(self, text: str) -> tuple:
+        """
+        Finds the contact a request refers to.
+
+        Args:
+            text (str): The user's request, e.g. "email jon about friday"
+
+        Returns:
+            tuple: (contact, candidates). contact is the matched dict when the match is clear,
+                otherwise None and candidates holds the closest contacts (possibly none),
+                best first, for the LLM to choose from.
+        """
+        ranked = self._rank(text)
+        candidates = [self.contacts[index] for index, score in ranked[:MAX_CANDIDATES] if score >= CANDIDATE_THRESHOLD]
+        if ranked and ranked[0][1] >= MATCH_THRESHOLD:
+            runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+            if ranked[0][1] - runner_up >= AMBIGUITY_MARGIN:
+                stats['resolved'] += 1
+                return self.contacts[ranked[0][0]], candidates
+        stats['ambiguous' if candidates else 'not_found'] += 1
+        return None, candidates
+
+
+def load_contacts(path: str) -> list:
+    """
+    Reads contacts from a .json, .csv or SQLite file.
+
+    Returns:
+        list: Dicts with 'name' and 'email', empty on error
+    """
+    try:
+        if path.endswith(".json"):
+            with open(path) as f:
+                return [{'name': item.get('name', ""), 'email': item['email']} for item in json.load(f)]
+        if path.endswith(".csv"):
+            with open(path, newline="") as f:
+                return [{'name': row.get('name', ""), 'email': row['email']} for row in csv.DictReader(f)]
+        with sqlite3.connect(path) as conn:
+            return [{'name': name or "", 'email': email} for name, email in conn.execute("SELECT name, email FROM contacts")]
+    except (OSError, KeyError, ValueError, sqlite3.Error) as e:
+        logger.error(f"Loading contacts from {path} failed: {e}")
+        return []
+
+
+_directory: Optional[ContactDirectory] = None
+
+
+def get_contact_directory() -> ContactDirectory:
+    """The contact directory, loaded from CONTACTS_PATH on first use."""
+    global _directory
+    if _directory is None:
+        contacts = load_contacts(CONTACTS_PATH) if CONTACTS_PATH else DEFAULT_CONTACTS
+        _directory = ContactDirectory(contacts)
+        logger.info(f"Indexed {len(_directory)} contacts")
+    return _directory
+
+
+register_collector("contact_resolution_total", "counter", "Email recipients looked up, by outcome",
+                   lambda: {f'result="{result}"': count for result, count in stats.items()})
@@ -0,0 +1,198 @@
+import os
+import math
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from bot_common.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# Token budget for everything the history adds to a prompt (summary + recent turns);
+# tokens are estimated at ~4 characters each
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+HISTORY_SUMMARY_TOKEN_BUDGET = int(os.getenv("HISTORY_SUMMARY_TOKEN_BUDGET", "400"))
+# The most recent turns are kept verbatim, older ones are folded into the summary
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+# Folded turns are summarized in batches, one model call per batch
+HISTORY_SUMMARIZE_BATCH = int(os.getenv("HISTORY_SUMMARIZE_BATCH", "4"))
+# Cap for a single turn so one pasted wall of text can't eat the whole budget
+MAX_TURN_TOKENS = 400
+# If summarizing keeps failing, the oldest unsummarized turns are dropped past this many
+MAX_PENDING_TURNS = 40
+MAX_CHATS = int(os.getenv("HISTORY_MAX_CHATS", "5000"))
+
+CHARS_PER_TOKEN = 4
+
+stats = {
+    'summaries': 0,
+    'summary_failures': 0,
+    'dropped_turns': 0,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Truncates text to roughly max_tokens at a word boundary, appending "…" if it was cut."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if not text or len(text) <= max_chars:
+        return text or ""
+    cut = text.rfind(" ", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = max_chars
+    return text[:cut].rstrip() + "…"
+
+
+def _turn_tokens(turn: dict) -> int:
+    # Role name and separators cost a few tokens on top of the content
+    return estimate_tokens(turn.get('content', "")) + 4
+
+
+def fit_to_budget(turns: list, token_budget: int = HISTORY_TOKEN_BUDGET) -> list:
+    """
+    Keeps the newest turns of a plain history list that fit in token_budget.
+
+    Args:
+        turns (list): Dicts with 'role' and 'content', oldest first
+        token_budget (int): Token budget for the returned turns
+
+    Returns:
+        list: The newest turns that fit, oldest first, each capped at MAX_TURN_TOKENS
+    """
+    kept = []
+    used = 0
+    for turn in reversed(turns or []):
+        turn = {'role': turn.get('role', "user"), 'content': truncate_to_tokens(str(turn.get('content', "")), MAX_TURN_TOKENS)}
+        cost = _turn_tokens(turn)
+        if used + cost > token_budget:
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+class _Conversation:
+    __slots__ = ('turns', 'pending', 'summary', 'summarizing')
+
+    def __init__(self):
+        self.turns: list = []
+        self.pending: list = []
+        self.summary = ""
+        self.summarizing: Optional[asyncio.Task] = None
+
+    @property
+    def is_summarizing(self) -> bool:
+        return self.summarizing is not None and not self.summarizing.done()
+
+
+class ConversationHistory:
+    """
+    Per-chat rolling history that fits a fixed token budget.
+
+    The last keep_turns turns are kept verbatim. Older turns move to a pending list and
+    are folded into a running summary by a background task once a batch has built up,
+    so no request waits on summarization. Until then pending turns still appear verbatim
+    when there is room in the budget.
+    The least recently active chats are forgotten beyond max_chats.
+    """
+
+    def __init__(
+            self,
+            summarizer: Callable[[str, list], Awaitable[str]],
+            keep_turns: int = HISTORY_KEEP_TURNS,
+            token_budget: int = HISTORY_TOKEN_BUDGET,
+            summary_token_budget: int = HISTORY_SUMMARY_TOKEN_BUDGET,
+            summarize_batch: int = HISTORY_SUMMARIZE_BATCH,
+            max_chats: int = MAX_CHATS
+    ):
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.summary_token_budget = min(summary_token_budget, token_budget)
+        self.summarize_batch = summarize_batch
+        self.max_chats = max_chats
+        self._chats: "OrderedDict[object, _Conversation]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    def _conversation(self, chat_id) -> _Conversation:
+        conversation = self._chats.get(chat_id)
+        if conversation is None:
+            conversation = self._chats[chat_id] = _Conversation()
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(chat_id)
+        return conversation
+
+    def add_turn(self, chat_id, role: str, content: str) -> None:
+        """Appends a turn and starts a background summary once enough turns have been folded."""
+        conversation = self._conversation(chat_id)
+        conversation.turns.append({'role': role, 'content': truncate_to_tokens(content, MAX_TURN_TOKENS)})
+        while len(conversation.turns) > self.keep_turns:
+            conversation.pending.append(conversation.turns.pop(0))
+        if len(conversation.pending) > MAX_PENDING_TURNS and not conversation.is_summarizing:
+            dropped = len(conversation.pending) - MAX_PENDING_TURNS
+            del conversation.pending[:dropped]
+            stats['dropped_turns'] += dropped
+        if len(conversation.pending) >= self.summarize_batch:
+            self._schedule_summary(chat_id, conversation)
+
+    def context_for(self, chat_id) -> dict:
+        """
+        The history to send with a request for this chat, within the token budget.
+
+        Returns:
+            dict: 'summary' of the older conversation and 'recent_messages', oldest first
+        """
+        conversation = self._chats.get(chat_id)
+        if conversation is None:
+            return {'summary': "", 'recent_messages': []}
+        summary = truncate_to_tokens(conversation.summary, self.summary_token_budget)
+        recent = fit_to_budget(conversation.pending + conversation.turns, self.token_budget - estimate_tokens(summary))
+        return {'summary': summary, 'recent_messages': recent}
+
+    def _schedule_summary(self, chat_id, conversation: _Conversation) -> None:
+        if conversation.is_summarizing:
+            return  # The running task picks up the new turns when it finishes its batch
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Called outside the event loop; summarized after the next turn instead
+        conversation.summarizing = loop.create_task(self._summarize(chat_id, conversation), name=f"summarize_history_{chat_id}")
+
+    async def _summarize(self, chat_id, conversation: _Conversation) -> None:
+        while len(conversation.pending) >= self.summarize_batch:
+            batch = list(conversation.pending)
+            try:
+                summary = await self.summarizer(conversation.summary, batch)
+            except Exception as e:
+                stats['summary_failures'] += 1
+                logger.error(f"Summarizing history of chat {chat_id} failed, will retry with the next turn: {e}")
+                return
+            if not summary:
+                stats['summary_failures'] += 1
+                return
+            conversation.summary = truncate_to_tokens(summary.strip(), self.summary_token_budget)
+            # Turns added while the model was running stay pending for the next batch
+            del conversation.pending[:len(batch)]
+            stats['summaries'] += 1
+            logger.info(f"Folded {len(batch)} turns into the history summary of chat {chat_id}")
+
+    async def flush(self) -> None:
+        """Waits for running background summaries, e.g. before shutdown."""
+        tasks = [conversation.summarizing for conversation in self._chats.values() if conversation.is_summarizing]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+register_collector("history_summaries_total", "counter", "Background history summaries written", lambda: stats['summaries'])
+register_collector("history_summary_failures_total", "counter", "Background history summaries that failed",
+                   lambda: stats['summary_failures'])
+register_collector("history_dropped_turns_total", "counter", "Turns dropped unsummarized after repeated summary failures",
+                   lambda: stats['dropped_turns'])
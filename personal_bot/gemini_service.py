@@ -1,24 +1,31 @@
-from google import genai
-from google.genai import types
 import os
 import dotenv
 import json
-from agno.agent import Agent
-from agno.models.google import Gemini
-from agno.team import Team
+from typing import TYPE_CHECKING
 from pydantic import BaseModel, Field
 import asyncio
 from textwrap import dedent
+from functools import partial
+from bot_common.agent_pool import AgentPool
+from bot_common.genai_client import get_genai_client
+from bot_common.metrics import span
+from contact_directory import get_contact_directory
+
+# agno is slow to import, so the agents and the team are built on first use
+if TYPE_CHECKING:
+    from agno.agent import Agent
+    from agno.team import Team
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 dotenv.load_dotenv()
 
 MODEL = "gemini-2.0-flash"
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "8"))
 # client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
-# class EmailResponse(BaseModel):
-#     subject: str = Field(description="The subject of the email")
-#     body: str = Field(description="The body of the email")
+class EmailResponse(BaseModel):
+    subject: str = Field(description="The subject of the email")
+    body: str = Field(description="The body of the email")
 
 # class EmailVerifierResponse(BaseModel):
 #     email_exists: bool = Field(description="Whether the email exists in the list")
@@ -33,12 +40,19 @@ class EmailTeamResponse(BaseModel):
 
 
 # Factory function for Email Writer Agent
-email_writer_agent = Agent(
+def _build_email_writer_agent(response_model: type = None) -> "Agent":
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+    return Agent(
         name="Email Writer",
+        # The recipient (when the writer runs on its own) and the chat history come in through the context
+        add_context=True,
+        response_model=response_model,
         model=Gemini(
             api_key=GEMINI_API_KEY,
             id=MODEL,
             grounding=False,
+            client=get_genai_client(),
             system_prompt='''
             <Instructions>
             You are a copywriter agent for my email.
@@ -62,12 +76,17 @@ email_writer_agent = Agent(
     )
 
 # Factory function for Email Verifier Agent
-email_verifier_agent = Agent(
+def _build_email_verifier_agent() -> "Agent":
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+    return Agent(
         name="Email Verifier",
+        add_context=True,
         model=Gemini(
             api_key=GEMINI_API_KEY,
             id=MODEL,
             grounding=False,
+            client=get_genai_client(),
             system_prompt='''
             <Instructions>
             You are a email verifier agent.
@@ -92,81 +111,144 @@ email_verifier_agent = Agent(
             - You MUST NOT use [YOUR NAME] or [MY NAME] in the email or any other placeholder.
             </IMPORTANT>
             </Instructions>
-            
+
             <EMAILS>
-            [
-                {
-                    "name": "Sam",
-                    "email": "sam@gmail.com",
-                }, {
-                    "name": "Aaditya",
-                    "email": "aadityajagdale.21@gmail.com", 
-                }, {
-                    "name": "John",
-                    "email": "john@gmail.com",
-                }
-            ]
+            The list of emails is the "contacts" in the context of the task.
             </EMAILS>
             '''),
         ),
     )
 
 
-email_assistant_team = Team(
-    name="Email Assistant Team",
-    mode="collaborate",
-    model=Gemini(
-        api_key=GEMINI_API_KEY,
-        id=MODEL,
-        grounding=False,
-        generation_config={
-            "tool_config": {
-                "function_calling_config": {"mode": "NONE"}
-            }
-        }
-    ),
-    instructions=[
-        'You are a email assistant team.',
-        'You are my personal assistant and I trust your judgement.',
-        'You have 2 tasks to complete:',
-        '1. Verify if the email is present in the list of emails and return the correct email and name using the email_verifier_agent.',
-        '2. If the email is present, write the email using the email_writer_agent.',
-        'You must complete both the tasks to succeed.',
-        'If you fail to complete either of the tasks, you will be penalized.',
-        'You will be penalized by 10 points if you fail to complete either of the tasks.',
-        """
-        <IMPORTANT>
-        - YOU ARE ONLY ALLOWED TO RETURN THE EMAIL AND NAME FROM THE LIST OF EMAILS.
-        - DO NOT MAKE UP ANY PLACEHOLDERS EMAIL SUCH AS SAM@EXAMPLE.COM.
-        - DO NOT MAKE UP ANY NAME SUCH AS SAM.
-        - DO NOT MAKE UP ANY EMAILS.
-        </IMPORTANT>
-        </Instructions>
-        
-        <EMAILS>
-        [
-            {
-                "name": "Sam",
-                "email": "sam@gmail.com",
-            }, {
-                "name": "Aaditya",
-                "email": "aadityajagdale.21@gmail.com", 
-            }, {
-                "name": "John",
-                "email": "john@gmail.com",
+def _build_email_assistant_team() -> "Team":
+    from agno.models.google import Gemini
+    from agno.team import Team
+    return Team(
+        name="Email Assistant Team",
+        mode="collaborate",
+        model=Gemini(
+            api_key=GEMINI_API_KEY,
+            id=MODEL,
+            grounding=False,
+            client=get_genai_client(),
+            generation_config={
+                "tool_config": {
+                    "function_calling_config": {"mode": "NONE"}
+                }
             }
-        ]
-        </EMAILS>
+        ),
+        instructions=[
+            'You are a email assistant team.',
+            'You are my personal assistant and I trust your judgement.',
+            'You have 2 tasks to complete:',
+            '1. Verify if the email is present in the list of emails and return the correct email and name using the email_verifier_agent.',
+            '2. If the email is present, write the email using the email_writer_agent.',
+            'You must complete both the tasks to succeed.',
+            'If you fail to complete either of the tasks, you will be penalized.',
+            'You will be penalized by 10 points if you fail to complete either of the tasks.',
+            """
+            <IMPORTANT>
+            - YOU ARE ONLY ALLOWED TO RETURN THE EMAIL AND NAME FROM THE LIST OF EMAILS.
+            - DO NOT MAKE UP ANY PLACEHOLDERS EMAIL SUCH AS SAM@EXAMPLE.COM.
+            - DO NOT MAKE UP ANY NAME SUCH AS SAM.
+            - DO NOT MAKE UP ANY EMAILS.
+            </IMPORTANT>
+            </Instructions>
+
+            <EMAILS>
+            The list of emails is the "contacts" in the context. Pass them on to the email_verifier_agent.
+            </EMAILS>
             """
-    ],
-    success_criteria='Email is selected from the list of emails and the email content is written',
-    response_model=EmailTeamResponse,    
-    enable_agentic_context=True,
-    show_tool_calls=True,
-    markdown=True,
-    show_members_responses=True,
-    members=[
-        email_verifier_agent,
-        email_writer_agent,
-    ],
-)
+        ],
+        success_criteria='Email is selected from the list of emails and the email content is written',
+        response_model=EmailTeamResponse,
+        add_context=True,
+        enable_agentic_context=True,
+        show_tool_calls=True,
+        markdown=True,
+        show_members_responses=True,
+        members=[
+            _build_email_verifier_agent(),
+            _build_email_writer_agent(),
+        ],
+    )
+
+# Long-lived teams for concurrent requests; one instance serves one run at a time
+email_assistant_team_pool = AgentPool("Email Assistant Team", _build_email_assistant_team, size=AGENT_POOL_SIZE)
+# Writers that answer on their own once the recipient has been resolved locally
+email_writer_agent_pool = AgentPool("Email Writer", partial(_build_email_writer_agent, EmailResponse), size=AGENT_POOL_SIZE)
+
+
+def _has_history(chat_history: dict = None) -> bool:
+    return bool(chat_history and (chat_history.get('summary') or chat_history.get('recent_messages')))
+
+
+def _history_text(chat_history: dict) -> str:
+    return " ".join([chat_history.get('summary', "")] + [str(turn.get('content', "")) for turn in chat_history.get('recent_messages', [])])
+
+
+def candidate_contacts(user_request: str, chat_history: dict = None) -> list:
+    """
+    The contacts the email verifier has to choose from for this request: only the
+    closest matches from the contact directory, not the whole list. A request naming
+    nobody ("email him the slides") gets the contacts mentioned earlier in the chat.
+    """
+    candidates = get_contact_directory().candidates(user_request)
+    if not candidates and _has_history(chat_history):
+        candidates = get_contact_directory().candidates(_history_text(chat_history))
+    return candidates
+
+
+def set_candidate_contacts(email_assistant_team: "Team", candidates: list, chat_history: dict = None) -> None:
+    """
+    Puts the candidate contacts, and the chat history if there is one, in the context of
+    the team and of its members, which only read their own context.
+    """
+    context = {'contacts': candidates}
+    if _has_history(chat_history):
+        context['chat_history'] = chat_history
+    email_assistant_team.context = context
+    for member in email_assistant_team.members:
+        member.context = context
+
+
+async def write_email(user_request: str, chat_history: dict = None) -> "EmailTeamResponse | str":
+    """
+    Writes the email a user asked for.
+
+    The recipient is looked up in the contact directory first. When exactly one contact
+    matches, only the Email Writer runs, so the request costs one model call instead of
+    the verifier and the team. Ambiguous requests go to the Email Assistant Team with
+    just the candidate contacts to choose from.
+
+    Args:
+        user_request (str): The user's message, e.g. "email Jon that the demo moved to friday"
+        chat_history (dict): 'summary' and 'recent_messages' of the chat, so "email him
+            what we discussed" can be written
+
+    Returns:
+        EmailTeamResponse | str: The email, or a text reply when no contact matches
+    """
+    with span("contacts.resolve"):
+        contact, candidates = get_contact_directory().resolve(user_request)
+
+    if contact is not None:
+        context = {'recipient': contact}
+        if _has_history(chat_history):
+            context['chat_history'] = chat_history
+        async with email_writer_agent_pool.checkout(context=context) as email_writer:
+            response = await email_writer.arun(user_request)
+        email = response.content
+        if isinstance(email, EmailResponse):
+            return EmailTeamResponse(user_email=contact['email'], user_name=contact['name'], subject=email.subject, body=email.body)
+        return str(email)
+
+    if not candidates:
+        candidates = candidate_contacts(user_request, chat_history)
+    if not candidates:
+        return "I couldn't find anyone in your contacts matching that request. Who should the email go to?"
+
+    async with email_assistant_team_pool.checkout() as email_assistant_team:
+        set_candidate_contacts(email_assistant_team, candidates, chat_history)
+        response = await email_assistant_team.arun(user_request)
+    return response.content
@@ -0,0 +1,191 @@
+import os
+import time
+import logging
+import asyncio
+import tempfile
+from typing import BinaryIO, Optional
+import httpx
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import CallbackContext
+from agent import personal_assistant_team
+from transcription import get_transcriber
+from bot_common.metrics import timed, span, observe, register_collector
+
+logger = logging.getLogger(__name__)
+
+# Voice messages downloaded and transcribed at once; the rest wait for a slot
+VOICE_MAX_CONCURRENCY = int(os.getenv("VOICE_MAX_CONCURRENCY", "2"))
+# Voice messages allowed to wait for a slot. Beyond that new ones are turned away, so
+# waiting voice notes never take up every update slot (MAX_CONCURRENT_UPDATES in bot_common/runner.py)
+# and text messages keep being answered
+VOICE_MAX_QUEUED = int(os.getenv("VOICE_MAX_QUEUED", "8"))
+# The Bot API can't hand out files larger than 20 MB anyway
+VOICE_MAX_BYTES = int(os.getenv("VOICE_MAX_BYTES", str(20 * 1024 * 1024)))
+# Recordings are kept in memory up to this size and spill over to a temporary file beyond it
+VOICE_SPOOL_MEMORY_BYTES = int(os.getenv("VOICE_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+BUSY_REPLY = "I'm getting a lot of voice messages right now. Please try again in a minute, or type your message."
+TOO_LARGE_REPLY = "That recording is too long for me. Could you send a shorter one, or type your message?"
+NOT_UNDERSTOOD_REPLY = "Sorry, I couldn't make out that voice message. Could you try again or type it?"
+ERROR_REPLY = "Sorry, something went wrong on my side. Please try again in a moment."
+
+stats = {'answered': 0, 'rejected_busy': 0, 'rejected_too_large': 0, 'not_understood': 0, 'failed': 0}
+_voice_active = 0
+_voice_waiting = 0
+_http_client: Optional[httpx.AsyncClient] = None
+_voice_slots = asyncio.Semaphore(VOICE_MAX_CONCURRENCY)
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=10.0), follow_redirects=True)
+    return _http_client
+
+
+def format_reply(reply) -> str:
+    """Renders personal_assistant_team's answer (text or a written email) as a chat message."""
+    if isinstance(reply, str):
+        return reply
+    if hasattr(reply, 'subject') and hasattr(reply, 'body'):
+        return f"To: {reply.user_name} <{reply.user_email}>\nSubject: {reply.subject}\n\n{reply.body}"
+    return str(reply)
+
+
+async def _reply(update: Update, reply_text: str) -> None:
+    reply_text = reply_text or ERROR_REPLY
+    for start in range(0, len(reply_text), TELEGRAM_MAX_MESSAGE_LENGTH):
+        await update.message.reply_text(reply_text[start:start + TELEGRAM_MAX_MESSAGE_LENGTH])
+
+
+async def _answer(update: Update, user_request: str, stage: str) -> None:
+    try:
+        with span(stage):
+            reply = await personal_assistant_team(user_request, chat_id=update.effective_chat.id)
+    except Exception as e:
+        logger.error(f"Answering message in chat {update.effective_chat.id} failed: {e}")
+        stats['failed'] += 1
+        await _reply(update, ERROR_REPLY)
+        return
+    stats['answered'] += 1
+    await _reply(update, format_reply(reply))
+
+
+@timed("text_message")
+async def handle_text_message(update: Update, context: CallbackContext) -> None:
+    if not update.message or not update.message.text:
+        return
+    await _answer(update, update.message.text, "text.answer")
+
+
+async def download_to_spool(bot, file_id: str, out: BinaryIO) -> int:
+    """
+    Streams a Telegram file into out, chunk by chunk, so a large recording never sits in
+    memory as a whole (out is a SpooledTemporaryFile that moves to disk past its limit).
+
+    Returns:
+        int: Bytes written
+
+    Raises:
+        ValueError: The file is larger than VOICE_MAX_BYTES
+    """
+    telegram_file = await bot.get_file(file_id)
+    if telegram_file.file_size and telegram_file.file_size > VOICE_MAX_BYTES:
+        raise ValueError(f"file is {telegram_file.file_size} bytes")
+    if not str(telegram_file.file_path).startswith(("http://", "https://")):
+        # Local Bot API server: the file is already on this machine
+        await telegram_file.download_to_memory(out)
+        return out.tell()
+
+    size = 0
+    async with _get_http_client().stream("GET", telegram_file.file_path) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > VOICE_MAX_BYTES:
+                raise ValueError(f"file is over {VOICE_MAX_BYTES} bytes")
+            out.write(chunk)
+    return size
+
+
+async def _transcribe(bot, file_id: str, mime_type: str) -> Optional[str]:
+    """Downloads and transcribes a recording; None if the download failed."""
+    with tempfile.SpooledTemporaryFile(max_size=VOICE_SPOOL_MEMORY_BYTES) as buffer:
+        try:
+            with span("voice.download"):
+                await download_to_spool(bot, file_id, buffer)
+        except (TelegramError, httpx.HTTPError) as e:
+            logger.error(f"Downloading voice message {file_id} failed: {e}")
+            return None
+        buffer.seek(0)
+        with span("voice.transcribe"):
+            return await get_transcriber().transcribe(buffer, mime_type)
+
+
+@timed("voice_message")
+async def handle_audio_message(update: Update, context: CallbackContext) -> None:
+    """
+    Answers a voice note or audio file: download, transcribe, then personal_assistant_team
+    as for text. At most VOICE_MAX_CONCURRENCY recordings are downloaded and transcribed at
+    once and VOICE_MAX_QUEUED more may wait; anything beyond that is turned away at once
+    instead of piling up. The slot is released before the answer is generated, so a slow
+    model reply doesn't hold up the next download.
+    """
+    global _voice_active, _voice_waiting
+    message = update.message
+    audio = (message.voice or message.audio) if message else None
+    if audio is None:
+        return
+    if audio.file_size and audio.file_size > VOICE_MAX_BYTES:
+        stats['rejected_too_large'] += 1
+        await _reply(update, TOO_LARGE_REPLY)
+        return
+    if _voice_waiting >= VOICE_MAX_QUEUED:
+        stats['rejected_busy'] += 1
+        logger.warning(f"Voice queue full ({_voice_active} active, {_voice_waiting} waiting), turning a message away")
+        await _reply(update, BUSY_REPLY)
+        return
+
+    _voice_waiting += 1
+    queued_at = time.perf_counter()
+    try:
+        await _voice_slots.acquire()
+    finally:
+        _voice_waiting -= 1
+    _voice_active += 1
+    observe("voice.queue_wait", time.perf_counter() - queued_at)
+    try:
+        transcript = await _transcribe(context.bot, audio.file_id, audio.mime_type or "audio/ogg")
+    except ValueError as e:
+        # The size wasn't known up front and the download went past VOICE_MAX_BYTES
+        logger.warning(f"Voice message in chat {update.effective_chat.id} is too large: {e}")
+        stats['rejected_too_large'] += 1
+        await _reply(update, TOO_LARGE_REPLY)
+        return
+    finally:
+        _voice_active -= 1
+        _voice_slots.release()
+
+    if not transcript:
+        stats['not_understood'] += 1
+        await _reply(update, NOT_UNDERSTOOD_REPLY)
+        return
+    logger.info(f"Transcribed voice message in chat {update.effective_chat.id}: {len(transcript)} characters")
+    await _answer(update, transcript, "voice.answer")
+
+
+async def on_shutdown(application) -> None:
+    """Application post_shutdown hook: closes the download client."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+register_collector("voice_pipeline_in_flight", "gauge", "Voice messages being processed or waiting for a slot",
+                   lambda: {'state="active"': _voice_active, 'state="waiting"': _voice_waiting})
+register_collector("incoming_messages_total", "counter", "Incoming messages, by outcome",
+                   lambda: {f'result="{result}"': count for result, count in stats.items()})
@@ -0,0 +1,217 @@
+import os
+import re
+import zlib
+import logging
+from typing import Optional
+from bot_common.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# Messages the classifier is less sure about than this go to the LLM router
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.85"))
+# Naive Bayes is confident about anything, "what time is it" included. Messages whose content
+# words are mostly unknown to it go to the LLM router however confident it is
+MIN_KNOWN_WORD_SHARE = float(os.getenv("INTENT_MIN_KNOWN_WORD_SHARE", "0.6"))
+HASH_FEATURES = 2 ** 14
+# Laplace smoothing for the naive Bayes word counts
+SMOOTHING = 0.5
+
+GREETING = "greeting"
+EMAIL = "email"
+COMPANY_INFO = "company_info"
+
+GREETING_REPLY = "Hello! I'm Jovian from Jovian AI. We build AI agents & AI systems for growing businesses. How can I help you today?"
+
+# Only short messages count as greetings, "hi, what do you charge for a chatbot?" is a question
+_GREETING_PATTERN = re.compile(
+    r"^\s*(hi+|hello+|hey+|hiya|yo|howdy|greetings|good\s+(morning|afternoon|evening|day)|what'?s\s+up|sup)"
+    r"(\s+(there|team|jovian|everyone|all))?\s*[!.,?\s]*$",
+    re.IGNORECASE
+)
+_EMAIL_ADDRESS_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# An address alone doesn't make an email request: leads share theirs ("I'm Sam, sam@acme.com")
+# or ask about ours. Only a message opening with one of these verbs asks for an email to be written
+_SEND_VERB_PATTERN = re.compile(
+    r"^\s*(please\s+|can\s+you\s+|could\s+you\s+)?"
+    r"(e-?mail|mail|send|write|draft|compose|message|ping|notify|remind|reply|shoot|drop|forward|tell|ask|let)\b",
+    re.IGNORECASE
+)
+_SEND_EMAIL_PATTERN = re.compile(
+    r"\b(send|write|draft|compose|shoot|drop)\b.{0,40}\b(e-?mail|mail)\b"
+    r"|\bfollow[\s-]?up\s+e-?mail\b",
+    re.IGNORECASE
+)
+
+# Seed examples for the classifier; the rules above catch the obvious cases, these cover the rest
+TRAINING_EXAMPLES = {
+    EMAIL: [
+        "send an email to sam about the meeting tomorrow",
+        "write to john and tell him the invoice is ready",
+        "email aaditya that the project is done",
+        "can you mail sam the proposal",
+        "let john know we are running late",
+        "draft a message for sam thanking him for the call",
+        "tell sam by email that we need to reschedule",
+        "shoot john a note about the contract",
+        "reply to sam and say yes to the offer",
+        "send john the updated timeline",
+        "write a follow up to aaditya about the demo",
+        "notify sam that the payment went through",
+        "ask john over mail whether friday works",
+        "compose an email inviting sam to the workshop",
+        "remind john about the deadline via email",
+        "message sam that I will send the slides later",
+    ],
+    COMPANY_INFO: [
+        "what does your company do",
+        "how much does a project cost",
+        "what services do you offer",
+        "can you build a chatbot for my business",
+        "how long does it take to complete a project",
+        "are you available next week",
+        "i want to book a free consultation",
+        "how can ai help my ecommerce store",
+        "what is your pricing",
+        "do you work with small businesses",
+        "who are you",
+        "tell me about jovian ai",
+        "how do i get started with you",
+        "can you automate my customer support",
+        "what kind of ai agents do you build",
+        "i need help automating invoices in my company",
+        "do you have any open slots",
+        "what is the process after the consultation",
+        "my business needs ai, where do we start",
+        "can we schedule a call",
+        "what do you charge for automation",
+        "how long would an integration with our crm take",
+    ],
+    GREETING: [
+        "hi", "hello", "hey there", "good morning", "hello jovian", "hey team", "hi there", "good evening",
+    ],
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+# Words that say nothing about the topic, left out of the known word share
+FUNCTION_WORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "for", "in", "on", "at", "by", "with", "about", "from", "is",
+    "are", "was", "be", "am", "do", "does", "did", "can", "could", "would", "will", "should", "i", "i'm", "me", "my",
+    "we", "our", "us", "you", "your", "it", "it's", "its", "this", "that", "what", "what's", "how", "which", "who",
+    "when", "where", "why", "there", "any", "some", "much", "many", "please", "so", "just", "not", "no", "yes",
+}
+
+
+def _features(message: str) -> list:
+    """Hashed word unigrams and bigrams of the message."""
+    words = _TOKEN_PATTERN.findall(message.lower())
+    grams = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return [zlib.crc32(gram.encode("utf-8")) % HASH_FEATURES for gram in grams]
+
+
+class IntentClassifier:
+    """
+    Multinomial naive Bayes over hashed unigram and bigram counts. Training on the seed
+    examples takes a few milliseconds and a prediction is one sparse dot product, so it
+    runs inline in the handler instead of costing a model round trip.
+    """
+
+    def __init__(self, examples: dict = TRAINING_EXAMPLES):
+        import numpy as np
+
+        self.labels = sorted(examples)
+        counts = np.full((len(self.labels), HASH_FEATURES), SMOOTHING)
+        documents = np.zeros(len(self.labels))
+        for row, label in enumerate(self.labels):
+            for example in examples[label]:
+                np.add.at(counts[row], _features(example), 1)
+                documents[row] += 1
+        self.vocabulary = {word for texts in examples.values() for text in texts for word in _TOKEN_PATTERN.findall(text.lower())}
+        self.log_priors = np.log(documents / documents.sum())
+        self.log_likelihoods = np.log(counts / counts.sum(axis=1, keepdims=True))
+
+    def predict(self, message: str) -> tuple:
+        """
+        Returns:
+            tuple: (label, probability) of the most likely intent, (None, 0.0) if the
+                message has no words
+        """
+        import numpy as np
+
+        features = _features(message)
+        if not features:
+            return None, 0.0
+        scores = self.log_priors + self.log_likelihoods[:, features].sum(axis=1)
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    def known_word_share(self, message: str) -> float:
+        """Share of the message's content words seen in training, 1.0 if it has none."""
+        words = [word for word in _TOKEN_PATTERN.findall(message.lower()) if word not in FUNCTION_WORDS]
+        if not words:
+            return 1.0
+        return sum(word in self.vocabulary for word in words) / len(words)
+
+
+_classifier: Optional[IntentClassifier] = None
+
+# Messages decided by each tier
+stats = {'rules': 0, 'classifier': 0, 'llm': 0}
+
+
+def get_classifier() -> IntentClassifier:
+    global _classifier
+    if _classifier is None:
+        _classifier = IntentClassifier()
+    return _classifier
+
+
+def match_rules(message: str) -> Optional[str]:
+    """Greetings, unmistakable email requests and messages sharing or asking about an address."""
+    if _GREETING_PATTERN.match(message):
+        return GREETING
+    if _SEND_EMAIL_PATTERN.search(message):
+        return EMAIL
+    if _EMAIL_ADDRESS_PATTERN.search(message):
+        return EMAIL if _SEND_VERB_PATTERN.match(message) else COMPANY_INFO
+    return None
+
+
+def route_intent(message: str) -> Optional[str]:
+    """
+    Decides locally which agent should handle a message.
+
+    Args:
+        message (str): The user's message
+
+    Returns:
+        Optional[str]: GREETING, EMAIL or COMPANY_INFO, or None when neither the rules nor
+            the classifier are confident and the LLM router should decide
+    """
+    intent = match_rules(message)
+    if intent:
+        stats['rules'] += 1
+        return intent
+
+    classifier = get_classifier()
+    intent, confidence = classifier.predict(message)
+    known_share = classifier.known_word_share(message)
+    if intent and confidence >= INTENT_CONFIDENCE_THRESHOLD and known_share >= MIN_KNOWN_WORD_SHARE:
+        stats['classifier'] += 1
+        logger.info(f"Classified message as {intent} ({confidence:.2f})")
+        return intent
+
+    stats['llm'] += 1
+    logger.info(f"Unsure of the intent ({intent}, {confidence:.2f}, {known_share:.0%} known words), falling back to the LLM router")
+    return None
+
+
+def get_hit_rates() -> dict:
+    """Share of routed messages decided by each tier."""
+    total = sum(stats.values())
+    return {tier: hits / total if total else 0.0 for tier, hits in stats.items()}
+
+
+register_collector("intent_route_total", "counter", "Messages routed, by the tier that decided",
+                   lambda: {f'tier="{tier}"': hits for tier, hits in stats.items()})
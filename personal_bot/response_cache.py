@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional
+from bot_common.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+# Answers to messages carrying contact details are about that lead, not the question
+_PERSONAL_DETAILS_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+|\d{5,}")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "for", "in", "on", "at", "by", "with", "about", "from", "is", "are",
+    "was", "be", "do", "does", "did", "can", "could", "would", "will", "should", "i", "me", "my", "we", "our", "us",
+    "you", "your", "it", "its", "this", "that", "what", "whats", "what's", "how", "which", "who", "when", "where",
+    "there", "any", "some", "much", "many", "please", "tell", "know", "want", "like", "hi", "hey", "hello", "so",
+    "just", "also", "usually", "typically", "generally", "guys", "u", "ur",
+}
+# "do you not build chatbots" is not a paraphrase of "do you build chatbots"; these all become
+# NEGATION, a content word like any other
+NEGATIONS = {"not", "no", "never", "nor", "none", "nothing", "without", "cannot", "dont", "doesnt", "didnt", "isnt", "arent", "wont", "cant"}
+NEGATION = "not"
+# Different words for the same thing, mapped to one. Only words with one meaning here:
+# "free" is both "no cost" and "not busy", and a call or a meeting isn't the consultation
+SYNONYMS = {
+    "cost": "price", "pricing": "price", "charge": "price", "fee": "price", "rate": "price", "budget": "price", "expensive": "price",
+    "services": "service", "offer": "service", "provide": "service",
+    "firm": "company", "agency": "company", "business": "company",
+    "duration": "long", "time": "long", "timeline": "long",
+    "available": "availability", "slot": "availability",
+}
+
+stats = {'hits': 0, 'paraphrase_hits': 0, 'misses': 0, 'invalidations': 0, 'latency_saved_seconds': 0.0}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase words only, so "What do you do?" and "what do you do" are the same key."""
+    return " ".join(_WORD_PATTERN.findall(question.lower().replace("’", "'")))
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def content_words(question: str) -> frozenset:
+    """The words that carry the question's meaning, stemmed and with synonyms merged."""
+    words = set()
+    for word in normalize_question(question).split():
+        if word in NEGATIONS or word.endswith("n't"):
+            words.add(NEGATION)
+            continue
+        if word in STOPWORDS:
+            continue
+        word = SYNONYMS.get(word, word)
+        word = SYNONYMS.get(_stem(word), _stem(word))
+        words.add(word)
+    return frozenset(words)
+
+
+def context_fingerprint(context) -> str:
+    return hashlib.blake2b(json.dumps(context, sort_keys=True, default=str).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _Entry:
+    __slots__ = ('answer', 'words', 'latency', 'stored_at')
+
+    def __init__(self, answer: str, words: frozenset, latency: float):
+        self.answer = answer
+        self.words = words
+        self.latency = latency
+        self.stored_at = time.time()
+
+
+class ResponseCache:
+    """
+    Answers to frequent questions, looked up by normalized text and then by paraphrase.
+
+    A paraphrase is a question with exactly the same content words (see content_words),
+    e.g. "What's your pricing?" and "how much do you charge". Merely similar questions never
+    share an answer: one word more or less easily makes it a different question.
+    Everything is dropped as soon as the agent's context changes (compared by
+    fingerprint on every lookup), so a cached answer never outlives the facts it was based on.
+    The least recently used entries are evicted beyond max_entries.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+            ttl: float = RESPONSE_CACHE_TTL_SECONDS
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # content words -> key of the cached question with exactly those words
+        self._by_words: dict = {}
+        self._fingerprint: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_context(self, context) -> None:
+        fingerprint = context_fingerprint(context)
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                stats['invalidations'] += 1
+                logger.info(f"Context of {self.name} changed, dropping {len(self._entries)} cached answers")
+            self.clear()
+            self._fingerprint = fingerprint
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_words.clear()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        if self._by_words.get(entry.words) == key:
+            del self._by_words[entry.words]
+
+    def get(self, question: str, context) -> Optional[str]:
+        """
+        Looks up a cached answer.
+
+        Args:
+            question (str): The user's message
+            context: The context the agent answers from; a different one empties the cache
+
+        Returns:
+            Optional[str]: The cached answer, None on a miss
+        """
+        self._check_context(context)
+        key = normalize_question(question)
+        paraphrase = False
+        if key not in self._entries:
+            key = self._by_words.get(content_words(question))
+            paraphrase = True
+        entry = self._entries.get(key) if key else None
+        if entry is not None and time.time() - entry.stored_at > self.ttl:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            stats['misses'] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        stats['hits'] += 1
+        stats['paraphrase_hits'] += paraphrase
+        stats['latency_saved_seconds'] += entry.latency
+        return entry.answer
+
+    def put(self, question: str, context, answer: str, latency: float) -> None:
+        """
+        Caches an answer.
+
+        Args:
+            question (str): The user's message
+            context: The context the answer was produced from
+            answer (str): The agent's answer
+            latency (float): Seconds the agent took, counted as saved on every hit
+        """
+        if not answer or not isinstance(answer, str) or _PERSONAL_DETAILS_PATTERN.search(question):
+            return
+        key = normalize_question(question)
+        if not key:
+            return
+        self._check_context(context)
+        if key in self._entries:
+            self._remove(key)
+        entry = self._entries[key] = _Entry(answer, content_words(question), latency)
+        if entry.words:
+            self._by_words[entry.words] = key
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+
+def get_hit_ratio() -> float:
+    lookups = stats['hits'] + stats['misses']
+    return stats['hits'] / lookups if lookups else 0.0
+
+
+register_collector("response_cache_lookups_total", "counter", "Cached answer lookups, by outcome",
+                   lambda: {'result="hit"': stats['hits'], 'result="miss"': stats['misses']})
+register_collector("response_cache_paraphrase_hits_total", "counter", "Cache hits found by paraphrase rather than exact text",
+                   lambda: stats['paraphrase_hits'])
+register_collector("response_cache_hit_ratio", "gauge", "Share of lookups answered from the cache", get_hit_ratio)
+register_collector("response_cache_latency_saved_seconds_total", "counter", "Model time saved by cache hits",
+                   lambda: stats['latency_saved_seconds'])
+register_collector("response_cache_invalidations_total", "counter", "Times the cache was emptied because the context changed",
+                   lambda: stats['invalidations'])
@@ -0,0 +1,122 @@
+import os
+import asyncio
+import logging
+from typing import BinaryIO, Callable, Dict, Optional
+from bot_common.metrics import record_error
+from bot_common.genai_client import get_genai_client
+
+logger = logging.getLogger(__name__)
+
+# "gemini", or "fake" to run without network access (benchmarks, local testing)
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "gemini")
+TRANSCRIPTION_MODEL = os.getenv("TRANSCRIPTION_MODEL", "gemini-2.0-flash")
+# Audio up to this size goes inline with the request, larger files through the Files API
+INLINE_AUDIO_MAX_BYTES = int(os.getenv("INLINE_AUDIO_MAX_BYTES", str(8 * 1024 * 1024)))
+FAKE_TRANSCRIPT = os.getenv("FAKE_TRANSCRIPT", "What does your company do?")
+FAKE_TRANSCRIPTION_LATENCY = float(os.getenv("FAKE_TRANSCRIPTION_LATENCY", "0"))
+
+TRANSCRIBE_PROMPT = (
+    "Transcribe this voice message word for word in its original language. "
+    "Reply with the transcript only, no timestamps, labels or comments."
+)
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def _size(audio: BinaryIO) -> int:
+    position = audio.tell()
+    audio.seek(0, os.SEEK_END)
+    size = audio.tell()
+    audio.seek(position)
+    return size
+
+
+class GeminiTranscriber:
+    """Transcribes with a Gemini model, through the shared API client of agent.py."""
+
+    def __init__(self, model: str = TRANSCRIPTION_MODEL):
+        self.model = model
+
+    async def transcribe(self, audio: BinaryIO, mime_type: str) -> str:
+        """
+        Args:
+            audio (BinaryIO): The recording, positioned at its start
+            mime_type (str): e.g. "audio/ogg" for Telegram voice notes
+
+        Returns:
+            str: The transcript, empty on error
+        """
+        from google.genai import types, errors
+
+        client = get_genai_client()
+        uploaded = None
+        try:
+            if _size(audio) <= INLINE_AUDIO_MAX_BYTES:
+                audio_part = types.Part.from_bytes(data=audio.read(), mime_type=mime_type)
+            else:
+                # Streamed from the spooled file instead of being copied into the request body
+                uploaded = audio_part = await client.aio.files.upload(file=audio, config=types.UploadFileConfig(mime_type=mime_type))
+            response = await client.aio.models.generate_content(model=self.model, contents=[TRANSCRIBE_PROMPT, audio_part])
+            return (response.text or "").strip()
+        except (errors.APIError, OSError, ValueError) as e:
+            logger.error(f"Transcribing {mime_type} audio failed: {e}")
+            record_error("transcription.gemini")
+            return ""
+        finally:
+            if uploaded is not None:
+                try:
+                    await client.aio.files.delete(name=uploaded.name)
+                except errors.APIError as e:
+                    logger.warning(f"Deleting uploaded audio {uploaded.name} failed: {e}")
+
+
+class FakeTranscriber:
+    """
+    Offline stand-in that returns a fixed transcript. It reads the whole recording first,
+    like a real backend, and can be given a latency to simulate the model.
+    """
+
+    def __init__(self, transcript: str = FAKE_TRANSCRIPT, latency: float = FAKE_TRANSCRIPTION_LATENCY):
+        self.transcript = transcript
+        self.latency = latency
+        self.calls = 0
+        self.bytes_read = 0
+
+    async def transcribe(self, audio: BinaryIO, mime_type: str) -> str:
+        while chunk := audio.read(READ_CHUNK_BYTES):
+            self.bytes_read += len(chunk)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls += 1
+        return self.transcript
+
+
+# Backend name -> factory; register_backend adds more (e.g. a local Whisper model)
+BACKENDS: Dict[str, Callable] = {
+    'gemini': GeminiTranscriber,
+    'fake': FakeTranscriber,
+}
+
+_transcriber = None
+
+
+def register_backend(name: str, factory: Callable) -> None:
+    """Makes a transcription backend selectable through TRANSCRIPTION_BACKEND."""
+    BACKENDS[name] = factory
+
+
+def set_transcriber(transcriber: Optional[object]) -> None:
+    """Replaces the transcriber in use, e.g. with a FakeTranscriber; None goes back to TRANSCRIPTION_BACKEND."""
+    global _transcriber
+    _transcriber = transcriber
+
+
+def get_transcriber():
+    """The configured transcriber, built on first use."""
+    global _transcriber
+    if _transcriber is None:
+        factory = BACKENDS.get(TRANSCRIPTION_BACKEND)
+        if factory is None:
+            logger.error(f"Unknown TRANSCRIPTION_BACKEND {TRANSCRIPTION_BACKEND!r}, using gemini")
+            factory = GeminiTranscriber
+        _transcriber = factory()
+    return _transcriber
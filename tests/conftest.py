@@ -0,0 +1,10 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each bot runs with its own directory as the import root and bot_common at the
+# repository root. Both bots have a handlers package; only the LinkedIn bot's is tested.
+for path in (os.path.join(REPO_ROOT, "personal_bot"), os.path.join(REPO_ROOT, "linkedin_post_from_reddit"), REPO_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
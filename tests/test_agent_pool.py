@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from bot_common.agent_pool import AgentPool
+
+
+class FakeAgent:
+    def __init__(self, number: int):
+        self.number = number
+        self.context = None
+        self.sessions = 0
+
+    def new_session(self):
+        self.sessions += 1
+
+
+class Factory:
+    def __init__(self, failures: int = 0):
+        self.built = 0
+        self.failures = failures
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("model unavailable")
+        self.built += 1
+        return FakeAgent(self.built)
+
+
+def test_agents_are_reused_and_reset():
+    async def scenario():
+        factory = Factory()
+        pool = AgentPool("test", factory, size=2)
+        async with pool.checkout({'post': 1}) as agent:
+            assert agent.context == {'post': 1}
+        async with pool.checkout() as again:
+            assert again is agent
+        assert factory.built == 1
+        assert agent.context is None and agent.sessions == 2
+
+    asyncio.run(scenario())
+
+
+def test_checkout_waits_when_the_pool_is_full():
+    async def scenario():
+        pool = AgentPool("test", Factory(), size=1)
+        order = []
+
+        async def use(name: str):
+            async with pool.checkout():
+                order.append(f"{name} in")
+                await asyncio.sleep(0.01)
+                order.append(f"{name} out")
+
+        await asyncio.gather(use("a"), use("b"))
+        assert order == ["a in", "a out", "b in", "b out"]
+
+    asyncio.run(scenario())
+
+
+def test_failed_build_frees_its_slot():
+    async def scenario():
+        factory = Factory(failures=2)
+        pool = AgentPool("test", factory, size=1)
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                async with pool.checkout():
+                    pass
+        async with asyncio.timeout(1):
+            async with pool.checkout() as agent:
+                assert agent.number == 1
+
+    asyncio.run(scenario())
+
+
+def test_waiting_checkout_builds_after_another_build_failed():
+    async def scenario():
+        pool = AgentPool("test", Factory(failures=1), size=1)
+
+        async def checkout():
+            async with pool.checkout() as agent:
+                return agent.number
+
+        results = await asyncio.wait_for(asyncio.gather(checkout(), checkout(), return_exceptions=True), 1)
+        assert sorted(map(type, results), key=str) == sorted([RuntimeError, int], key=str)
+
+    asyncio.run(scenario())
+
+
+def test_warm_in_background_fills_the_pool():
+    async def scenario():
+        factory = Factory()
+        pool = AgentPool("test", factory, size=3)
+        await pool.warm_in_background()
+        async with pool.checkout(), pool.checkout(), pool.checkout():
+            pass
+        assert factory.built == 3
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+from agents import comment_selection
+from agents.comment_selection import build_prompt_fields, record_prompt_tokens, select_comments, truncate_to_tokens
+
+LONG_BODY = "This is a thoughtful comment with enough words to count as a real contribution. " * 3
+
+
+def _comment(body: str, score: int = 10, depth: int = 0) -> dict:
+    return {'body': body, 'score': score, 'depth': depth, 'length': len(body)}
+
+
+def test_truncate_to_tokens_cuts_at_a_word_boundary():
+    text = "word " * 100
+    truncated = truncate_to_tokens(text, 10)
+    assert truncated.endswith("…")
+    assert len(truncated) <= 10 * comment_selection.CHARS_PER_TOKEN + 1
+    assert truncated[:-1].split() == ["word"] * len(truncated[:-1].split())
+
+
+def test_truncate_to_tokens_keeps_short_text():
+    assert truncate_to_tokens("short", 10) == "short"
+
+
+def test_best_comments_first_and_removed_ones_dropped():
+    low = "Inference costs drop when you batch requests and keep the KV cache warm between turns."
+    high = "The benchmark numbers only hold for short prompts; long contexts change the picture entirely."
+    comments = [_comment("[deleted]", score=1000), _comment(low, score=1), _comment(high, score=500)]
+    assert select_comments(comments, token_budget=1000) == [high, low]
+
+
+def test_near_duplicates_are_dropped():
+    comments = [_comment(LONG_BODY + "Agreed.", score=50), _comment(LONG_BODY + "Exactly.", score=40)]
+    assert len(select_comments(comments, token_budget=1000)) == 1
+
+
+def test_comments_stay_within_the_budget():
+    comments = [_comment(f"Comment number {i}: " + LONG_BODY.replace("thoughtful", f"t{i}x" * 5), score=i) for i in range(20)]
+    selected = select_comments(comments, token_budget=200)
+    assert selected
+    assert sum(comment_selection.estimate_tokens(body) for body in selected) <= 200
+
+
+def test_build_prompt_fields_does_not_record_until_sent(monkeypatch):
+    stats = {'calls': 0, 'raw_tokens': 0, 'prompt_tokens': 0}
+    monkeypatch.setattr(comment_selection, "prompt_token_stats", stats)
+    post = {'id': "abc", 'title': "Title", 'selftext': "x " * 5000, 'fetched_comments': [_comment(LONG_BODY)]}
+
+    fields = build_prompt_fields(post, body_token_budget=100)
+    assert stats['calls'] == 0
+    assert fields['prompt_tokens'] < fields['raw_tokens']
+
+    record_prompt_tokens(fields, post['id'])
+    assert stats == {'calls': 1, 'raw_tokens': fields['raw_tokens'], 'prompt_tokens': fields['prompt_tokens']}
+
+
+def test_build_prompt_fields_reads_comment_texts_of_older_state():
+    post = {'title': "Title", 'selftext': "", 'fetched_comments_texts': [LONG_BODY]}
+    assert build_prompt_fields(post)['comments'] == LONG_BODY.strip()
@@ -0,0 +1,85 @@
+import csv
+import json
+import random
+import sqlite3
+import pytest
+from contact_directory import ContactDirectory, load_contacts, similarity
+
+CONTACTS = [
+    {'name': "John Smith", 'email': "john.smith@acme.com"},
+    {'name': "John Doe", 'email': "jdoe@acme.com"},
+    {'name': "José Álvarez", 'email': "jose@acme.com"},
+    {'name': "Sam", 'email': "sam@gmail.com"},
+    {'name': "Samantha Reed", 'email': "sreed@acme.com"},
+]
+
+
+def _levenshtein(first: str, second: str) -> int:
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (first_char != second_char)))
+        previous = current
+    return previous[-1]
+
+
+@pytest.fixture
+def directory():
+    return ContactDirectory(CONTACTS)
+
+
+def test_similarity_matches_full_levenshtein_above_the_cutoff():
+    rng = random.Random(0)
+    for _ in range(500):
+        first = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 8)))
+        second = "".join(rng.choice("abcd") for _ in range(rng.randint(1, 8)))
+        expected = 1.0 - _levenshtein(first, second) / max(len(first), len(second))
+        assert similarity(first, second, 0.6) == (pytest.approx(expected) if expected >= 0.6 else 0.0)
+
+
+@pytest.mark.parametrize("request_text, email", [
+    ("email john smith about friday", "john.smith@acme.com"),
+    ("tell jose the invoice is ready", "jose@acme.com"),
+    ("send to jdoe@acme.com the deck", "jdoe@acme.com"),
+    ("write to sam", "sam@gmail.com"),
+    ("email samanta about lunch", "sreed@acme.com"),
+])
+def test_clear_matches_resolve_locally(directory, request_text, email):
+    contact, _ = directory.resolve(request_text)
+    assert contact['email'] == email
+
+
+def test_ambiguous_names_are_left_to_the_llm_with_candidates(directory):
+    contact, candidates = directory.resolve("email john about friday")
+    assert contact is None
+    assert {candidate['email'] for candidate in candidates} == {"john.smith@acme.com", "jdoe@acme.com"}
+
+
+def test_unknown_names_have_no_candidates(directory):
+    assert directory.resolve("email bob about lunch") == (None, [])
+
+
+def test_contacts_without_an_address_are_skipped():
+    assert len(ContactDirectory([{'name': "Nobody", 'email': ""}, CONTACTS[0]])) == 1
+
+
+def test_load_contacts_from_json_csv_and_sqlite(tmp_path):
+    json_path = tmp_path / "contacts.json"
+    json_path.write_text(json.dumps(CONTACTS[:2]))
+    csv_path = tmp_path / "contacts.csv"
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["name", "email"])
+        writer.writeheader()
+        writer.writerows(CONTACTS[:2])
+    db_path = tmp_path / "contacts.sqlite3"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE contacts (name TEXT, email TEXT)")
+        conn.executemany("INSERT INTO contacts VALUES (?, ?)", [(c['name'], c['email']) for c in CONTACTS[:2]])
+
+    for path in (json_path, csv_path, db_path):
+        assert load_contacts(str(path)) == CONTACTS[:2]
+
+
+def test_load_contacts_returns_nothing_on_error(tmp_path):
+    assert load_contacts(str(tmp_path / "missing.json")) == []
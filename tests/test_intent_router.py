@@ -0,0 +1,35 @@
+import pytest
+from intent_router import COMPANY_INFO, EMAIL, GREETING, match_rules, route_intent
+
+
+@pytest.mark.parametrize("message", ["hi", "Hello there!", "good morning", "hey team"])
+def test_short_greetings(message):
+    assert route_intent(message) == GREETING
+
+
+def test_a_greeting_with_a_question_is_not_a_greeting():
+    assert route_intent("hi, what do you charge for a chatbot?") == COMPANY_INFO
+
+
+@pytest.mark.parametrize("message", [
+    "send an email to sam about the invoice",
+    "email john@acme.com that the demo moved",
+    "remind sam about the meeting",
+])
+def test_email_requests(message):
+    assert route_intent(message) == EMAIL
+
+
+@pytest.mark.parametrize("message", ["I am Sam, sam@acme.com", "what is your email? is it info@jovian.ai"])
+def test_an_address_alone_is_not_an_email_request(message):
+    assert match_rules(message) == COMPANY_INFO
+
+
+@pytest.mark.parametrize("message", ["how much do you charge for an ai agent", "what services do you offer"])
+def test_company_questions(message):
+    assert route_intent(message) == COMPANY_INFO
+
+
+@pytest.mark.parametrize("message", ["what time is it in tokyo", ""])
+def test_unfamiliar_messages_go_to_the_llm_router(message):
+    assert route_intent(message) is None
@@ -0,0 +1,53 @@
+import pytest
+from handlers.message_layout import (
+    MAX_CAPTION_LENGTH, MAX_MESSAGE_LENGTH, layout, link, paragraph_break, plan_messages, raw, text, utf16_len
+)
+
+
+def test_utf16_len_counts_surrogate_pairs():
+    assert utf16_len("abc") == 3
+    assert utf16_len("🚀") == 2
+
+
+def test_short_content_fits_in_one_message():
+    assert layout([text("Hello"), paragraph_break(), text("world")], MAX_MESSAGE_LENGTH, parse_mode=None) == ["Hello\n\nworld"]
+
+
+def test_markdown_is_escaped_but_measured_as_displayed():
+    chunks = layout([text("a.b " * 5)], 20, 20)
+    assert all(utf16_len(chunk.replace("\\", "")) <= 20 for chunk in chunks)
+    assert "a\\.b" in chunks[0]
+
+
+def test_long_text_is_split_at_word_boundaries():
+    words = "word " * 300
+    chunks = layout([text(words)], 100, 100, parse_mode=None)
+    assert "".join(chunks) == words
+    assert all(utf16_len(chunk) <= 100 for chunk in chunks)
+    assert all(chunk.split() == ["word"] * len(chunk.split()) for chunk in chunks)
+
+
+def test_links_are_never_split():
+    chunks = layout([text("x" * 90), link("Original post", "https://reddit.com/r/a_b")], 100, 100)
+    assert chunks[-1] == "[Original post](https://reddit.com/r/a_b)"
+
+
+def test_chunks_dont_start_with_a_break():
+    chunks = layout([raw("a" * 50, "a" * 50), paragraph_break(), raw("b" * 50, "b" * 50)], 60, 60, parse_mode=None)
+    assert chunks == ["a" * 50, "b" * 50]
+
+
+@pytest.mark.parametrize("length", [10, MAX_CAPTION_LENGTH + 10, MAX_CAPTION_LENGTH + MAX_MESSAGE_LENGTH + 10])
+def test_caption_takes_what_fits_and_the_rest_follows(length):
+    content = ("word " * length)[:length]
+    plan = plan_messages([text(content)], with_media=True, parse_mode=None)
+    assert utf16_len(plan.caption) <= MAX_CAPTION_LENGTH
+    assert all(utf16_len(message) <= MAX_MESSAGE_LENGTH for message in plan.messages)
+    assert plan.caption + "".join(plan.messages) == content
+    assert plan.api_calls == 1 + len(plan.messages)
+
+
+def test_without_media_there_is_no_caption():
+    plan = plan_messages([text("Hello")], with_media=False)
+    assert plan.caption is None
+    assert plan.messages == ["Hello"]
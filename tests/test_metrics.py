@@ -0,0 +1,39 @@
+import pytest
+from bot_common.metrics import Histogram
+
+
+def test_empty_histogram_has_no_quantile():
+    histogram = Histogram((1.0, 2.0))
+    assert histogram.quantile(0.5) is None
+    assert histogram.mean is None
+
+
+def test_quantile_interpolates_inside_the_bucket():
+    histogram = Histogram((1.0, 2.0, 4.0))
+    for value in (1.5, 1.5, 3.0, 3.0):
+        histogram.observe(value)
+    # Half the observations are in (1, 2], so the median is at that bucket's upper bound
+    assert histogram.quantile(0.5) == pytest.approx(2.0)
+    assert histogram.quantile(0.75) == pytest.approx(3.0)
+    assert histogram.quantile(0.25) == pytest.approx(1.5)
+    assert histogram.mean == pytest.approx(2.25)
+
+
+def test_values_on_a_bound_count_in_that_bucket():
+    histogram = Histogram((1.0, 2.0))
+    histogram.observe(1.0)
+    assert histogram.counts == [1, 0, 0]
+
+
+def test_values_beyond_the_last_bound_report_the_last_bound():
+    histogram = Histogram((1.0, 2.0))
+    histogram.observe(10.0)
+    assert histogram.quantile(0.99) == 2.0
+
+
+def test_quantiles_are_monotonic():
+    histogram = Histogram()
+    for value in (0.001, 0.02, 0.3, 0.3, 1.2, 4.0, 9.0):
+        histogram.observe(value)
+    quantiles = [histogram.quantile(q) for q in (0.1, 0.5, 0.9, 0.99)]
+    assert quantiles == sorted(quantiles)
@@ -0,0 +1,72 @@
+import time
+import pytest
+from response_cache import ResponseCache, content_words, normalize_question
+
+CONTEXT = {'company': "Jovian AI"}
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache("test")
+
+
+def test_normalize_question_ignores_case_and_punctuation():
+    assert normalize_question("What do you do?") == normalize_question("what do you do")
+
+
+def test_exact_question_hits(cache):
+    cache.put("What is your pricing?", CONTEXT, "It depends.", 1.0)
+    assert cache.get("what is your pricing", CONTEXT) == "It depends."
+
+
+@pytest.mark.parametrize("question", ["how much do you charge", "what are your prices?", "how much does it cost"])
+def test_paraphrase_with_the_same_content_words_hits(cache, question):
+    cache.put("What is your pricing?", CONTEXT, "It depends.", 1.0)
+    assert cache.get(question, CONTEXT) == "It depends."
+
+
+@pytest.mark.parametrize("question", ["Is the consultation free?", "Are you free for a meeting tomorrow?"])
+def test_free_and_meeting_dont_match_availability_for_a_call(cache, question):
+    cache.put("Are you available for a call?", CONTEXT, "Booked for two weeks.", 1.0)
+    assert cache.get(question, CONTEXT) is None
+
+
+def test_question_with_an_extra_word_misses(cache):
+    cache.put("do you build chatbots", CONTEXT, "Yes.", 1.0)
+    assert cache.get("do you build chatbots and websites", CONTEXT) is None
+
+
+@pytest.mark.parametrize("question", ["do you not build chatbots", "don't you build chatbots?"])
+def test_negation_misses(cache, question):
+    cache.put("do you build chatbots", CONTEXT, "Yes.", 1.0)
+    assert content_words(question) != content_words("do you build chatbots")
+    assert cache.get(question, CONTEXT) is None
+
+
+def test_context_change_empties_the_cache(cache):
+    cache.put("what is your pricing", CONTEXT, "It depends.", 1.0)
+    assert cache.get("what is your pricing", {**CONTEXT, 'pricing': "$100"}) is None
+    assert len(cache) == 0
+
+
+def test_questions_with_contact_details_are_not_cached(cache):
+    cache.put("my email is sam@acme.com, what is your pricing", CONTEXT, "Thanks Sam!", 1.0)
+    assert len(cache) == 0
+
+
+def test_expired_answer_misses():
+    cache = ResponseCache("test", ttl=0.01)
+    cache.put("what is your pricing", CONTEXT, "It depends.", 1.0)
+    time.sleep(0.02)
+    assert cache.get("what is your pricing", CONTEXT) is None
+
+
+def test_least_recently_used_is_evicted_and_unindexed():
+    cache = ResponseCache("test", max_entries=2)
+    cache.put("what is your pricing", CONTEXT, "price", 1.0)
+    cache.put("what services do you offer", CONTEXT, "services", 1.0)
+    cache.get("what is your pricing", CONTEXT)
+    cache.put("who are your founders", CONTEXT, "founders", 1.0)
+    assert cache.get("what services do you offer", CONTEXT) is None
+    assert cache.get("what do you provide", CONTEXT) is None
+    assert cache.get("how much do you charge", CONTEXT) == "price"
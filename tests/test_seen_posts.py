@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from agents import seen_posts
+from agents.seen_posts import SeenPostIndex
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(seen_posts, "time", clock)
+    return clock
+
+
+def _index(**kwargs) -> SeenPostIndex:
+    return SeenPostIndex("test", ttl=kwargs.pop('ttl', 100.0), db_path=kwargs.pop('db_path', None), capacity=1000, **kwargs)
+
+
+def test_added_keys_are_seen_and_others_are_not(clock):
+    index = _index()
+    for i in range(500):
+        index.add(f"post{i}")
+    assert all(f"post{i}" in index for i in range(500))
+    false_positives = sum(f"other{i}" in index for i in range(2000))
+    assert false_positives < 20
+
+
+def test_generations_rotate_and_expire(clock):
+    index = _index(ttl=100.0, generations=4)
+    index.add("old")
+    clock.now += 30
+    index.add("newer")
+    assert len(index._generations) == 2
+    clock.now += 80
+    assert "old" not in index
+    assert "newer" in index
+
+
+def test_a_full_generation_rotates_early(clock):
+    index = SeenPostIndex("test", ttl=100.0, db_path=None, capacity=10, generations=4)
+    for i in range(25):
+        index.add(f"post{i}")
+    assert len(index._generations) == 3
+    assert index.memory_bytes == 3 * index.size_bytes
+
+
+def test_index_survives_a_restart(clock, tmp_path):
+    db_path = str(tmp_path / "seen.sqlite3")
+
+    async def scenario():
+        index = _index(db_path=db_path)
+        await index.load()
+        index.add("post1")
+        await index.save()
+        index.close()
+
+        reopened = _index(db_path=db_path)
+        await reopened.load()
+        assert "post1" in reopened
+        assert "post2" not in reopened
+        reopened.close()
+
+    asyncio.run(scenario())
+
+
+def test_unseen_candidates_prefers_fresh_posts_but_never_returns_nothing(clock, monkeypatch):
+    monkeypatch.setattr(seen_posts, "chat_seen_posts", _index())
+    monkeypatch.setattr(seen_posts, "global_seen_posts", _index())
+    candidates = [{'id': "a"}, {'id': "b"}, {'id': "c"}]
+    seen_posts.chat_seen_posts.add(seen_posts._chat_key(1, "a"))
+    seen_posts.global_seen_posts.add("b")
+
+    assert seen_posts.unseen_candidates(candidates, chat_id=1) == [{'id': "c"}]
+    seen_posts.global_seen_posts.add("c")
+    assert seen_posts.unseen_candidates(candidates, chat_id=1) == [{'id': "b"}, {'id': "c"}]
+    for post in candidates:
+        seen_posts.chat_seen_posts.add(seen_posts._chat_key(1, post['id']))
+    assert seen_posts.unseen_candidates(candidates, chat_id=1) == candidates
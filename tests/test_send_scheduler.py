@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from telegram.error import RetryAfter
+from bot_common.send_scheduler import SendScheduler, TokenBucket
+
+
+def test_bucket_allows_a_burst_then_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    now = bucket.updated_at
+    for _ in range(2):
+        assert bucket.wait_time(now) == 0.0
+        bucket.take()
+    assert bucket.wait_time(now) == pytest.approx(0.5)
+    assert bucket.wait_time(now + 0.5) == 0.0
+
+
+def test_bucket_never_holds_more_than_capacity():
+    bucket = TokenBucket(rate=10.0, capacity=3)
+    bucket.wait_time(bucket.updated_at + 100)
+    assert bucket.tokens == 3
+
+
+def test_blocked_bucket_waits_out_the_block():
+    bucket = TokenBucket(rate=10.0, capacity=3)
+    now = bucket.updated_at
+    bucket.blocked_until = now + 2
+    assert bucket.wait_time(now) == pytest.approx(2)
+    assert not bucket.is_idle(now)
+
+
+def _send(scheduler, log, name, endpoint="sendMessage", chat_id=1):
+    async def callback():
+        log.append(name)
+        return name
+    return scheduler.process_request(callback, (), {}, endpoint, {'chat_id': chat_id}, None)
+
+
+def test_replies_go_before_edits_in_the_same_chat():
+    async def scenario():
+        scheduler = SendScheduler(chat_rate=50, chat_burst=1)
+        log = []
+        await _send(scheduler, log, "first")
+        await asyncio.gather(_send(scheduler, log, "edit", "editMessageText"), _send(scheduler, log, "reply"))
+        assert log == ["first", "reply", "edit"]
+
+    asyncio.run(scenario())
+
+
+def test_a_busy_chat_doesnt_hold_up_others():
+    async def scenario():
+        scheduler = SendScheduler(chat_rate=1, chat_burst=1)
+        log = []
+        await _send(scheduler, log, "a1", chat_id=1)
+        waiting = asyncio.ensure_future(_send(scheduler, log, "a2", chat_id=1))
+        await asyncio.wait_for(_send(scheduler, log, "b1", chat_id=2), 0.5)
+        assert log == ["a1", "b1"]
+        waiting.cancel()
+        await scheduler.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_is_requeued_then_raised_after_max_retries():
+    async def scenario():
+        scheduler = SendScheduler(max_retries=2)
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise RetryAfter(0)
+            return "sent"
+
+        assert await scheduler.process_request(flaky, (), {}, "sendMessage", {'chat_id': 1}, None) == "sent"
+        assert scheduler.get_stats()['retry_after'] == 2
+
+        async def always_throttled():
+            raise RetryAfter(0)
+
+        with pytest.raises(RetryAfter):
+            await scheduler.process_request(always_throttled, (), {}, "sendMessage", {'chat_id': 2}, None)
+        assert scheduler.get_stats()['failed'] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import asyncio
+from telegram.error import BadRequest
+from handlers import streaming
+from handlers.streaming import INTERRUPTED_TEXT, reply_streaming
+
+
+class FakeSentMessage:
+    def __init__(self, text: str, fail_edits: int = 0):
+        self.text = text
+        self.fail_edits = fail_edits
+
+    async def edit_text(self, text: str):
+        if self.fail_edits:
+            self.fail_edits -= 1
+            raise BadRequest("Message to edit not found")
+        self.text = text
+
+
+class FakeMessage:
+    def __init__(self, fail_edits: int = 0):
+        self.replies = []
+        self.fail_edits = fail_edits
+
+    async def reply_text(self, text: str):
+        reply = FakeSentMessage(text, self.fail_edits)
+        self.replies.append(reply)
+        return reply
+
+
+class Stream:
+    """An async generator over deltas that records whether it was closed."""
+
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.closed = False
+
+    async def chunks(self):
+        try:
+            for delta in self.deltas:
+                await asyncio.sleep(0)
+                yield delta
+        finally:
+            self.closed = True
+
+
+def test_streamed_text_ends_up_in_the_reply(monkeypatch):
+    monkeypatch.setattr(streaming, "STREAM_EDIT_INTERVAL_SECONDS", 0)
+    message = FakeMessage()
+    stream = Stream(["Hello", " ", "world"])
+    text, completed = asyncio.run(reply_streaming(message, stream.chunks()))
+    assert (text, completed) == ("Hello world", True)
+    assert [reply.text for reply in message.replies] == ["Hello world"]
+    assert stream.closed
+
+
+def test_long_text_continues_in_new_messages(monkeypatch):
+    monkeypatch.setattr(streaming, "STREAM_EDIT_INTERVAL_SECONDS", 0)
+    message = FakeMessage()
+    deltas = ["word "] * 2000
+    text, completed = asyncio.run(reply_streaming(message, Stream(deltas).chunks()))
+    assert completed
+    assert len(message.replies) == 3
+    assert all(len(reply.text) <= streaming.MAX_MESSAGE_LENGTH for reply in message.replies)
+    assert "".join(reply.text for reply in message.replies) == text
+
+
+def test_failed_edit_closes_the_stream():
+    message = FakeMessage(fail_edits=1)
+    stream = Stream(["never", " finished"] * 100)
+    text, completed = asyncio.run(reply_streaming(message, stream.chunks()))
+    assert not completed
+    assert stream.closed
+    assert text.endswith(INTERRUPTED_TEXT)
+
+
+def test_failing_model_stream_is_marked_interrupted():
+    async def chunks():
+        yield "Partial"
+        raise RuntimeError("connection reset")
+
+    message = FakeMessage()
+    text, completed = asyncio.run(reply_streaming(message, chunks()))
+    assert not completed
+    assert message.replies[0].text == "Partial\n\n" + INTERRUPTED_TEXT
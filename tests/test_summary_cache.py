@@ -0,0 +1,64 @@
+import asyncio
+import sqlite3
+from agents.summary_cache import SummaryCache, make_summary_key
+
+
+def _last_access(db_path, key: str) -> float:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT last_access FROM summaries WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_key_changes_with_the_prompt_content():
+    key = make_summary_key("abc", "Title", "Body", "Comments")
+    assert key == make_summary_key("abc", "Title", "Body", "Comments")
+    assert key != make_summary_key("abc", "Title", "Body", "Other comments")
+    assert key != make_summary_key("abc", "Title", "BodyComments", "")
+
+
+def test_values_survive_a_restart(tmp_path):
+    db_path = tmp_path / "cache.sqlite3"
+
+    async def scenario():
+        cache = SummaryCache(db_path=str(db_path))
+        await cache.set("a", "summary")
+        cache.close()
+        reopened = SummaryCache(db_path=str(db_path))
+        assert await reopened.get("a") == "summary"
+        assert reopened.stats['disk_hits'] == 1
+        reopened.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_writes_buffered_read_times(tmp_path):
+    db_path = tmp_path / "cache.sqlite3"
+
+    async def scenario():
+        cache = SummaryCache(db_path=str(db_path), memory_entries=0)
+        await cache.set("a", "summary")
+        written = _last_access(db_path, "a")
+        await asyncio.sleep(0.01)
+        assert await cache.get("a") == "summary"
+        assert _last_access(db_path, "a") == written
+        cache.close()
+        assert _last_access(db_path, "a") > written
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_read_is_evicted_past_the_disk_budget(tmp_path):
+    db_path = tmp_path / "cache.sqlite3"
+
+    async def scenario():
+        cache = SummaryCache(db_path=str(db_path), memory_entries=0, max_disk_bytes=250)
+        await cache.set("old", "x" * 100)
+        await cache.set("read", "y" * 100)
+        await asyncio.sleep(0.01)
+        await cache.get("old")
+        await cache.set("new", "z" * 100)
+        assert await cache.get("read") is None
+        assert await cache.get("old") == "x" * 100
+        assert cache.stats['disk_evictions'] == 1
+        cache.close()
+
+    asyncio.run(scenario())